@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Batch product search: resolve a file of queries and write NDJSON results.
+
+Evaluation runs send thousands of canned shopper queries, which the
+interactive loop would answer one by one. The batch mode runs them through
+a SearchService instead, sharing one loaded catalog, index, parser and
+query cache:
+
+- queries the local parser or the cache understands are answered at once
+- the rest go to OpenAI in parallel, with at most --concurrency calls in
+  flight and at most --rate started per second
+- duplicate queries in the input share a single call
+
+Each input line is one query; blank lines are skipped. Results are written
+in input order, one JSON object per line:
+
+    {"line": 1, "query": "...", "path": "local", "arguments": {...}, "total": 12,
+     "products": [...], "latency_ms": 0.4}
+
+A query that fails has "error" instead of the results. Throughput and
+latency percentiles are reported on stderr at the end. Run with:
+
+    python3 batch.py queries.txt -o results.ndjson --concurrency 8 --rate 5
+    cat queries.txt | python3 batch.py > results.ndjson
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import sys
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, TextIO, Tuple
+
+from product_search import ProductSearchTool
+from service import SearchService, percentile
+
+
+Query = Tuple[int, str]
+
+
+class BatchReport(NamedTuple):
+    queries: int
+    seconds: float
+    latencies: List[float]
+    paths: Counter
+    errors: int
+
+    @property
+    def throughput(self) -> float:
+        return self.queries / self.seconds if self.seconds else 0.0
+
+    def __str__(self) -> str:
+        ordered = sorted(self.latencies)
+        paths = ", ".join(f"{path} {count}" for path, count in self.paths.most_common())
+        return (f"{self.queries} queries in {self.seconds:.2f} s ({self.throughput:.1f} queries/s), "
+                f"p50 {percentile(ordered, 0.5) * 1000:.1f} ms, p99 {percentile(ordered, 0.99) * 1000:.1f} ms; "
+                f"{paths or 'no paths'}; {self.errors} errors")
+
+
+def read_queries(lines: Iterable[str]) -> List[Query]:
+    """(line number, query) of every non-blank line"""
+    return [(number, line.strip()) for number, line in enumerate(lines, 1) if line.strip()]
+
+
+async def run_batch(service: SearchService, queries: List[Query], output: TextIO, workers: int = 32,
+                    limit: int = 10, sort: Optional[str] = None) -> BatchReport:
+    """
+    Search every (line number, query) with `workers` searches in progress at once and write one
+    NDJSON result per query to output, in input order.
+    """
+    results: Dict[int, Dict[str, Any]] = {}
+    latencies: List[float] = []
+    paths: Counter = Counter()
+    errors = 0
+    written = 0
+    pending = iter(range(len(queries)))
+
+    def flush() -> None:
+        # Results finish out of order; write the ones that continue the input order
+        nonlocal written
+        while written in results:
+            output.write(json.dumps(results.pop(written)) + "\n")
+            written += 1
+
+    async def worker() -> None:
+        nonlocal errors
+        # The shared iterator hands each query to whichever worker is free
+        for index in pending:
+            number, query = queries[index]
+            started = time.perf_counter()
+            try:
+                result = await service.search(query, limit, sort)
+                paths[result["path"]] += 1
+                del result["next_cursor"]
+                result = {"line": number, **result}
+            except asyncio.TimeoutError:
+                errors += 1
+                result = {"line": number, "query": query, "error": f"Timed out after {service.timeout:g} s"}
+            except Exception as e:
+                errors += 1
+                result = {"line": number, "query": query, "error": str(e)}
+            elapsed = time.perf_counter() - started
+            latencies.append(elapsed)
+            result["latency_ms"] = round(elapsed * 1000, 3)
+            results[index] = result
+            flush()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(1, workers))))
+    return BatchReport(len(queries), time.perf_counter() - started, latencies, paths, errors)
+
+
+async def batch(tool: ProductSearchTool, queries: List[Query], output: TextIO, concurrency: int = 8,
+                rate: Optional[float] = None, timeout: float = 60.0, limit: int = 10, sort: Optional[str] = None,
+                client: Optional[Any] = None) -> BatchReport:
+    """Run queries through a SearchService built for the batch; client defaults to AsyncOpenAI"""
+    service = SearchService(tool, client, max_concurrency=concurrency, timeout=timeout, rate=rate)
+    try:
+        # Enough searches in progress to keep every completion slot busy while local answers stream past
+        return await run_batch(service, queries, output, workers=concurrency * 4, limit=limit, sort=sort)
+    finally:
+        await service.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Resolve a file of product search queries into NDJSON results")
+    parser.add_argument('input', nargs='?', default='-', help="file with one query per line (default: stdin)")
+    parser.add_argument('-o', '--output', default='-', help="NDJSON file to write (default: stdout)")
+    parser.add_argument('--concurrency', type=int, default=8, help="completion calls in flight at once")
+    parser.add_argument('--rate', type=float, default=5.0, help="completion calls started per second at most")
+    parser.add_argument('--timeout', type=float, default=60.0, help="seconds allowed per query")
+    parser.add_argument('--limit', type=int, default=10, help="products per result")
+    parser.add_argument('--sort', choices=('relevance', 'rating', 'price'), help="ranking of the products")
+    args = parser.parse_args(argv)
+    if args.limit < 1:
+        parser.error("--limit must be at least 1")
+
+    try:
+        if args.input == '-':
+            queries = read_queries(sys.stdin)
+        else:
+            with open(args.input, encoding='utf-8') as file:
+                queries = read_queries(file)
+    except OSError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    tool = ProductSearchTool()
+    output = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    try:
+        # Messages printed along the way must not end up among the results
+        with contextlib.redirect_stdout(sys.stderr):
+            report = asyncio.run(batch(tool, queries, output, args.concurrency, args.rate, args.timeout,
+                                       args.limit, args.sort))
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    print(report, file=sys.stderr)
+    if tool.cache.stats.lookups:
+        print(f"Query cache: {tool.cache.stats}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for product filtering on large synthetic catalogs.
+
+Run with:
+    python3 benchmark.py              # everything
+    python3 benchmark.py catalog      # only the named benchmarks
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+from catalog import ProductCatalog
+from catalog_file import write_catalog
+from columnar import ColumnarCatalog, np
+from live_catalog import LiveCatalog
+from ranking import sort_key
+from tokens import TokenIndex
+
+CATEGORIES = ["Electronics", "Fitness", "Kitchen", "Books", "Clothing"]
+WORDS = ["wireless", "smart", "portable", "pro", "mini", "ultra", "classic", "gaming", "organic", "steel",
+         "headphones", "speaker", "watch", "mat", "bottle", "blender", "novel", "jacket", "shoes", "lamp",
+         "charger", "monitor", "kettle", "backpack", "camera", "router", "keyboard", "mouse", "tripod", "drone"]
+
+QUERIES = [
+    ("category + price + stock", dict(category="Electronics", max_price=200, in_stock_only=True)),
+    ("narrow price range", dict(max_price=12, min_rating=4.5)),
+    ("top rated", dict(min_rating=4.95)),
+    ("keyword", dict(keywords=["drone"])),
+    ("keyword + category", dict(category="Kitchen", keywords=["blender", "kettle"])),
+    ("broad", dict(max_price=900, min_rating=1.5)),
+]
+
+
+def make_products(count: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """Generate a catalog shaped like products.json"""
+    rng = random.Random(seed)
+    return [
+        {
+            "name": f"{rng.choice(WORDS).title()} {rng.choice(WORDS).title()} {i}",
+            "category": rng.choice(CATEGORIES),
+            "price": round(rng.uniform(5, 1500), 2),
+            "rating": round(rng.uniform(1, 5), 1),
+            "in_stock": rng.random() < 0.8,
+        }
+        for i in range(count)
+    ]
+
+
+def linear_filter(products, category=None, max_price=None, min_rating=None, in_stock_only=None, keywords=None):
+    """The original list-scanning filter_products()"""
+    filtered = products.copy()
+    if category:
+        filtered = [p for p in filtered if p['category'] == category]
+    if max_price is not None:
+        filtered = [p for p in filtered if p['price'] <= max_price]
+    if min_rating is not None:
+        filtered = [p for p in filtered if p['rating'] >= min_rating]
+    if in_stock_only is not None:
+        filtered = [p for p in filtered if p['in_stock'] == in_stock_only]
+    if keywords:
+        filtered = [p for p in filtered if any(k.lower() in p['name'].lower() for k in keywords)]
+    return filtered
+
+
+def timed(func: Callable[[], Any], repeat: int = 3) -> float:
+    """Best wall time of func in seconds"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def bench_catalog(count: int = 200_000) -> None:
+    """Compare the list-scanning filter with the indexed ProductCatalog"""
+    products = make_products(count)
+    started = time.perf_counter()
+    catalog = ProductCatalog(products)
+    print(f"Indexed catalog of {count:,} products (built in {time.perf_counter() - started:.1f} s)")
+    print(f"  {'query':<26} {'matches':>9} {'linear':>10} {'indexed':>10} {'speedup':>8}")
+    for label, query in QUERIES:
+        matches = len(catalog.filter(**query))
+        linear = timed(lambda: linear_filter(products, **query))
+        indexed = timed(lambda: catalog.filter(**query))
+        print(f"  {label:<26} {matches:>9,} {linear * 1000:>7.1f} ms {indexed * 1000:>7.1f} ms "
+              f"{linear / indexed:>7.1f}x")
+
+
+KEYWORD_QUERIES = [
+    ("drone", 'substring'),
+    ("drone", 'exact'),
+    ("dro", 'prefix'),
+    ("drnoe", 'fuzzy'),
+    ("wireles speakr", 'fuzzy'),
+    ("zzzz", 'fuzzy'),
+]
+
+
+def bench_keywords(count: int = 200_000) -> None:
+    """Keyword search: name scan vs trigram index vs word index"""
+    products = make_products(count)
+    catalog = ProductCatalog(products)
+    started = time.perf_counter()
+    TokenIndex(catalog._names)
+    print(f"Keyword search over {count:,} products (word index built in {time.perf_counter() - started:.1f} s)")
+    print(f"  {'keyword':<16} {'mode':<10} {'matches':>9} {'scan':>10} {'index':>10}")
+    for keyword, mode in KEYWORD_QUERIES:
+        matches = len(catalog.filter_ids(keywords=[keyword], keyword_match=mode))
+        scan = timed(lambda: linear_filter(products, keywords=[keyword])) if mode == 'substring' else None
+        indexed = timed(lambda: catalog.filter_ids(keywords=[keyword], keyword_match=mode))
+        scan_text = f"{scan * 1000:>7.1f} ms" if scan is not None else "-"
+        print(f"  {keyword:<16} {mode:<10} {matches:>9,} {scan_text:>10} {indexed * 1000:>7.2f} ms")
+
+
+def make_columns(count: int, seed: int = 0) -> tuple:
+    """Generate the same shape of catalog as make_products(), as columns"""
+    rng = np.random.default_rng(seed)
+    words = [word.title() for word in WORDS]
+    first, second = rng.integers(len(words), size=(2, count)).tolist()
+    names = [f"{words[a]} {words[b]} {i}" for i, (a, b) in enumerate(zip(first, second))]
+    categories = [CATEGORIES[code] for code in rng.integers(len(CATEGORIES), size=count).tolist()]
+    prices = np.round(rng.uniform(5, 1500, count), 2)
+    ratings = np.round(rng.uniform(1, 5, count), 1)
+    return names, categories, prices, ratings, rng.random(count) < 0.8
+
+
+def bench_columnar(sizes=(1_000_000, 10_000_000)) -> None:
+    """Memory and query latency of the columnar store against the list of dicts"""
+    if np is None:
+        print("Columnar catalog: skipped, numpy is not installed")
+        return
+    for count in sizes:
+        products = None
+        if count <= 2_000_000:
+            # The list of dicts needs ~400 bytes per product; above a few
+            # million it no longer fits next to everything else on a small machine
+            tracemalloc.start()
+            products = make_products(count)
+            list_bytes = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            started = time.perf_counter()
+            catalog = ColumnarCatalog(products)
+        else:
+            columns = make_columns(count)
+            started = time.perf_counter()
+            catalog = ColumnarCatalog.from_columns(*columns)
+            del columns
+        built = time.perf_counter() - started
+        print(f"Columnar catalog of {count:,} products (built in {built:.1f} s)")
+        if products is None:
+            print(f"  memory: columnar {catalog.nbytes / count:.0f} B/product")
+        else:
+            print(f"  memory: list of dicts {list_bytes / count:.0f} B/product, "
+                  f"columnar {catalog.nbytes / count:.0f} B/product ({list_bytes / catalog.nbytes:.1f}x smaller)")
+        print(f"  {'query':<26} {'matches':>10} {'linear':>10} {'mask':>10} {'filter':>10}")
+        for label, query in QUERIES:
+            matches = len(catalog.filter_ids(**query))
+            linear = f"{timed(lambda: linear_filter(products, **query), 1) * 1000:>7.0f} ms" if products else "-"
+            mask = timed(lambda: catalog.mask(**query))
+            found = timed(lambda: catalog.filter(**query), 1)
+            print(f"  {label:<26} {matches:>10,} {linear:>10} {mask * 1000:>7.1f} ms {found * 1000:>7.0f} ms")
+        del products, catalog
+
+
+TOPK_QUERIES = [
+    ("broad, by rating", dict(max_price=900, min_rating=1.5), 'rating'),
+    ("broad, by price", dict(max_price=900, min_rating=1.5), 'price'),
+    ("keyword, by relevance", dict(keywords=["pro", "lamp"]), 'relevance'),
+]
+
+
+def format_lines(products) -> List[str]:
+    """Display lines as ProductSearchTool prints them"""
+    return [f"{i}. {p['name']} - ${p['price']:.2f}, Rating: {p['rating']}, "
+            f"{'In Stock' if p['in_stock'] else 'Out of Stock'}" for i, p in enumerate(products, 1)]
+
+
+def bench_topk(count: int = 1_000_000, limit: int = 10) -> None:
+    """Sorting and formatting every match vs selecting one page with a bounded heap"""
+    products = make_products(count)
+    stores = [("indexed", ProductCatalog(products))]
+    if np is not None:
+        stores.append(("columnar", ColumnarCatalog(products)))
+    print(f"Ranked results over {count:,} products (page of {limit})")
+    print(f"  {'query':<24} {'store':<9} {'matches':>9} {'sort all':>10} {'top-k page':>11}")
+    for label, query, sort in TOPK_QUERIES:
+        for store, catalog in stores:
+            ids = catalog.filter_ids(**query)
+            needles = [keyword.lower() for keyword in query.get('keywords', ())]
+
+            def sort_all():
+                keyed = sorted((sort_key(sort, products[i]['price'], products[i]['rating'],
+                                         products[i]['name'].lower(), needles), i) for i in ids)
+                format_lines([products[i] for _, i in keyed])
+
+            def page():
+                format_lines([catalog.product(i) for _, i in catalog.top(ids, sort, query.get('keywords'), limit + 1)])
+
+            full, top = timed(sort_all, 1), timed(page)
+            print(f"  {label:<24} {store:<9} {len(ids):>9,} {full * 1000:>7.0f} ms {top * 1000:>8.0f} ms")
+
+
+_STARTUP_SCRIPT = """
+import sys, time
+started = time.perf_counter()
+from product_search import ProductSearchTool
+from query_cache import QueryCache
+imported = time.perf_counter()
+tool = ProductSearchTool(client=object(), products_path=sys.argv[1], cache=QueryCache("benchmark"))
+ready = time.perf_counter()
+tool.filter_products(category="Kitchen", max_price=12, min_rating=4.5)
+queried = time.perf_counter()
+with open('/proc/self/status') as status:
+    peak = next(int(line.split()[1]) for line in status if line.startswith('VmHWM:')) * 1024
+print(imported - started, ready - imported, queried - ready, peak)
+"""
+
+
+def bench_startup(count: int = 1_000_000) -> None:
+    """Cold start of ProductSearchTool from products.json vs a mapped catalog file"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory() as directory:
+        products = make_products(count)
+        json_path, pcat_path = os.path.join(directory, 'products.json'), os.path.join(directory, 'products.pcat')
+        with open(json_path, 'w', encoding='utf-8') as file:
+            json.dump(products, file)
+        started = time.perf_counter()
+        write_catalog(products, pcat_path)
+        converted = time.perf_counter() - started
+        del products
+        print(f"Startup with {count:,} products (converted in {converted:.1f} s, "
+              f"JSON {os.path.getsize(json_path) / 2 ** 20:.0f} MB, catalog file "
+              f"{os.path.getsize(pcat_path) / 2 ** 20:.0f} MB)")
+        print(f"  {'source':<28} {'imports':>9} {'startup':>9} {'first query':>12} {'peak RSS':>10}")
+        runs = [("products.json, indexed", json_path, 'indexed'), ("products.json, columnar", json_path, 'columnar'),
+                ("catalog file, mapped", pcat_path, '')]
+        for label, path, store in runs:
+            if store == 'columnar' and np is None:
+                continue
+            env = dict(os.environ, PRODUCT_STORE=store)
+            output = subprocess.run([sys.executable, '-c', _STARTUP_SCRIPT, path], cwd=here, env=env,
+                                    capture_output=True, text=True, check=True).stdout
+            imports, startup, query, rss = map(float, output.split()[-4:])
+            print(f"  {label:<28} {imports:>7.2f} s {startup:>7.2f} s {query * 1000:>9.1f} ms {rss / 2 ** 20:>7.0f} MB")
+
+
+def bench_updates(count: int = 200_000, changes: int = 2000) -> None:
+    """Applying changes to the live catalog vs rebuilding the indexed one, and what the live indexes cost queries"""
+    products = make_products(count)
+    started = time.perf_counter()
+    indexed = ProductCatalog(products)
+    rebuild = time.perf_counter() - started
+    started = time.perf_counter()
+    catalog = LiveCatalog(products)
+    build = time.perf_counter() - started
+    print(f"Live catalog of {count:,} products (built in {build:.1f} s; indexed catalog built in {rebuild:.1f} s)")
+
+    rng = random.Random(1)
+    fresh = make_products(changes, seed=2)
+    runs = [
+        ("price and stock change", lambda i: catalog.upsert(dict(products[rng.randrange(count)],
+                                                                price=round(rng.uniform(5, 1500), 2),
+                                                                in_stock=rng.random() < 0.8))),
+        ("new product", lambda i: catalog.upsert(dict(fresh[i], name=f"{fresh[i]['name']} new"))),
+        ("delete", lambda i: catalog.delete(products[i]['name'])),
+    ]
+    print(f"  {'change':<26} {'per change':>11} {'changes/s':>10}   (rebuilding instead: {rebuild:.1f} s per change)")
+    for label, change in runs:
+        started = time.perf_counter()
+        for i in range(changes):
+            catalog = change(i)
+        elapsed = (time.perf_counter() - started) / changes
+        print(f"  {label:<26} {elapsed * 1e6:>8.0f} us {1 / elapsed:>10,.0f}")
+
+    print(f"  {'query':<26} {'matches':>9} {'indexed':>10} {'live':>10}")
+    rebuilt = ProductCatalog(list(catalog))
+    for label, query in QUERIES:
+        matches = len(catalog.filter_ids(**query))
+        print(f"  {label:<26} {matches:>9,} {timed(lambda: rebuilt.filter_ids(**query)) * 1000:>7.1f} ms "
+              f"{timed(lambda: catalog.filter_ids(**query)) * 1000:>7.1f} ms")
+
+
+BENCHMARKS = {
+    "catalog": bench_catalog,
+    "columnar": bench_columnar,
+    "keywords": bench_keywords,
+    "startup": bench_startup,
+    "topk": bench_topk,
+    "updates": bench_updates,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run product filtering benchmarks")
+    parser.add_argument('names', nargs='*', metavar='name', help="benchmarks to run (default: all)")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark: {', '.join(unknown)}")
+    for name in args.names or BENCHMARKS:
+        BENCHMARKS[name]()
+
+
+if __name__ == '__main__':
+    main()
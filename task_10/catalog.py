@@ -0,0 +1,238 @@
+"""
+Indexed in-memory product catalog.
+
+Filtering a plain list of products costs a full pass per criterion. The
+catalog instead builds, once at load time:
+
+- a hash index from category to product ids
+- product ids sorted by price and by rating, searched with bisect
+- a stock bitmap, plus the ids of in-stock and out-of-stock products
+- an inverted index from name trigrams to product ids, for keyword search
+- an inverted index from name words to product ids, for prefix and
+  typo-tolerant keyword search (see tokens.py)
+
+A query starts from the criterion with the fewest candidates and checks the
+others only against those candidates. Results are the same products, in the
+same order, as filtering the list directly.
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from ranking import Ranked, check_sort, select, sort_key
+from tokens import MATCH_MODES, TokenIndex
+
+Product = Dict[str, Any]
+
+_GRAM = 3
+
+# (candidate count, candidate generator, whether the candidates come in
+# catalog order, filter over ids)
+Criterion = Tuple[int, Callable[[], Iterable[int]], bool, Callable[[Iterable[int]], Iterable[int]]]
+
+# 'substring' is the original filter_products() behaviour; the others match
+# whole words, word prefixes or words within a few typos
+KEYWORD_MATCHES = ('substring',) + MATCH_MODES
+
+
+def trigrams(text: str) -> set:
+    """Distinct 3-character substrings of text"""
+    return {text[i:i + _GRAM] for i in range(len(text) - _GRAM + 1)}
+
+
+def run_criteria(criteria: List[Criterion], size: int, all_ids: Callable[[], Iterable[int]],
+                 ordered: bool = True) -> List[int]:
+    """Ids passing every criterion, of a catalog of size live products listed by all_ids()
+
+    Candidates come from the criterion with the fewest, and the others only
+    check those candidates. The ids are ascending unless ordered is false,
+    which skips putting them back in catalog order.
+    """
+    if not criteria:
+        return list(all_ids())
+
+    criteria.sort(key=lambda criterion: criterion[0])
+    count, generate, in_order, narrow = criteria[0]
+    if ordered and not in_order and count * 4 > size:
+        # Sorting a large share of the catalog back into order costs more
+        # than checking every product
+        ids, in_order = narrow(all_ids()), True
+    else:
+        ids = generate()
+    for _, _, _, narrow in criteria[1:]:
+        if not ids:
+            break
+        ids = narrow(ids)
+    return list(ids) if in_order or not ordered else sorted(ids)
+
+
+
+def rank_ids(ids: Iterable[int], fields: Callable[[int], Tuple[float, float, str]], sort: str = 'relevance',
+             keywords: Optional[List[str]] = None, limit: int = 10, after: Optional[Ranked] = None) -> List[Ranked]:
+    """top() over a store whose fields(id) gives (price, rating, lowercased name)"""
+    check_sort(sort)
+    needles = [keyword.lower() for keyword in keywords or ()]
+
+    def keyed() -> Iterator[Ranked]:
+        for i in ids:
+            price, rating, name = fields(i)
+            yield sort_key(sort, price, rating, name, needles), i
+
+    return select(keyed(), limit, after)
+
+
+def token_ids(tokens: TokenIndex, keywords: List[str], mode: str) -> Optional[Set[int]]:
+    """Ids matching any keyword by words; None if a keyword has no words and so matches everything"""
+    matches: Set[int] = set()
+    for keyword in keywords:
+        ids = tokens.search(keyword, mode)
+        if ids is None:
+            return None
+        matches |= ids
+    return matches
+
+
+def keyword_estimate(by_trigram: Any, needles: List[str], size: int) -> int:
+    """Upper bound on products matching any needle: the rarest trigram of each, among size products"""
+    total = 0
+    for needle in needles:
+        grams = trigrams(needle)
+        if not grams:
+            return size
+        total += min(len(by_trigram.get(gram, ())) for gram in grams)
+    return min(total, size)
+
+
+def keyword_ids(by_trigram: Any, needles: List[str], name: Callable[[int], str],
+                all_ids: Callable[[], Iterable[int]]) -> Iterable[int]:
+    """
+    Ids whose lowercased name(id) contains any needle. by_trigram maps trigrams to postings of ids;
+    trigram candidates are confirmed by substring search.
+    """
+    matches = set()
+    for needle in needles:
+        grams = trigrams(needle)
+        if not grams:
+            # Too short to index: scan every name
+            return [i for i in all_ids() if any(n in name(i) for n in needles)]
+        postings = sorted((by_trigram.get(gram, ()) for gram in grams), key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            if not candidates:
+                break
+            candidates.intersection_update(posting)
+        matches.update(i for i in candidates if needle in name(i))
+    return matches
+
+
+class ProductCatalog:
+    """Products plus the indexes used to filter them"""
+
+    def __init__(self, products: Sequence[Product]):
+        self.products = list(products)
+        count = len(self.products)
+        self._prices = array('d', (p['price'] for p in self.products))
+        self._ratings = array('d', (p['rating'] for p in self.products))
+        self._names = [p['name'].lower() for p in self.products]
+
+        # Categories are numbered in order of appearance; codes[i] is product i's
+        self._category_codes: Dict[Any, int] = {}
+        self._codes = array('l')
+        self._by_category: Dict[Any, array] = {}
+        for product_id, product in enumerate(self.products):
+            category = product['category']
+            code = self._category_codes.setdefault(category, len(self._category_codes))
+            self._codes.append(code)
+            self._by_category.setdefault(category, array('l')).append(product_id)
+
+        self._price_order = array('l', sorted(range(count), key=self._prices.__getitem__))
+        self._sorted_prices = array('d', (self._prices[i] for i in self._price_order))
+        self._rating_order = array('l', sorted(range(count), key=self._ratings.__getitem__))
+        self._sorted_ratings = array('d', (self._ratings[i] for i in self._rating_order))
+
+        self._stock = bytearray(bool(p['in_stock']) for p in self.products)
+        self._out_of_stock = bytearray(1 - flag for flag in self._stock)
+        self._by_stock = {
+            True: array('l', (i for i in range(count) if self._stock[i])),
+            False: array('l', (i for i in range(count) if not self._stock[i])),
+        }
+
+        self._by_trigram: Dict[str, array] = {}
+        for product_id, name in enumerate(self._names):
+            for gram in trigrams(name):
+                self._by_trigram.setdefault(gram, array('l')).append(product_id)
+        self._tokens = TokenIndex(self._names)
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+    def product(self, product_id: int) -> Product:
+        return self.products[product_id]
+
+    def top(self, ids: Iterable[int], sort: str = 'relevance', keywords: Optional[List[str]] = None,
+            limit: int = 10, after: Optional[Ranked] = None) -> List[Ranked]:
+        """The first `limit` (key, id) of ids in a ranking order from ranking.py, after the `after` item"""
+        prices, ratings, names = self._prices, self._ratings, self._names
+        return rank_ids(ids, lambda i: (prices[i], ratings[i], names[i]), sort, keywords, limit, after)
+
+    def filter(self, category: Optional[str] = None,
+               max_price: Optional[float] = None,
+               min_rating: Optional[float] = None,
+               in_stock_only: Optional[bool] = None,
+               keywords: Optional[List[str]] = None,
+               keyword_match: str = 'substring') -> List[Product]:
+        """Return the products matching every given criterion, in catalog order
+
+        keyword_match selects how keywords match names: 'substring' (any part
+        of the name), 'exact' (whole words), 'prefix' (word beginnings) or
+        'fuzzy' (words within a few typos). In the word modes every word of a
+        keyword must match.
+        """
+        return [self.products[i] for i in self.filter_ids(category, max_price, min_rating,
+                                                          in_stock_only, keywords, keyword_match)]
+
+    def filter_ids(self, category: Optional[str] = None,
+                   max_price: Optional[float] = None,
+                   min_rating: Optional[float] = None,
+                   in_stock_only: Optional[bool] = None,
+                   keywords: Optional[List[str]] = None,
+                   keyword_match: str = 'substring', ordered: bool = True) -> List[int]:
+        """Like filter(), but return ascending product ids, or ids in any order if ordered is false"""
+        if keyword_match not in KEYWORD_MATCHES:
+            raise ValueError(f"keyword_match must be one of {', '.join(KEYWORD_MATCHES)}: {keyword_match!r}")
+        criteria: List[Criterion] = []
+        if category:
+            code = self._category_codes.get(category)
+            category_ids = self._by_category.get(category, ())
+            codes = self._codes
+            criteria.append((len(category_ids), lambda: category_ids, True,
+                             lambda ids: [i for i in ids if codes[i] == code]))
+        if max_price is not None:
+            end = bisect_right(self._sorted_prices, max_price)
+            prices = self._prices
+            criteria.append((end, lambda: self._price_order[:end], False,
+                             lambda ids: [i for i in ids if prices[i] <= max_price]))
+        if min_rating is not None:
+            start = bisect_left(self._sorted_ratings, min_rating)
+            ratings = self._ratings
+            criteria.append((len(self) - start, lambda: self._rating_order[start:], False,
+                             lambda ids: [i for i in ids if ratings[i] >= min_rating]))
+        if in_stock_only is not None:
+            stock_ids = self._by_stock.get(in_stock_only, ())
+            stock = self._stock if in_stock_only else self._out_of_stock
+            criteria.append((len(stock_ids), lambda: stock_ids, True,
+                             lambda ids: [i for i in ids if stock[i]] if stock_ids else []))
+        if keywords and keyword_match != 'substring':
+            matched = token_ids(self._tokens, keywords, keyword_match)
+            if matched is not None:
+                criteria.append((len(matched), lambda: matched, False,
+                                 lambda ids: [i for i in ids if i in matched]))
+        elif keywords:
+            needles = [keyword.lower() for keyword in keywords]
+            names = self._names
+            criteria.append((keyword_estimate(self._by_trigram, needles, len(self)),
+                             lambda: keyword_ids(self._by_trigram, needles, names.__getitem__,
+                                                 lambda: range(len(self))), False,
+                             lambda ids: [i for i in ids if any(n in names[i] for n in needles)]))
+        return run_criteria(criteria, len(self), lambda: range(len(self)), ordered)
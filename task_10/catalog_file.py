@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Memory-mappable product catalog file.
+
+Loading products.json parses every product into a dict before the first
+query. A catalog file (.pcat) instead stores each numeric field as a column
+of fixed-width values, and the names as a UTF-8 string table with an offsets
+column, so the file can be memory-mapped and used as it is. Opening it reads
+only a small JSON header; the operating system pages in the parts of the
+columns a query actually touches.
+
+Layout (little-endian, sections aligned to 8 bytes):
+
+    magic        b'PCAT' + format version (uint32)
+    header size  uint64
+    header       JSON: product count, categories, and the offset and size
+                 of every section
+    sections     prices (float64), ratings (float64), in_stock (uint8),
+                 codes (uint16 index into categories), name_starts (uint64,
+                 count + 1 offsets into names), names (names joined with
+                 '\\n'), lowercased names and their starts (shared with names
+                 when all names are ASCII), catalog statistics (JSON, with
+                 the counted distinct prices and ratings as float64 and
+                 uint64 columns), the vocabulary of name words and the
+                 pairs of adjacent name words, for phrase keywords (both
+                 sorted and '\\n'-joined)
+
+Convert a JSON catalog with:
+
+    python3 catalog_file.py products.json products.pcat
+"""
+
+import argparse
+import json
+import mmap
+import struct
+import sys
+import time
+from array import array
+from collections.abc import Sequence
+from typing import Any, Dict, Iterable, List, Tuple
+
+from stats import CatalogStats
+from query_parser import name_words
+
+Product = Dict[str, Any]
+
+MAGIC = b'PCAT'
+VERSION = 2
+_PREAMBLE = struct.Struct('<4sIQ')
+_ALIGN = 8
+
+# Section name -> array typecode of its values; 'B' sections are raw bytes
+_COLUMNS = {
+    "prices": 'd',
+    "ratings": 'd',
+    "in_stock": 'B',
+    "codes": 'H',
+    "name_starts": 'Q',
+    "names": 'B',
+    "lower_starts": 'Q',
+    "lower_names": 'B',
+    "stats": 'B',
+    "price_values": 'd',
+    "price_counts": 'Q',
+    "rating_values": 'd',
+    "rating_counts": 'Q',
+    "vocabulary": 'B',
+    "phrases": 'B',
+}
+
+
+def _string_table(strings: Iterable[str]) -> Tuple[bytes, array]:
+    """Strings joined with '\\n' and the offset of each, plus the end offset"""
+    encoded = [s.encode('utf-8') for s in strings]
+    starts = array('Q', [0])
+    for item in encoded:
+        starts.append(starts[-1] + len(item) + 1)
+    return b''.join(item + b'\n' for item in encoded), starts
+
+
+def write_catalog(products: Sequence, path: str) -> None:
+    """Write products (dicts with name, category, price, rating, in_stock) as a catalog file"""
+    categories: Dict[Any, int] = {}
+    codes = array('H')
+    for product in products:
+        code = categories.setdefault(product['category'], len(categories))
+        if code > 0xFFFF:
+            raise ValueError("A catalog file holds at most 65536 categories")
+        codes.append(code)
+
+    names = [product['name'] for product in products]
+    name_blob, name_starts = _string_table(names)
+    if name_blob.isascii():
+        lower_blob, lower_starts = name_blob.lower(), None
+    else:
+        lower_blob, lower_starts = _string_table(name.lower() for name in names)
+    words, pairs = name_words(names)
+    stats = CatalogStats(products).state()
+    prices, ratings = stats.pop("prices"), stats.pop("ratings")
+
+    sections = {
+        "prices": array('d', (product['price'] for product in products)).tobytes(),
+        "ratings": array('d', (product['rating'] for product in products)).tobytes(),
+        "in_stock": bytes(bool(product['in_stock']) for product in products),
+        "codes": codes.tobytes(),
+        "name_starts": name_starts.tobytes(),
+        "names": name_blob,
+        "lower_names": lower_blob,
+        "stats": json.dumps(stats).encode('utf-8'),
+        "price_values": array('d', prices["values"]).tobytes(),
+        "price_counts": array('Q', prices["counts"]).tobytes(),
+        "rating_values": array('d', ratings["values"]).tobytes(),
+        "rating_counts": array('Q', ratings["counts"]).tobytes(),
+        "vocabulary": '\n'.join(sorted(words)).encode('utf-8'),
+        "phrases": '\n'.join(sorted(pairs)).encode('utf-8'),
+    }
+    if lower_starts is not None:
+        sections["lower_starts"] = lower_starts.tobytes()
+
+    def header_for(start: int) -> bytes:
+        layout, offset = {}, start
+        for name, data in sections.items():
+            layout[name] = [offset, len(data)]
+            offset += -(-len(data) // _ALIGN) * _ALIGN
+        header = {"count": len(products), "categories": list(categories), "sections": layout}
+        return json.dumps(header).encode('utf-8')
+
+    # The header holds the section offsets, which depend on the header size
+    header, size = header_for(0), -1
+    while len(header) != size:
+        size = len(header)
+        start = -(-(_PREAMBLE.size + size) // _ALIGN) * _ALIGN
+        header = header_for(start)
+
+    with open(path, 'wb') as file:
+        file.write(_PREAMBLE.pack(MAGIC, VERSION, len(header)))
+        file.write(header)
+        file.write(b'\0' * (start - _PREAMBLE.size - len(header)))
+        for data in sections.values():
+            file.write(data)
+            file.write(b'\0' * (-len(data) % _ALIGN))
+
+
+def convert_json(json_path: str, path: str) -> int:
+    """Convert a JSON product list into a catalog file; return the product count"""
+    with open(json_path, encoding='utf-8') as file:
+        products = json.load(file)
+    write_catalog(products, path)
+    return len(products)
+
+
+def is_catalog_file(path: str) -> bool:
+    with open(path, 'rb') as file:
+        return file.read(len(MAGIC)) == MAGIC
+
+
+class MappedCatalog(Sequence):
+    """A catalog file mapped into memory; behaves as a read-only list of product dicts"""
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, header_size = _PREAMBLE.unpack_from(self._mmap)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"{path} is not a version {VERSION} product catalog file")
+            header = json.loads(self._mmap[_PREAMBLE.size:_PREAMBLE.size + header_size])
+        except (struct.error, ValueError) as e:
+            self._mmap.close()
+            raise ValueError(f"Invalid catalog file {path}: {e}") from None
+        self.path = path
+        self.categories: List[Any] = header["categories"]
+        self._count = header["count"]
+        self._buffer = memoryview(self._mmap)
+        self.columns: Dict[str, memoryview] = {}
+        for name, (offset, size) in header["sections"].items():
+            section = self._buffer[offset:offset + size]
+            self.columns[name] = section.cast(_COLUMNS[name]) if _COLUMNS[name] != 'B' else section
+        if "lower_starts" not in self.columns:
+            self.columns["lower_starts"] = self.columns["name_starts"]
+
+    def __len__(self) -> int:
+        return self._count
+
+    def name(self, index: int) -> str:
+        starts = self.columns["name_starts"]
+        return str(self.columns["names"][starts[index]:starts[index + 1] - 1], 'utf-8')
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("product index out of range")
+        columns = self.columns
+        return {
+            "name": self.name(index),
+            "category": self.categories[columns["codes"][index]],
+            "price": columns["prices"][index],
+            "rating": columns["ratings"][index],
+            "in_stock": bool(columns["in_stock"][index]),
+        }
+
+    def load_stats(self) -> CatalogStats:
+        """Catalog statistics computed when the file was written"""
+        columns = self.columns
+        state = json.loads(str(columns["stats"], 'utf-8'))
+        for field in ("price", "rating"):
+            state[f"{field}s"] = {"values": columns[f"{field}_values"].tolist(),
+                                  "counts": columns[f"{field}_counts"].tolist()}
+        return CatalogStats.from_state(state)
+
+    @property
+    def vocabulary(self) -> List[str]:
+        """Sorted distinct words of the product names"""
+        return self._word_list("vocabulary")
+
+    @property
+    def phrases(self) -> List[str]:
+        """Sorted distinct pairs of adjacent words in the product names"""
+        return self._word_list("phrases")
+
+    def _word_list(self, section: str) -> List[str]:
+        text = str(self.columns[section], 'utf-8')
+        return text.split('\n') if text else []
+
+    def close(self) -> None:
+        """Unmap the file; arrays still viewing its columns must be gone first"""
+        for column in self.columns.values():
+            column.release()
+        self.columns.clear()
+        self._buffer.release()
+        self._mmap.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert a JSON product list into a memory-mappable catalog file")
+    parser.add_argument('source', help="JSON file with a list of products")
+    parser.add_argument('target', help="catalog file to write, e.g. products.pcat")
+    args = parser.parse_args(argv)
+    started = time.perf_counter()
+    try:
+        count = convert_json(args.source, args.target)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    print(f"Wrote {count:,} products to {args.target} in {time.perf_counter() - started:.1f} s")
+
+
+if __name__ == '__main__':
+    main()
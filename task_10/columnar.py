@@ -0,0 +1,273 @@
+"""
+Columnar product store filtered with NumPy boolean masks.
+
+A list of product dicts costs several hundred bytes per product, and every
+filter is an interpreted loop over it. ColumnarCatalog keeps one NumPy array
+per field instead: float64 prices and ratings, a boolean stock column and
+integer category codes. Names live in one UTF-8 blob with an offsets array,
+so a product costs about 50 bytes. A query evaluates each criterion as a
+vectorized comparison and combines the masks; keywords are found with a
+byte search over the lowercased name blob. The word index used by the
+'exact', 'prefix' and 'fuzzy' keyword modes is built on first use.
+
+Products are rebuilt as dicts of the five catalog fields (name, category,
+price, rating, in_stock) only for the results. Requires numpy
+(`pip install numpy`).
+"""
+
+import re
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from catalog import KEYWORD_MATCHES
+from ranking import Ranked, check_sort, select, sort_key
+from tokens import TokenIndex
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised only without numpy
+    np = None
+
+Product = Dict[str, Any]
+
+_SEPARATOR = b'\n'
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise ImportError("The columnar product store requires numpy: pip install numpy")
+
+
+def _blob(strings: Iterable[str]) -> tuple:
+    """Join strings into one UTF-8 blob; return it with the start offset of each string"""
+    encoded = [s.encode('utf-8') for s in strings]
+    blob = _SEPARATOR.join(encoded) + _SEPARATOR
+    lengths = np.fromiter((len(e) + 1 for e in encoded), dtype=np.int64, count=len(encoded))
+    starts = np.zeros(len(encoded) + 1, dtype=np.int32 if len(blob) < 2 ** 31 else np.int64)
+    np.cumsum(lengths, out=starts[1:])
+    return blob, starts
+
+
+class ColumnarCatalog:
+    """Products stored as NumPy columns; same filter() interface as ProductCatalog"""
+
+    def __init__(self, products: Sequence[Product]):
+        _require_numpy()
+        products = list(products)
+        self._init_columns(
+            [p['name'] for p in products],
+            [p['category'] for p in products],
+            np.array([p['price'] for p in products], dtype=np.float64),
+            np.array([p['rating'] for p in products], dtype=np.float64),
+            np.array([p['in_stock'] for p in products], dtype=bool),
+        )
+
+    @classmethod
+    def from_columns(cls, names: Sequence[str], categories: Sequence[Any], prices: Any, ratings: Any,
+                     in_stock: Any) -> 'ColumnarCatalog':
+        """Build a catalog from per-field sequences without creating product dicts"""
+        _require_numpy()
+        catalog = cls.__new__(cls)
+        catalog._init_columns(names, categories, np.asarray(prices, dtype=np.float64),
+                              np.asarray(ratings, dtype=np.float64), np.asarray(in_stock, dtype=bool))
+        return catalog
+
+    @classmethod
+    def from_mapped(cls, mapped: Any) -> 'ColumnarCatalog':
+        """Use the columns of a MappedCatalog in place, without copying or parsing them"""
+        _require_numpy()
+        columns = mapped.columns
+        catalog = cls.__new__(cls)
+        catalog.prices = np.frombuffer(columns["prices"], dtype=np.float64)
+        catalog.ratings = np.frombuffer(columns["ratings"], dtype=np.float64)
+        catalog.in_stock = np.frombuffer(columns["in_stock"], dtype=bool)
+        catalog.codes = np.frombuffer(columns["codes"], dtype=np.uint16)
+        catalog.categories = list(mapped.categories)
+        catalog._category_codes = {category: code for code, category in enumerate(catalog.categories)}
+        catalog._names = columns["names"]
+        catalog._name_starts = np.frombuffer(columns["name_starts"], dtype=np.uint64).view(np.int64)
+        catalog._lower_names = columns["lower_names"]
+        catalog._lower_starts = np.frombuffer(columns["lower_starts"], dtype=np.uint64).view(np.int64)
+        if columns["lower_starts"] is columns["name_starts"]:
+            catalog._lower_starts = catalog._name_starts
+        catalog._tokens = None
+        return catalog
+
+    def _init_columns(self, names: Sequence[str], categories: Sequence[Any], prices: Any, ratings: Any,
+                      in_stock: Any) -> None:
+        names = list(names)
+        if not len(names) == len(categories) == len(prices) == len(ratings) == len(in_stock):
+            raise ValueError("All columns must have the same length")
+        self.prices = prices
+        self.ratings = ratings
+        self.in_stock = in_stock
+
+        # Categories become small integer codes into self.categories
+        self._category_codes: Dict[Any, int] = {}
+        codes = [self._category_codes.setdefault(c, len(self._category_codes)) for c in categories]
+        self.categories: List[Any] = list(self._category_codes)
+        code_type = np.int16 if len(self.categories) < 2 ** 15 else np.int32
+        self.codes = np.array(codes, dtype=code_type)
+
+        self._names, self._name_starts = _blob(names)
+        self._tokens: Optional[TokenIndex] = None
+        if self._names.isascii():
+            # ASCII lowercasing keeps every byte offset, so the offsets are shared
+            self._lower_names, self._lower_starts = self._names.lower(), self._name_starts
+        else:
+            self._lower_names, self._lower_starts = _blob([name.lower() for name in names])
+
+    def __len__(self) -> int:
+        return len(self.prices)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the columns and name blobs"""
+        total = self.prices.nbytes + self.ratings.nbytes + self.in_stock.nbytes + self.codes.nbytes
+        total += len(self._names) + self._name_starts.nbytes + len(self._lower_names)
+        if self._lower_starts is not self._name_starts:
+            total += self._lower_starts.nbytes
+        return total
+
+    def name(self, product_id: int) -> str:
+        start, end = self._name_starts[product_id], self._name_starts[product_id + 1] - 1
+        return str(self._names[start:end], 'utf-8')
+
+    def product(self, product_id: int) -> Product:
+        """Rebuild one product as a dict"""
+        return {
+            "name": self.name(product_id),
+            "category": self.categories[self.codes[product_id]],
+            "price": float(self.prices[product_id]),
+            "rating": float(self.ratings[product_id]),
+            "in_stock": bool(self.in_stock[product_id]),
+        }
+
+    def products(self, product_ids: Any) -> List[Product]:
+        """Rebuild the given products as dicts, gathering each column once"""
+        ids = np.asarray(product_ids, dtype=np.int64)
+        blob, categories = self._names, self.categories
+        starts, ends = self._name_starts[ids].tolist(), (self._name_starts[ids + 1] - 1).tolist()
+        return [
+            {"name": str(blob[start:end], 'utf-8'), "category": categories[code],
+             "price": price, "rating": rating, "in_stock": in_stock}
+            for start, end, code, price, rating, in_stock in zip(
+                starts, ends, self.codes[ids].tolist(), self.prices[ids].tolist(),
+                self.ratings[ids].tolist(), self.in_stock[ids].tolist())
+        ]
+
+    def top(self, ids: Any, sort: str = 'relevance', keywords: Optional[List[str]] = None,
+            limit: int = 10, after: Optional[Ranked] = None) -> List[Ranked]:
+        """The first `limit` (key, id) of ids in a ranking order from ranking.py, after the `after` item"""
+        check_sort(sort)
+        ids = np.asarray(ids, dtype=np.int64)
+        needles = [keyword.lower() for keyword in keywords or ()]
+        if not needles or sort != 'relevance':
+            return self._top_by_columns(ids, sort, limit, after)
+        blob, starts = self._lower_names, self._lower_starts
+        names = (str(blob[start:end - 1], 'utf-8') for start, end in
+                 zip(starts[ids].tolist(), starts[ids + 1].tolist()))
+        keyed = ((sort_key(sort, price, rating, name, needles), i) for i, price, rating, name in
+                 zip(ids.tolist(), self.prices[ids].tolist(), self.ratings[ids].tolist(), names))
+        return select(keyed, limit, after)
+
+    def _top_by_columns(self, ids: Any, sort: str, limit: int, after: Optional[Ranked]) -> List[Ranked]:
+        """top() for keys made of price and rating alone: vectorized partition instead of a heap"""
+        prices, ratings = self.prices[ids], self.ratings[ids]
+        first, second = (prices, -ratings) if sort == 'price' else (-ratings, prices)
+        if after is not None:
+            (first_after, second_after), id_after = after
+            later = (first > first_after) | ((first == first_after) & (
+                (second > second_after) | ((second == second_after) & (ids > id_after))))
+            ids, first, second = ids[later], first[later], second[later]
+        if limit <= 0 or not len(ids):
+            return []
+        if len(ids) > limit:
+            # Everything up to the limit-th smallest first key, ties included
+            keep = first <= np.partition(first, limit - 1)[limit - 1]
+            ids, first, second = ids[keep], first[keep], second[keep]
+        order = np.lexsort((ids, second, first))[:limit]
+        return [((a, b), i) for a, b, i in zip(first[order].tolist(), second[order].tolist(), ids[order].tolist())]
+
+    def filter(self, category: Optional[str] = None,
+               max_price: Optional[float] = None,
+               min_rating: Optional[float] = None,
+               in_stock_only: Optional[bool] = None,
+               keywords: Optional[List[str]] = None,
+               keyword_match: str = 'substring') -> List[Product]:
+        """Return the products matching every given criterion, in catalog order"""
+        return self.products(self.filter_ids(category, max_price, min_rating, in_stock_only, keywords,
+                                             keyword_match))
+
+    def filter_ids(self, category: Optional[str] = None,
+                   max_price: Optional[float] = None,
+                   min_rating: Optional[float] = None,
+                   in_stock_only: Optional[bool] = None,
+                   keywords: Optional[List[str]] = None,
+                   keyword_match: str = 'substring', ordered: bool = True) -> Any:
+        """Like filter(), but return an array of ascending product ids
+
+        The mask already yields ids in order, so ordered is accepted only to
+        match the other catalogs.
+        """
+        return np.flatnonzero(self.mask(category, max_price, min_rating, in_stock_only, keywords, keyword_match))
+
+    def mask(self, category: Optional[str] = None,
+             max_price: Optional[float] = None,
+             min_rating: Optional[float] = None,
+             in_stock_only: Optional[bool] = None,
+             keywords: Optional[List[str]] = None,
+             keyword_match: str = 'substring') -> Any:
+        """Boolean mask of the products matching every given criterion"""
+        if keyword_match not in KEYWORD_MATCHES:
+            raise ValueError(f"keyword_match must be one of {', '.join(KEYWORD_MATCHES)}: {keyword_match!r}")
+        mask = np.ones(len(self), dtype=bool)
+        if category:
+            code = self._category_codes.get(category)
+            if code is None:
+                return np.zeros(len(self), dtype=bool)
+            mask &= self.codes == code
+        if max_price is not None:
+            mask &= self.prices <= max_price
+        if min_rating is not None:
+            mask &= self.ratings >= min_rating
+        if in_stock_only is not None:
+            # The list filter compares with ==, so 1 and 0 select like True and False
+            if in_stock_only in (True, False):
+                mask &= self.in_stock == bool(in_stock_only)
+            else:
+                mask[:] = False
+        if keywords and keyword_match != 'substring':
+            mask &= self._token_mask(keywords, keyword_match)
+        elif keywords:
+            mask &= self._keyword_mask(keywords)
+        return mask
+
+    def _token_mask(self, keywords: List[str], mode: str) -> Any:
+        """Products whose name matches any keyword by words"""
+        if self._tokens is None:
+            self._tokens = TokenIndex(self.name(i) for i in range(len(self)))
+        mask = np.zeros(len(self), dtype=bool)
+        for keyword in keywords:
+            ids = self._tokens.search(keyword, mode)
+            if ids is None:
+                return np.ones(len(self), dtype=bool)
+            mask[np.fromiter(ids, dtype=np.int64, count=len(ids))] = True
+        return mask
+
+    def _keyword_mask(self, keywords: List[str]) -> Any:
+        """Products whose lowercased name contains any keyword"""
+        mask = np.zeros(len(self), dtype=bool)
+        blob, starts = self._lower_names, self._lower_starts
+        for keyword in keywords:
+            needle = keyword.lower().encode('utf-8')
+            if not needle:
+                return np.ones(len(self), dtype=bool)
+            if _SEPARATOR in needle:
+                # A blob search could match across names; check each name instead
+                mask |= np.fromiter((needle in blob[starts[i]:starts[i + 1] - 1] for i in range(len(self))),
+                                    dtype=bool, count=len(self))
+                continue
+            positions = np.fromiter((match.start() for match in re.finditer(re.escape(needle), blob)),
+                                    dtype=np.int64)
+            mask[np.searchsorted(starts, positions, side='right') - 1] = True
+        return mask
@@ -0,0 +1,399 @@
+"""
+Product catalog that takes updates while it is being queried.
+
+ProductCatalog and the columnar store are built once from a product list;
+changing a price means building them again. LiveCatalog keeps the same
+indexes in persistent structures (see persistent.py):
+
+- a vector of products by id, and a sorted map from name to id
+- category, stock and name trigram postings, as sorted sets of ids
+- sorted maps from (price, id) and (rating, id) to id, searched by rank
+- a LiveTokenIndex of name words
+
+upsert() and delete() return a new catalog after O(log n) work per index
+entry the product touches, and leave the old catalog as it was. A writer
+publishes the new catalog by replacing a single reference; a query that
+started on the old one finishes on that consistent snapshot. Readers never
+wait for writers, and queries give the same results, in the same order, as
+a ProductCatalog of the live products.
+
+Products are identified by name. An updated product keeps its id, so its
+place in catalog order; new products get the next id. Deleted ids are not
+reused.
+
+Changes are dicts, as sent to the update API or written one per line to a
+changelog file:
+
+    {"op": "upsert", "product": {"name": "Yoga Mat", "price": 24.99, ...}}
+    {"op": "delete", "name": "Yoga Mat"}
+
+ChangelogWatcher follows a changelog file and hands appended changes to a
+callback.
+"""
+
+import json
+import math
+import os
+import threading
+from typing import Any, Callable, Collection, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from catalog import (KEYWORD_MATCHES, Criterion, keyword_estimate, keyword_ids, rank_ids, run_criteria, token_ids,
+                     trigrams)
+from persistent import EMPTY, SortedMap, Vector, add_posting, postings_from, remove_posting
+from ranking import Ranked
+from tokens import LiveTokenIndex
+
+Product = Dict[str, Any]
+
+FIELDS = ('name', 'category', 'price', 'rating', 'in_stock')
+CHANGE_OPS = ('upsert', 'delete')
+
+
+def parse_change(change: Any) -> Dict[str, Any]:
+    """
+    Check a decoded change and return it as {"op": "upsert", "product": {...}} or {"op": "delete", "name": ...}.
+    An upsert may leave out fields other than the name, to update only some fields of a known product.
+    Raises ValueError if the change is malformed.
+    """
+    if not isinstance(change, dict):
+        raise ValueError(f"A change must be an object, not {type(change).__name__}")
+    op = change.get('op')
+    if op not in CHANGE_OPS:
+        raise ValueError(f"Change op must be one of {', '.join(CHANGE_OPS)}: {op!r}")
+    if op == 'delete':
+        if not isinstance(change.get('name'), str):
+            raise ValueError("A delete needs the product name")
+        return {"op": op, "name": change['name']}
+
+    product = change.get('product')
+    if not isinstance(product, dict) or not isinstance(product.get('name'), str):
+        raise ValueError("An upsert needs a product with a name")
+    unknown = sorted(set(product) - set(FIELDS))
+    if unknown:
+        raise ValueError(f"Unknown product fields: {', '.join(unknown)}")
+    if 'category' in product and not isinstance(product['category'], str):
+        raise ValueError("category must be a string")
+    for field in ('price', 'rating'):
+        value = product.get(field, 0)
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or math.isnan(value):
+            raise ValueError(f"{field} must be a number")
+    if 'in_stock' in product and not isinstance(product['in_stock'], bool):
+        raise ValueError("in_stock must be true or false")
+    return {"op": op, "product": dict(product)}
+
+
+class LiveCatalog:
+    """Products plus persistent indexes; upsert() and delete() return an updated catalog"""
+
+    def __init__(self, products: Iterable[Product] = ()):
+        products = [dict(product) for product in products]
+        names = [product['name'].lower() for product in products]
+        positions = sorted((product['name'], i) for i, product in enumerate(products))
+        for (name, _), (following, _) in zip(positions, positions[1:]):
+            if name == following:
+                raise ValueError(f"Product names must be unique to update products by name: {name!r}")
+
+        by_category: Dict[Any, List[int]] = {}
+        by_stock: Dict[bool, List[int]] = {True: [], False: []}
+        by_trigram: Dict[str, List[int]] = {}
+        for product_id, (product, name) in enumerate(zip(products, names)):
+            by_category.setdefault(product['category'], []).append(product_id)
+            by_stock[bool(product['in_stock'])].append(product_id)
+            for gram in trigrams(name):
+                by_trigram.setdefault(gram, []).append(product_id)
+
+        # Record per id: (product, lowercased name), or None once deleted
+        self._records = Vector(zip(products, names))
+        self._ids = SortedMap.from_sorted(positions)
+        self._count = len(products)
+        self._by_category = postings_from(by_category)
+        # (price, id) -> id and (rating, id) -> id, so that ids in a range come straight from the values
+        self._prices = SortedMap.from_sorted(sorted(((p['price'], i), i) for i, p in enumerate(products)))
+        self._ratings = SortedMap.from_sorted(sorted(((p['rating'], i), i) for i, p in enumerate(products)))
+        self._by_stock = {flag: SortedMap.from_keys(ids, distinct=True) for flag, ids in by_stock.items()}
+        self._by_trigram = postings_from(by_trigram)
+        self._tokens = LiveTokenIndex(names)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[Product]:
+        """Live products in catalog order"""
+        return (record[0] for record in self._records if record is not None)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._ids
+
+    def get(self, name: str) -> Optional[Product]:
+        """The product with this name, or None"""
+        product_id = self._ids.get(name)
+        return None if product_id is None else self._records[product_id][0]
+
+    def product(self, product_id: int) -> Product:
+        record = self._records[product_id]
+        if record is None:
+            raise KeyError(product_id)
+        return record[0]
+
+    def upsert(self, product: Product) -> 'LiveCatalog':
+        """A catalog with product added, or replacing the product of the same name; product needs every field"""
+        missing = [field for field in FIELDS if field not in product]
+        if missing:
+            raise ValueError(f"Product {product.get('name')!r} is missing {', '.join(missing)}")
+        catalog = self._copy()
+        product_id = self._ids.get(product['name'])
+        if product_id is None:
+            catalog._link(len(self._records), dict(product))
+        else:
+            catalog._update(product_id, dict(product))
+        return catalog
+
+    def delete(self, name: str) -> 'LiveCatalog':
+        """A catalog without the named product; KeyError if there is none"""
+        product_id = self._ids[name]
+        catalog = self._copy()
+        catalog._unlink(product_id)
+        return catalog
+
+    def _copy(self) -> 'LiveCatalog':
+        # Every attribute is immutable or replaced rather than changed, so a shallow copy is a new snapshot
+        catalog = LiveCatalog.__new__(LiveCatalog)
+        catalog.__dict__.update(self.__dict__)
+        return catalog
+
+    def _link(self, product_id: int, product: Product) -> None:
+        """Add product under product_id to every index"""
+        name = product['name'].lower()
+        flag = bool(product['in_stock'])
+        self._records = self._records.set(product_id, (product, name))
+        self._ids = self._ids.set(product['name'], product_id)
+        self._count += 1
+        self._by_category = add_posting(self._by_category, product['category'], product_id)
+        self._prices = self._prices.set((product['price'], product_id), product_id)
+        self._ratings = self._ratings.set((product['rating'], product_id), product_id)
+        self._by_stock = {**self._by_stock, flag: self._by_stock[flag].set(product_id)}
+        for gram in trigrams(name):
+            self._by_trigram = add_posting(self._by_trigram, gram, product_id)
+        self._tokens = self._tokens.add(product_id, name)
+
+    def _update(self, product_id: int, product: Product) -> None:
+        """Replace the product under product_id with one of the same name, in the indexes of changed fields only"""
+        old, name = self._records[product_id]
+        self._records = self._records.set(product_id, (product, name))
+        if product['category'] != old['category']:
+            self._by_category = remove_posting(self._by_category, old['category'], product_id)
+            self._by_category = add_posting(self._by_category, product['category'], product_id)
+        if product['price'] != old['price']:
+            self._prices = self._prices.remove((old['price'], product_id))
+            self._prices = self._prices.set((product['price'], product_id), product_id)
+        if product['rating'] != old['rating']:
+            self._ratings = self._ratings.remove((old['rating'], product_id))
+            self._ratings = self._ratings.set((product['rating'], product_id), product_id)
+        flag = bool(product['in_stock'])
+        if flag != bool(old['in_stock']):
+            self._by_stock = {flag: self._by_stock[flag].set(product_id),
+                              not flag: self._by_stock[not flag].remove(product_id)}
+
+    def _unlink(self, product_id: int) -> None:
+        """Remove the product under product_id from every index"""
+        product, name = self._records[product_id]
+        flag = bool(product['in_stock'])
+        self._records = self._records.set(product_id, None)
+        self._ids = self._ids.remove(product['name'])
+        self._count -= 1
+        self._by_category = remove_posting(self._by_category, product['category'], product_id)
+        self._prices = self._prices.remove((product['price'], product_id))
+        self._ratings = self._ratings.remove((product['rating'], product_id))
+        self._by_stock = {**self._by_stock, flag: self._by_stock[flag].remove(product_id)}
+        for gram in trigrams(name):
+            self._by_trigram = remove_posting(self._by_trigram, gram, product_id)
+        self._tokens = self._tokens.remove(product_id, name)
+
+    def _all_ids(self) -> Iterable[int]:
+        if self._count == len(self._records):
+            return range(self._count)
+        return [i for i, record in enumerate(self._records) if record is not None]
+
+    def top(self, ids: Iterable[int], sort: str = 'relevance', keywords: Optional[List[str]] = None,
+            limit: int = 10, after: Optional[Ranked] = None) -> List[Ranked]:
+        """The first `limit` (key, id) of ids in a ranking order from ranking.py, after the `after` item"""
+        records = self._records
+
+        def fields(i: int) -> Tuple[float, float, str]:
+            product, name = records[i]
+            return product['price'], product['rating'], name
+
+        return rank_ids(ids, fields, sort, keywords, limit, after)
+
+    def filter(self, category: Optional[str] = None,
+               max_price: Optional[float] = None,
+               min_rating: Optional[float] = None,
+               in_stock_only: Optional[bool] = None,
+               keywords: Optional[List[str]] = None,
+               keyword_match: str = 'substring') -> List[Product]:
+        """Return the products matching every given criterion, in catalog order (see ProductCatalog.filter)"""
+        records = self._records
+        return [records[i][0] for i in self.filter_ids(category, max_price, min_rating,
+                                                       in_stock_only, keywords, keyword_match)]
+
+    def filter_ids(self, category: Optional[str] = None,
+                   max_price: Optional[float] = None,
+                   min_rating: Optional[float] = None,
+                   in_stock_only: Optional[bool] = None,
+                   keywords: Optional[List[str]] = None,
+                   keyword_match: str = 'substring', ordered: bool = True) -> List[int]:
+        """Like filter(), but return ascending product ids, or ids in any order if ordered is false"""
+        if keyword_match not in KEYWORD_MATCHES:
+            raise ValueError(f"keyword_match must be one of {', '.join(KEYWORD_MATCHES)}: {keyword_match!r}")
+        criteria: List[Criterion] = []
+        if category:
+            category_ids = self._category_ids(category)
+            criteria.append((len(category_ids), lambda: list(category_ids), True,
+                             self._narrower(len(category_ids), lambda: category_ids,
+                                            lambda product, _: product['category'] == category)))
+        if max_price is not None:
+            stop = (max_price, math.inf)
+            price_ids = lambda: list(self._prices.values(stop=stop))
+            count = self._prices.rank(stop)
+            criteria.append((count, price_ids, False,
+                             self._narrower(count, price_ids, lambda product, _: product['price'] <= max_price)))
+        if min_rating is not None:
+            start = (min_rating, -math.inf)
+            rating_ids = lambda: list(self._ratings.values(start))
+            count = len(self._ratings) - self._ratings.rank(start)
+            criteria.append((count, rating_ids, False,
+                             self._narrower(count, rating_ids, lambda product, _: product['rating'] >= min_rating)))
+        if in_stock_only is not None:
+            stock_ids = self._by_stock.get(in_stock_only, EMPTY)
+            flag = bool(in_stock_only)
+            criteria.append((len(stock_ids), lambda: list(stock_ids), True,
+                             self._narrower(len(stock_ids), lambda: stock_ids,
+                                            lambda product, _: bool(product['in_stock']) == flag)))
+        if keywords and keyword_match != 'substring':
+            matched = token_ids(self._tokens, keywords, keyword_match)
+            if matched is not None:
+                criteria.append((len(matched), lambda: matched, False,
+                                 lambda ids: [i for i in ids if i in matched]))
+        elif keywords:
+            needles = [keyword.lower() for keyword in keywords]
+            count = keyword_estimate(self._by_trigram, needles, len(self))
+            records = self._records
+            matching = lambda: keyword_ids(self._by_trigram, needles, lambda i: records[i][1], self._all_ids)
+            criteria.append((count, matching, False,
+                             self._narrower(count, matching,
+                                            lambda _, name: any(n in name for n in needles))))
+        return run_criteria(criteria, len(self), self._all_ids, ordered)
+
+    def _narrower(self, count: int, members: Callable[[], Iterable[int]],
+                  check: Callable[[Product, str], bool]) -> Callable[[Collection[int]], List[int]]:
+        """
+        Filter over ids for a criterion matching about `count` products: few ids are checked one by one with
+        check(product, lowercased name), many against the set of the criterion's ids, which is cheaper to
+        build than that many record lookups.
+        """
+        records = self._records
+
+        def narrow(ids: Collection[int]) -> List[int]:
+            if len(ids) * 16 < count:
+                return [i for i in ids if check(*records[i])]
+            allowed = set(members())
+            return [i for i in ids if i in allowed]
+
+        return narrow
+
+    def _category_ids(self, category: Any) -> SortedMap:
+        try:
+            return self._by_category.get(category, EMPTY)
+        except TypeError:
+            # Not comparable with the category names, so not one of them
+            return EMPTY
+
+class ChangelogWatcher:
+    """Follows an NDJSON changelog file and applies the changes appended to it
+
+    Args:
+        path: changelog file, one change per line; it need not exist yet
+        apply: called with each batch of checked changes, in file order
+        interval: seconds between checks of the file when started as a thread
+    """
+
+    def __init__(self, path: str, apply: Callable[[List[Dict[str, Any]]], Any], interval: float = 1.0):
+        self.path = path
+        self.apply = apply
+        self.interval = interval
+        self.offset = 0
+        self.applied = 0
+        self.rejected = 0
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def poll(self) -> int:
+        """Apply the complete lines written since the last poll; returns the number of changes applied"""
+        try:
+            with open(self.path, 'rb') as file:
+                size = file.seek(0, os.SEEK_END)
+                if size < self.offset:
+                    # Truncated, or replaced by a shorter file: read it from the start
+                    self.offset = 0
+                file.seek(self.offset)
+                data = file.read(size - self.offset)
+        except FileNotFoundError:
+            return 0
+        # A line without its newline is still being written
+        end = data.rfind(b'\n') + 1
+        self.offset += end
+        changes = []
+        for line in data[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                changes.append(parse_change(json.loads(line)))
+            except ValueError as e:
+                self._reject(e)
+        return self._apply(changes)
+
+    def _apply(self, changes: List[Dict[str, Any]]) -> int:
+        if len(changes) > 1:
+            try:
+                self.apply(changes)
+            except (KeyError, ValueError, TypeError):
+                # A batch applies all or nothing: retry one by one to keep the valid changes
+                pass
+            else:
+                self.applied += len(changes)
+                return len(changes)
+        return sum(self._apply_one(change) for change in changes)
+
+    def _apply_one(self, change: Dict[str, Any]) -> int:
+        try:
+            self.apply([change])
+        except (KeyError, ValueError, TypeError) as e:
+            self._reject(e)
+            return 0
+        self.applied += 1
+        return 1
+
+    def _reject(self, error: Exception) -> None:
+        self.rejected += 1
+        print(f"Changelog {self.path}: skipped invalid change: {error}")
+
+    def start(self) -> 'ChangelogWatcher':
+        """Poll the file every `interval` seconds from a daemon thread until stop()"""
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name=f"changelog {self.path}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                self.poll()
+            except (OSError, KeyError, ValueError, TypeError) as e:
+                print(f"Changelog {self.path}: {e}")
+            self._stopped.wait(self.interval)
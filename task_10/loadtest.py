@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Load test of the search service against a local mock of the completions endpoint.
+
+MockCompletions answers POST .../chat/completions the way the OpenAI API
+does, with a filter_products tool call after a fixed latency, and records
+how many calls it received and how many were in flight at once. run_load()
+sends searches to a service from many keep-alive connections and measures
+their latency.
+
+Run with:
+
+    python3 loadtest.py --requests 2000 --clients 100 --distinct 200 --latency 0.3
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlencode
+
+from openai import AsyncOpenAI
+
+from product_search import MODEL, ProductSearchTool
+from query_cache import QueryCache
+from service import SearchService, percentile, read_request, write_response
+from tokens import tokenize
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def keyword_answer(query: str) -> Dict[str, Any]:
+    """Mock answer: the query's last word as a keyword"""
+    return {"keywords": tokenize(query)[-1:]}
+
+
+class MockCompletions:
+    """Local stand-in for the chat completions endpoint
+
+    Args:
+        latency: seconds each completion takes
+        answer: filter_products arguments for a user query
+    """
+
+    def __init__(self, latency: float = 0.1, answer: Callable[[str], Dict[str, Any]] = keyword_answer):
+        self.latency = latency
+        self.answer = answer
+        self.calls = 0
+        self.active = 0
+        self.peak = 0
+        self.url: Optional[str] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> str:
+        """Start listening; returns the base URL to give the OpenAI client"""
+        self._server = await asyncio.start_server(self._serve_connection, host, port)
+        host, port = self._server.sockets[0].getsockname()[:2]
+        self.url = f"http://{host}:{port}/v1"
+        return self.url
+
+    async def close(self) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+
+    def completion(self, query: str) -> Dict[str, Any]:
+        tool_call = {"id": f"call_{self.calls}", "type": "function",
+                     "function": {"name": "filter_products", "arguments": json.dumps(self.answer(query))}}
+        return {"id": f"chatcmpl-mock-{self.calls}", "object": "chat.completion", "created": int(time.time()),
+                "model": MODEL, "choices": [{"index": 0, "finish_reason": "tool_calls", "message": {
+                    "role": "assistant", "content": None, "tool_calls": [tool_call]}}]}
+
+    async def _serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request = await read_request(reader)
+                if request is None:
+                    break
+                method, target, _, body = request
+                if method != 'POST' or not target.endswith('/chat/completions'):
+                    write_response(writer, 404, {"error": {"message": f"Not found: {target}"}})
+                    continue
+                self.calls += 1
+                self.active += 1
+                self.peak = max(self.peak, self.active)
+                try:
+                    await asyncio.sleep(self.latency)
+                finally:
+                    self.active -= 1
+                query = json.loads(body)["messages"][-1]["content"]
+                write_response(writer, 200, self.completion(query))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def request(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, method: str, target: str,
+                  payload: Any = None) -> Tuple[int, Any]:
+    """Send a request with an optional JSON payload over a keep-alive connection; returns the status and JSON body"""
+    body = b'' if payload is None else json.dumps(payload).encode('utf-8')
+    writer.write(f"{method} {target} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n\r\n"
+                 .encode('latin-1') + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def get(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, target: str) -> Tuple[int, Any]:
+    """Send a GET over a keep-alive connection; returns the status and decoded JSON body"""
+    return await request(reader, writer, 'GET', target)
+
+
+class LoadResult(NamedTuple):
+    requests: int
+    seconds: float
+    latencies: List[float]
+    statuses: Counter
+
+    @property
+    def throughput(self) -> float:
+        return self.requests / self.seconds if self.seconds else 0.0
+
+    def __str__(self) -> str:
+        ordered = sorted(self.latencies)
+        statuses = ", ".join(f"{status}: {count}" for status, count in sorted(self.statuses.items()))
+        return (f"{self.requests} requests in {self.seconds:.2f} s ({self.throughput:.0f} req/s), "
+                f"p50 {percentile(ordered, 0.5) * 1000:.0f} ms, p99 {percentile(ordered, 0.99) * 1000:.0f} ms "
+                f"(status {statuses})")
+
+
+async def run_load(host: str, port: int, queries: List[str], requests: int, clients: int) -> LoadResult:
+    """Send `requests` searches cycling through queries from `clients` concurrent connections"""
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    pending = iter(range(requests))
+
+    async def client() -> None:
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            # The shared iterator hands each request to whichever client is free
+            for i in pending:
+                started = time.perf_counter()
+                status, _ = await get(reader, writer, "/search?" + urlencode({"q": queries[i % len(queries)]}))
+                latencies.append(time.perf_counter() - started)
+                statuses[status] += 1
+        finally:
+            writer.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    return LoadResult(requests, time.perf_counter() - started, latencies, statuses)
+
+
+def make_queries(names: List[str], count: int, seed: int = 0) -> List[str]:
+    """Distinct queries the local parser leaves to the model"""
+    rng = random.Random(seed)
+    words = sorted({word for name in names for word in tokenize(name)})
+    return [f"a present for someone who likes {rng.choice(words)} #{i}" for i in range(count)]
+
+
+async def load_test(requests: int = 2000, clients: int = 100, distinct: int = 200, latency: float = 0.3,
+                    concurrency: int = 32, timeout: float = 10.0) -> None:
+    mock = MockCompletions(latency)
+    await mock.start()
+    tool = ProductSearchTool(client=object(), products_path=os.path.join(HERE, 'products.json'),
+                             cache=QueryCache("loadtest"))
+    service = SearchService(tool, AsyncOpenAI(api_key="mock", base_url=mock.url, max_retries=0),
+                            max_concurrency=concurrency, timeout=timeout)
+    server = await service.start(port=0)
+    host, port = server.sockets[0].getsockname()[:2]
+    queries = make_queries([product['name'] for product in tool.products], distinct)
+    # Shuffled so that repeats of a query arrive both during and after its completion call
+    rng = random.Random(1)
+    schedule = [rng.choice(queries) for _ in range(requests)]
+    try:
+        result = await run_load(host, port, schedule, requests, clients)
+    finally:
+        server.close()
+        await server.wait_closed()
+        await service.close()
+        await mock.close()
+    print(f"Load test: {clients} clients, {len(set(schedule))} distinct queries, "
+          f"mock completion latency {latency * 1000:.0f} ms, {concurrency} calls in flight at most")
+    print(f"  {result}")
+    print(f"  service: {service.stats}")
+    print(f"  mock endpoint: {mock.calls} calls, at most {mock.peak} at once")
+    print(f"  query paths: {tool.path_report()}")
+    print(f"  one query at a time, the completion calls alone would take {mock.calls * latency:.1f} s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the search service against a mock completions endpoint")
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--clients', type=int, default=100, help="concurrent connections")
+    parser.add_argument('--distinct', type=int, default=200, help="distinct queries to cycle through")
+    parser.add_argument('--latency', type=float, default=0.3, help="seconds per mock completion")
+    parser.add_argument('--concurrency', type=int, default=32, help="completion calls in flight at once")
+    parser.add_argument('--timeout', type=float, default=10.0, help="seconds allowed per search")
+    args = parser.parse_args(argv)
+    asyncio.run(load_test(args.requests, args.clients, args.distinct, args.latency, args.concurrency,
+                          args.timeout))
+
+
+if __name__ == '__main__':
+    main()
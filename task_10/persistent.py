@@ -0,0 +1,336 @@
+"""
+Persistent (immutable) sorted map and vector.
+
+An update returns a new structure and leaves the old one untouched. Only
+the O(log n) nodes on the path to the change are copied, and everything
+else is shared, so keeping an old version costs nothing. This is what lets
+a live catalog publish a new snapshot per change while readers keep using
+the one they started with, without locks.
+
+- SortedMap: a treap (a binary search tree kept balanced by random heap
+  priorities) whose nodes each hold a sorted chunk of up to 64 keys, with
+  subtree sizes, for ordered iteration from any key and counting the keys
+  below a key. Chunks keep the node count, memory and iteration cost of
+  large posting lists close to those of a flat array; an update copies one
+  chunk plus the path to it.
+- Vector: a 32-way trie indexed by position, for O(1)-like reads of
+  records by id
+
+Nodes are plain tuples, which are immutable and cheap to build.
+"""
+
+import random
+from bisect import bisect_left
+from itertools import chain
+from typing import Any, Dict, Iterable, Iterator, Optional, Sequence, Tuple
+
+# A treap node is (keys, values, priority, left, right, size): a sorted chunk
+# of keys with their values, and the number of keys in the subtree
+_KEYS, _VALUES, _PRIORITY, _LEFT, _RIGHT, _SIZE = range(6)
+
+# Chunks built in bulk hold _CHUNK keys; an insert splits a chunk that grows past twice that
+_CHUNK = 32
+
+_random = random.Random()
+
+
+def _size(node) -> int:
+    return node[_SIZE] if node is not None else 0
+
+
+def _node(keys: tuple, values: tuple, priority: float, left, right) -> tuple:
+    return (keys, values, priority, left, right, _size(left) + _size(right) + len(keys))
+
+
+def _split(node, key) -> tuple:
+    """(chunks starting below key, chunks starting from key on); no chunk may hold keys on both sides"""
+    if node is None:
+        return None, None
+    keys, values, priority = node[_KEYS], node[_VALUES], node[_PRIORITY]
+    if keys[0] < key:
+        left, right = _split(node[_RIGHT], key)
+        return _node(keys, values, priority, node[_LEFT], left), right
+    left, right = _split(node[_LEFT], key)
+    return left, _node(keys, values, priority, right, node[_RIGHT])
+
+
+def _merge(low, high):
+    """Join two treaps whose keys are all ordered low before high"""
+    if low is None:
+        return high
+    if high is None:
+        return low
+    if low[_PRIORITY] > high[_PRIORITY]:
+        return _node(low[_KEYS], low[_VALUES], low[_PRIORITY], low[_LEFT], _merge(low[_RIGHT], high))
+    return _node(high[_KEYS], high[_VALUES], high[_PRIORITY], _merge(low, high[_LEFT]), high[_RIGHT])
+
+
+def _locate(node, key):
+    """The node whose chunk holds key, or would if key were added"""
+    while True:
+        keys = node[_KEYS]
+        if key < keys[0] and node[_LEFT] is not None:
+            node = node[_LEFT]
+        elif keys[-1] < key and node[_RIGHT] is not None:
+            node = node[_RIGHT]
+        else:
+            return node
+
+
+def _rechunk(node, first, keys: tuple, values: tuple):
+    """Replace the chunk starting with key `first`; an empty chunk removes its node"""
+    chunk_first = node[_KEYS][0]
+    if first == chunk_first:
+        if not keys:
+            return _merge(node[_LEFT], node[_RIGHT])
+        return _node(keys, values, node[_PRIORITY], node[_LEFT], node[_RIGHT])
+    if first < chunk_first:
+        return _node(node[_KEYS], node[_VALUES], node[_PRIORITY], _rechunk(node[_LEFT], first, keys, values),
+                     node[_RIGHT])
+    return _node(node[_KEYS], node[_VALUES], node[_PRIORITY], node[_LEFT],
+                 _rechunk(node[_RIGHT], first, keys, values))
+
+
+def _insert(node, keys: tuple, values: tuple, priority: float):
+    """Add a chunk whose keys fall between two existing chunks"""
+    if node is None:
+        return (keys, values, priority, None, None, len(keys))
+    if priority > node[_PRIORITY]:
+        left, right = _split(node, keys[0])
+        return _node(keys, values, priority, left, right)
+    if keys[0] < node[_KEYS][0]:
+        return _node(node[_KEYS], node[_VALUES], node[_PRIORITY], _insert(node[_LEFT], keys, values, priority),
+                     node[_RIGHT])
+    return _node(node[_KEYS], node[_VALUES], node[_PRIORITY], node[_LEFT],
+                 _insert(node[_RIGHT], keys, values, priority))
+
+
+def _build(chunks: Sequence[Tuple[tuple, tuple]], low: int, high: int, depth: int, height: int):
+    """Balanced treap of chunks[low:high]; deeper levels get lower priority bands, keeping the heap order"""
+    if low >= high:
+        return None
+    middle = (low + high) // 2
+    keys, values = chunks[middle]
+    priority = (height - depth + _random.random()) / (height + 1)
+    return _node(keys, values, priority, _build(chunks, low, middle, depth + 1, height),
+                 _build(chunks, middle + 1, high, depth + 1, height))
+
+
+class SortedMap:
+    """Immutable map with keys in sorted order; set() and remove() return a new map"""
+
+    __slots__ = ('_root',)
+
+    def __init__(self, root=None):
+        self._root = root
+
+    @classmethod
+    def from_sorted(cls, items: Sequence[Tuple[Any, Any]]) -> 'SortedMap':
+        """Build in O(n) from (key, value) pairs in strictly increasing key order"""
+        return cls._from_columns([key for key, _ in items], [value for _, value in items])
+
+    @classmethod
+    def from_keys(cls, keys: Iterable[Any], distinct: bool = False) -> 'SortedMap':
+        """A map from each of the given keys to None, used as a sorted set; distinct skips removing duplicates"""
+        keys = sorted(keys if distinct else set(keys))
+        return cls._from_columns(keys, [None] * len(keys))
+
+    @classmethod
+    def _from_columns(cls, keys: Sequence[Any], values: Sequence[Any]) -> 'SortedMap':
+        chunks = [(tuple(keys[i:i + _CHUNK]), tuple(values[i:i + _CHUNK])) for i in range(0, len(keys), _CHUNK)]
+        return cls(_build(chunks, 0, len(chunks), 0, max(1, len(chunks)).bit_length()))
+
+    def __len__(self) -> int:
+        return _size(self._root)
+
+    def __bool__(self) -> bool:
+        return self._root is not None
+
+    def _find(self, key) -> Tuple[Optional[tuple], int]:
+        """(node whose chunk holds key, its index there), or (None, -1)"""
+        if self._root is None:
+            return None, -1
+        node = _locate(self._root, key)
+        keys = node[_KEYS]
+        index = bisect_left(keys, key)
+        if index < len(keys) and keys[index] == key:
+            return node, index
+        return None, -1
+
+    def __contains__(self, key) -> bool:
+        return self._find(key)[0] is not None
+
+    def get(self, key, default=None):
+        node, index = self._find(key)
+        return default if node is None else node[_VALUES][index]
+
+    def __getitem__(self, key):
+        node, index = self._find(key)
+        if node is None:
+            raise KeyError(key)
+        return node[_VALUES][index]
+
+    def set(self, key, value=None) -> 'SortedMap':
+        if self._root is None:
+            return SortedMap(((key,), (value,), _random.random(), None, None, 1))
+        node = _locate(self._root, key)
+        keys, values = node[_KEYS], node[_VALUES]
+        index = bisect_left(keys, key)
+        if index < len(keys) and keys[index] == key:
+            values = values[:index] + (value,) + values[index + 1:]
+        else:
+            keys = keys[:index] + (key,) + keys[index:]
+            values = values[:index] + (value,) + values[index:]
+        if len(keys) <= 2 * _CHUNK:
+            return SortedMap(_rechunk(self._root, node[_KEYS][0], keys, values))
+        # Split the full chunk; its upper half becomes a node of its own
+        root = _rechunk(self._root, node[_KEYS][0], keys[:_CHUNK], values[:_CHUNK])
+        return SortedMap(_insert(root, keys[_CHUNK:], values[_CHUNK:], _random.random()))
+
+    def remove(self, key) -> 'SortedMap':
+        """The map without key; KeyError if it has no such key"""
+        node, index = self._find(key)
+        if node is None:
+            raise KeyError(key)
+        keys, values = node[_KEYS], node[_VALUES]
+        return SortedMap(_rechunk(self._root, keys[0], keys[:index] + keys[index + 1:],
+                                  values[:index] + values[index + 1:]))
+
+    def rank(self, key) -> int:
+        """Number of keys below key"""
+        node, count = self._root, 0
+        while node is not None:
+            keys = node[_KEYS]
+            if not keys[0] < key:
+                node = node[_LEFT]
+            elif keys[-1] < key:
+                count += _size(node[_LEFT]) + len(keys)
+                node = node[_RIGHT]
+            else:
+                return count + _size(node[_LEFT]) + bisect_left(keys, key)
+        return count
+
+    def _slices(self, start=None, stop=None) -> Iterator[Tuple[tuple, int, int]]:
+        """(node, begin, end) covering the keys with start <= key < stop, in key order"""
+        stack = []
+        node = self._root
+        while node is not None:
+            if start is not None and node[_KEYS][-1] < start:
+                node = node[_RIGHT]
+            else:
+                stack.append(node)
+                node = node[_LEFT]
+        while stack:
+            node = stack.pop()
+            keys = node[_KEYS]
+            begin = bisect_left(keys, start) if start is not None and keys[0] < start else 0
+            if stop is not None and not keys[-1] < stop:
+                yield node, begin, bisect_left(keys, stop)
+                return
+            yield node, begin, len(keys)
+            node = node[_RIGHT]
+            while node is not None:
+                stack.append(node)
+                node = node[_LEFT]
+
+    def keys(self, start=None, stop=None) -> Iterator[Any]:
+        """Keys with start <= key < stop (either bound optional), in order"""
+        return chain.from_iterable(node[_KEYS][begin:end] for node, begin, end in self._slices(start, stop))
+
+    def items(self, start=None, stop=None) -> Iterator[Tuple[Any, Any]]:
+        return chain.from_iterable(zip(node[_KEYS][begin:end], node[_VALUES][begin:end])
+                                   for node, begin, end in self._slices(start, stop))
+
+    def values(self, start=None, stop=None) -> Iterator[Any]:
+        return chain.from_iterable(node[_VALUES][begin:end] for node, begin, end in self._slices(start, stop))
+
+    def __iter__(self) -> Iterator[Any]:
+        return self.keys()
+
+    def __repr__(self) -> str:
+        return f"SortedMap({list(self.items())!r})"
+
+
+EMPTY = SortedMap()
+
+
+def add_posting(index: SortedMap, key: Any, item: Any) -> SortedMap:
+    """index (a map from keys to sorted sets) with item added to key's set"""
+    return index.set(key, index.get(key, EMPTY).set(item))
+
+
+def remove_posting(index: SortedMap, key: Any, item: Any) -> SortedMap:
+    """index with item removed from key's set, and key removed once its set is empty"""
+    items = index[key].remove(item)
+    return index.set(key, items) if items else index.remove(key)
+
+
+def postings_from(groups: Dict[Any, Iterable[Any]]) -> SortedMap:
+    """Map from each key of groups to the sorted set of its items, which must be distinct, built in bulk"""
+    return SortedMap.from_sorted([(key, SortedMap.from_keys(items, distinct=True))
+                                  for key, items in sorted(groups.items())])
+
+_BITS = 5
+_WIDTH = 1 << _BITS
+_MASK = _WIDTH - 1
+
+
+def _assoc(node: tuple, shift: int, index: int, value: Any) -> tuple:
+    slot = (index >> shift) & _MASK
+    if shift:
+        value = _assoc(node[slot] if slot < len(node) else (), shift - _BITS, index, value)
+    return node[:slot] + (value,) + node[slot + 1:]
+
+
+class Vector:
+    """Immutable sequence; set() returns a new vector with one item replaced or appended"""
+
+    __slots__ = ('_root', '_shift', '_count')
+
+    def __init__(self, items: Iterable[Any] = ()):
+        level = list(items)
+        self._count = len(level)
+        self._shift = 0
+        level = [tuple(level[i:i + _WIDTH]) for i in range(0, len(level), _WIDTH)] or [()]
+        while len(level) > 1:
+            level = [tuple(level[i:i + _WIDTH]) for i in range(0, len(level), _WIDTH)]
+            self._shift += _BITS
+        self._root = level[0]
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index: int) -> Any:
+        if not 0 <= index < self._count:
+            raise IndexError("vector index out of range")
+        node, shift = self._root, self._shift
+        while shift:
+            node = node[(index >> shift) & _MASK]
+            shift -= _BITS
+        return node[index & _MASK]
+
+    def set(self, index: int, value: Any) -> 'Vector':
+        """Replace the item at index, or append it if index == len(self)"""
+        if not 0 <= index <= self._count:
+            raise IndexError("vector index out of range")
+        root, shift = self._root, self._shift
+        if index >> (shift + _BITS):
+            # Full: add a level above the root
+            root, shift = (root,), shift + _BITS
+        vector = Vector.__new__(Vector)
+        vector._root = _assoc(root, shift, index, value)
+        vector._shift = shift
+        vector._count = max(self._count, index + 1)
+        return vector
+
+    def append(self, value: Any) -> 'Vector':
+        return self.set(self._count, value)
+
+    def __iter__(self) -> Iterator[Any]:
+        def walk(node, shift):
+            if shift:
+                for child in node:
+                    yield from walk(child, shift - _BITS)
+            else:
+                yield from node
+        return walk(self._root, self._shift)
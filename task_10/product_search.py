@@ -7,42 +7,242 @@ queries. It leverages OpenAI's function calling to interpret user preferences an
 filter products from a JSON dataset.
 """
 
+import inspect
 import json
 import os
 import sys
-from typing import List, Dict, Any, Optional
+import threading
+from collections import Counter
+from typing import Callable, Iterable, Iterator, List, Dict, Any, Optional, Sequence
 from openai import OpenAI
 from dotenv import load_dotenv
 
+from catalog import KEYWORD_MATCHES, ProductCatalog
+from catalog_file import MappedCatalog, is_catalog_file
+from live_catalog import ChangelogWatcher, LiveCatalog, parse_change
+from query_cache import QueryCache, fingerprint
+from query_parser import QueryParser
+from ranking import Page, check_sort, decode_cursor, encode_cursor
+from stats import CatalogStats
+
 # Load environment variables
 load_dotenv()
 
+MODEL = "gpt-4.1-mini"
+
 class ProductSearchTool:
-    def __init__(self):
-        """Initialize the product search tool with OpenAI client and products data."""
+    def __init__(self, client: Optional[Any] = None, products_path: Optional[str] = None,
+                 cache: Optional[QueryCache] = None):
+        """
+        Initialize the product search tool with OpenAI client and products data.
+        A client and cache can be passed in instead of being created from the environment.
+        Products are read from products_path, PRODUCTS_PATH or products.json.
+        """
         self.api_key = os.getenv('OPENAI_API_KEY')
-        if not self.api_key:
-            print("Error: OPENAI_API_KEY not found in environment variables.")
-            print("Please set your OpenAI API key in the .env file.")
-            sys.exit(1)
+        if client is None:
+            if not self.api_key:
+                print("Error: OPENAI_API_KEY not found in environment variables.")
+                print("Please set your OpenAI API key in the .env file.")
+                sys.exit(1)
+            client = OpenAI(api_key=self.api_key)
         
-        self.client = OpenAI(api_key=self.api_key)
+        self.client = client
+        self.products_path = products_path or os.getenv('PRODUCTS_PATH', 'products.json')
         self.products = self.load_products()
+        # Held while applying catalog updates; queries never take it
+        self._update_lock = threading.Lock()
+        self.catalog = self.build_catalog(self.products)
+        if isinstance(self.products, MappedCatalog):
+            # Precomputed when the file was written, so startup does not scan the products
+            self.stats = self.products.load_stats()
+            self.parser = QueryParser(self.stats.categories, vocabulary=self.products.vocabulary,
+                                      phrases=self.products.phrases)
+        else:
+            self.stats = CatalogStats(self.products)
+            self.parser = QueryParser(self.stats.categories, (p['name'] for p in self.products))
+        self.parser_confidence = float(os.getenv('LOCAL_PARSER_CONFIDENCE', '0.75'))
+        # How each query was answered: 'local' parser, 'cache' or 'llm'
+        self.paths: Counter = Counter()
+        self.last_path: Optional[str] = None
+        # Filter arguments the last search resolved to, for fetching further pages
+        self.last_arguments: Optional[Dict[str, Any]] = None
+        self.tool_schema: Optional[Dict[str, Any]] = None
+        self._prompt_version = None
+        self.cache = None
+        self.cache = cache if cache is not None else self.build_cache()
         
-    def load_products(self) -> List[Dict[str, Any]]:
-        """Load products from the JSON file."""
+    def load_products(self) -> Sequence[Dict[str, Any]]:
+        """
+        Load products from the JSON file, or map a catalog file written by catalog_file.py.
+        A mapped catalog is not parsed; products are read from it as needed.
+        """
         try:
-            with open('products.json', 'r', encoding='utf-8') as file:
+            if is_catalog_file(self.products_path):
+                return MappedCatalog(self.products_path)
+            with open(self.products_path, 'r', encoding='utf-8') as file:
                 return json.load(file)
         except FileNotFoundError:
-            print("Error: products.json file not found.")
+            print(f"Error: {self.products_path} file not found.")
             sys.exit(1)
         except json.JSONDecodeError:
-            print("Error: Invalid JSON format in products.json")
+            print(f"Error: Invalid JSON format in {self.products_path}")
+            sys.exit(1)
+        except ValueError as e:
+            print(f"Error: {e}")
             sys.exit(1)
     
+    def build_catalog(self, products: Sequence[Dict[str, Any]]):
+        """
+        Build the store selected by PRODUCT_STORE: 'indexed', 'columnar' (needs numpy) or 'live'.
+        The default is 'columnar' for a mapped catalog when numpy is installed, which uses
+        the mapped columns in place, and 'indexed' otherwise. The first update replaces
+        any other store with the live one (see apply_changes).
+        """
+        mapped = isinstance(products, MappedCatalog)
+        store = os.getenv('PRODUCT_STORE') or ('columnar' if mapped and self._numpy_available() else 'indexed')
+        if store == 'columnar':
+            from columnar import ColumnarCatalog
+            return ColumnarCatalog.from_mapped(products) if mapped else ColumnarCatalog(products)
+        if store == 'live':
+            return LiveCatalog(products)
+        if store != 'indexed':
+            print(f"Error: unknown PRODUCT_STORE '{store}' (expected 'indexed', 'columnar' or 'live').")
+            sys.exit(1)
+        return ProductCatalog(products)
+
+    @staticmethod
+    def _numpy_available() -> bool:
+        from columnar import np
+        return np is not None
+
+    def build_cache(self) -> QueryCache:
+        """
+        Build the query cache from QUERY_CACHE_PATH (SQLite file, empty for memory only),
+        QUERY_CACHE_TTL (seconds) and QUERY_CACHE_SIZE (in-memory entries).
+        Entries are tied to the model and tool schema and dropped when either changes.
+        """
+        return QueryCache(
+            fingerprint(MODEL, self.get_filter_function_schema()),
+            path=os.getenv('QUERY_CACHE_PATH', '.query_cache.sqlite3') or None,
+            max_entries=int(os.getenv('QUERY_CACHE_SIZE', '4096')),
+            ttl=float(os.getenv('QUERY_CACHE_TTL', '86400')),
+        )
+
+    def refresh_prompt(self) -> None:
+        """
+        Rebuild the system message and tool schema if the catalog statistics changed since they were built.
+        A changed schema also moves the query cache to the new schema's fingerprint.
+        """
+        if self._prompt_version == self.stats.version:
+            return
+        # Never wait for an update in progress: it rebuilds the prompt itself once applied
+        if self._update_lock.acquire(blocking=False):
+            try:
+                self._rebuild_prompt()
+            finally:
+                self._update_lock.release()
+
+    def _rebuild_prompt(self) -> None:
+        if self._prompt_version == self.stats.version:
+            return
+        previous_schema = self.tool_schema
+        self.tool_schema = self.build_filter_function_schema()
+        self.tools = [self.tool_schema]
+        self.system_prompt = {"role": "system", "content": self.build_system_message()}
+        self.parser.set_categories(self.stats.categories)
+        self._prompt_version = self.stats.version
+        if self.cache is not None and previous_schema is not None and previous_schema != self.tool_schema:
+            self.cache.set_fingerprint(fingerprint(MODEL, self.tool_schema))
+
+    def apply_changes(self, changes: Iterable[Dict[str, Any]]) -> int:
+        """
+        Apply upserts and deletes (see live_catalog.py) to the catalog, its statistics and the query parser.
+        An upsert of a known product changes only the fields it gives; deleting an unknown product does nothing.
+        The changes apply all or none: an invalid one raises ValueError and leaves everything as it was.
+        Queries running meanwhile keep the catalog snapshot they started with, and see the whole batch at once.
+        Returns the number of changes applied.
+        """
+        changes = [parse_change(change) for change in changes]
+        with self._update_lock:
+            catalog = self.catalog
+            if not isinstance(catalog, LiveCatalog):
+                # The other stores are built once; converting costs one build, then each change O(log n)
+                catalog = LiveCatalog(catalog.product(i) for i in range(len(catalog)))
+            # (old, new) product per change, for the statistics once every change has applied
+            replaced = []
+            for change in changes:
+                if change['op'] == 'delete':
+                    old = catalog.get(change['name'])
+                    if old is not None:
+                        catalog = catalog.delete(change['name'])
+                        replaced.append((old, None))
+                    continue
+                old = catalog.get(change['product']['name'])
+                new = {**old, **change['product']} if old is not None else change['product']
+                catalog = catalog.upsert(new)
+                replaced.append((old, new))
+
+            for old, new in replaced:
+                if old is None:
+                    self.stats.add(new)
+                elif new is None:
+                    self.stats.remove(old)
+                else:
+                    self.stats.replace(old, new)
+            if any(new is None for _, new in replaced):
+                # Names identify products, so a rename is a delete plus an upsert: either way the words of
+                # removed names must go, which means rebuilding the vocabulary from the live names
+                self.parser.set_names(product['name'] for product in catalog)
+            else:
+                self.parser.add_names(new['name'] for old, new in replaced if old is None)
+            # Publishing is one assignment; self.products stays the list as loaded
+            self.catalog = catalog
+            self._rebuild_prompt()
+        return len(changes)
+
+    def upsert_product(self, product: Dict[str, Any]) -> None:
+        """Add a product, or update the fields given of the product with the same name."""
+        self.apply_changes([{"op": "upsert", "product": product}])
+
+    def delete_product(self, name: str) -> None:
+        """Remove the product with this name, if there is one."""
+        self.apply_changes([{"op": "delete", "name": name}])
+
+    def watch_changelog(self, path: str, interval: float = 1.0) -> ChangelogWatcher:
+        """Apply the changes appended to an NDJSON changelog file from a background thread; stop() ends it."""
+        watcher = ChangelogWatcher(path, self.apply_changes, interval)
+        watcher.poll()
+        return watcher.start()
+
     def get_filter_function_schema(self) -> Dict[str, Any]:
+        """Return the prebuilt function schema for OpenAI function calling."""
+        self.refresh_prompt()
+        return self.tool_schema
+
+    def build_system_message(self) -> str:
+        """Describe the catalog to the model, from the precomputed statistics."""
+        price_range, rating_range = self.stats.price_range, self.stats.rating_range
+        return f"""
+You are a helpful product search assistant. You have access to a dataset of {self.stats.count} products across different categories.
+Your task is to understand the user's natural language query and extract relevant filtering criteria to find matching products.
+
+Available categories: {', '.join(map(str, self.stats.categories))}
+Price range: {f"${price_range[0]:.2f} - ${price_range[1]:.2f}" if price_range else "none"}
+Rating range: {f"{rating_range[0]:.1f} - {rating_range[1]:.1f}" if rating_range else "none"}
+
+Analyze the user's query and call the filter_products function with appropriate parameters.
+If the user doesn't specify certain criteria, don't include those parameters in the function call.
+"""
+
+    def build_filter_function_schema(self) -> Dict[str, Any]:
         """Define the function schema for OpenAI function calling."""
+        categories = list(self.stats.categories)
+        category = {
+            "type": "string",
+            "description": f"Product category to filter by ({', '.join(map(str, categories))})",
+        }
+        if categories:
+            category["enum"] = categories
         return {
             "type": "function",
             "function": {
@@ -51,11 +251,7 @@ class ProductSearchTool:
                 "parameters": {
                     "type": "object",
                     "properties": {
-                        "category": {
-                            "type": "string",
-                            "description": "Product category to filter by (Electronics, Fitness, Kitchen, Books, Clothing)",
-                            "enum": ["Electronics", "Fitness", "Kitchen", "Books", "Clothing"]
-                        },
+                        "category": category,
                         "max_price": {
                             "type": "number",
                             "description": "Maximum price limit for products"
@@ -72,6 +268,16 @@ class ProductSearchTool:
                             "type": "array",
                             "items": {"type": "string"},
                             "description": "Keywords to search for in product names"
+                        },
+                        "keyword_match": {
+                            "type": "string",
+                            "description": "How keywords match product names: 'substring' (default), 'prefix' for word beginnings, 'fuzzy' to tolerate typos",
+                            "enum": ["substring", "exact", "prefix", "fuzzy"]
+                        },
+                        "sort_by": {
+                            "type": "string",
+                            "description": "How to rank results: 'relevance' to the keywords (default), 'rating' (highest first) or 'price' (lowest first)",
+                            "enum": ["relevance", "rating", "price"]
                         }
                     }
                 }
@@ -82,109 +288,197 @@ class ProductSearchTool:
                        max_price: Optional[float] = None,
                        min_rating: Optional[float] = None,
                        in_stock_only: Optional[bool] = None,
-                       keywords: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+                       keywords: Optional[List[str]] = None,
+                       keyword_match: str = 'substring',
+                       sort_by: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         Filter products based on the provided criteria.
         This function will be called by OpenAI with structured arguments.
+        The catalog answers the query from its indexes or, for the columnar store, with boolean masks.
+        sort_by does not change which products match; page_products() ranks by it.
         """
-        filtered_products = self.products.copy()
-        
-        # Filter by category
-        if category:
-            filtered_products = [p for p in filtered_products if p['category'] == category]
-        
-        # Filter by maximum price
-        if max_price is not None:
-            filtered_products = [p for p in filtered_products if p['price'] <= max_price]
-        
-        # Filter by minimum rating
-        if min_rating is not None:
-            filtered_products = [p for p in filtered_products if p['rating'] >= min_rating]
-        
-        # Filter by stock availability
-        if in_stock_only is not None:
-            filtered_products = [p for p in filtered_products if p['in_stock'] == in_stock_only]
-        
-        # Filter by keywords
-        if keywords:
-            keyword_filtered = []
-            for product in filtered_products:
-                product_name_lower = product['name'].lower()
-                if any(keyword.lower() in product_name_lower for keyword in keywords):
-                    keyword_filtered.append(product)
-            filtered_products = keyword_filtered
-        
-        return filtered_products
+        return self.catalog.filter(category, max_price, min_rating, in_stock_only, keywords, keyword_match)
     
     def search_products(self, user_query: str) -> List[Dict[str, Any]]:
         """
         Use OpenAI function calling to interpret user query and filter products.
+        Simple queries are parsed locally when the parser is confident enough, and arguments
+        extracted for a query are cached, so neither needs an API call.
+        """
+        return self._search(user_query, lambda arguments: self.filter_products(**arguments), [])
+    
+    def search_page(self, user_query: str, limit: int = 10, sort: Optional[str] = None) -> Page:
         """
+        Like search_products, but return only the first `limit` products in ranked order.
+        Pass the page's next_cursor and last_arguments to page_products for the following page.
+        """
+        return self._search(user_query, lambda arguments: self.page_products(arguments, sort, limit),
+                            Page([], None, 0))
+    
+    def _search(self, user_query: str, answer: Callable[[Dict[str, Any]], Any], empty: Any) -> Any:
+        """Resolve the query's filter arguments locally, from the cache or with OpenAI, then answer with them."""
+        self.last_arguments = None
         try:
-            # Prepare the system message with context about available products
-            system_message = f"""
-You are a helpful product search assistant. You have access to a dataset of {len(self.products)} products across different categories.
-Your task is to understand the user's natural language query and extract relevant filtering criteria to find matching products.
-
-Available categories: Electronics, Fitness, Kitchen, Books, Clothing
-Price range: ${min(p['price'] for p in self.products):.2f} - ${max(p['price'] for p in self.products):.2f}
-Rating range: {min(p['rating'] for p in self.products):.1f} - {max(p['rating'] for p in self.products):.1f}
-
-Analyze the user's query and call the filter_products function with appropriate parameters.
-If the user doesn't specify certain criteria, don't include those parameters in the function call.
-"""
-
-            # Make the API call with function calling using the new format
-            response = self.client.chat.completions.create(
-                model="gpt-4.1-mini",
-                messages=[
-                    {"role": "system", "content": system_message},
-                    {"role": "user", "content": user_query}
-                ],
-                tools=[self.get_filter_function_schema()],
-                tool_choice={"type": "function", "function": {"name": "filter_products"}}
-            )
+            arguments = self.known_arguments(user_query)
+            if arguments is not None:
+                self.last_arguments = arguments
+                return answer(arguments)
             
-            # Extract function call arguments from the response
-            response_message = response.choices[0].message
-            
-            # Check if there's a tool call
-            if response_message.tool_calls:
-                tool_call = response_message.tool_calls[0]
-                if tool_call.function.name == "filter_products":
-                    arguments = json.loads(tool_call.function.arguments)
-                    
-                    # Call the filter function with the extracted arguments
-                    filtered_products = self.filter_products(**arguments)
-                    return filtered_products
-                else:
-                    print("Error: Unexpected function call received from OpenAI")
-                    return []
-            else:
-                print("Error: No tool call received from OpenAI")
-                return []
+            self.record_path('llm')
+            arguments = self.extract_arguments(user_query)
+            if arguments is None:
+                return empty
+            self.last_arguments = arguments
+            result = answer(arguments)
+            # Cache only arguments that filtered without error
+            self.cache.put(user_query, arguments)
+            return result
                 
         except Exception as e:
             print(f"Error during API call: {e}")
-            return []
+            return empty
+    
+    def known_arguments(self, user_query: str, disk: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Filter arguments for the query from the local parser, if it is confident enough, or from the cache.
+        Returns None if the query needs OpenAI. With disk=False the cache's SQLite tier is not read;
+        callers on an event loop read it with cache.get_disk() in an executor.
+        """
+        self.refresh_prompt()
+        parsed = self.parser.parse(user_query)
+        if parsed.confidence >= self.parser_confidence:
+            self.record_path('local')
+            return parsed.arguments
+        
+        arguments = self.cache.get(user_query, disk)
+        if arguments is not None:
+            self.record_path('cache')
+        return arguments
+
+    def check_arguments(self, arguments: Dict[str, Any]) -> None:
+        """
+        Raise TypeError or ValueError for filter arguments that filter_products or page_products
+        would fail on, without filtering the catalog.
+        """
+        inspect.signature(self.filter_products).bind(**arguments)
+        for name in ('max_price', 'min_rating'):
+            value = arguments.get(name)
+            if value is not None and not isinstance(value, (int, float)):
+                raise TypeError(f"{name} must be a number, not {type(value).__name__}")
+        keywords = arguments.get('keywords')
+        if keywords is not None and not (isinstance(keywords, list) and all(isinstance(k, str) for k in keywords)):
+            raise TypeError("keywords must be a list of strings")
+        keyword_match = arguments.get('keyword_match', 'substring')
+        if keyword_match not in KEYWORD_MATCHES:
+            raise ValueError(f"keyword_match must be one of {', '.join(KEYWORD_MATCHES)}: {keyword_match!r}")
+        if arguments.get('sort_by'):
+            check_sort(arguments['sort_by'])
+    
+    def page_products(self, arguments: Dict[str, Any], sort: Optional[str] = None, limit: int = 10,
+                      cursor: Optional[str] = None) -> Page:
+        """
+        Rank the products matching the filter arguments and return one page of them.
+        sort defaults to the arguments' sort_by, then 'relevance'. Each page is chosen with a bounded heap,
+        so the full result set is never sorted; cursor continues after a previous page.
+        """
+        arguments = dict(arguments)
+        sort = sort or arguments.get('sort_by') or 'relevance'
+        arguments.pop('sort_by', None)
+        # One snapshot for the whole page, even if an update is published meanwhile
+        catalog = self.catalog
+        # top() ranks the ids itself, so they need not come back in catalog order
+        ids = catalog.filter_ids(**arguments, ordered=False)
+        after = decode_cursor(cursor, sort) if cursor else None
+        # One extra item tells whether another page follows
+        ranked = catalog.top(ids, sort, arguments.get('keywords'), limit + 1, after)
+        next_cursor = encode_cursor(sort, ranked[limit - 1]) if len(ranked) > limit else None
+        return Page([catalog.product(product_id) for _, product_id in ranked[:limit]], next_cursor, len(ids))
+    
+    def record_path(self, path: str) -> None:
+        """Count a query as answered by path: 'local', 'cache' or 'llm'."""
+        self.paths[path] += 1
+        self.last_path = path
+    
+    def path_report(self) -> str:
+        """How often each path answered a query, e.g. 'local 6 (60.0%), cache 1 (10.0%), llm 3 (30.0%)'."""
+        total = sum(self.paths.values())
+        return ", ".join(f"{path} {self.paths[path]} ({self.paths[path] / total:.1%})"
+                         for path in ('local', 'cache', 'llm')) if total else "no queries"
+    
+    def extract_arguments(self, user_query: str) -> Optional[Dict[str, Any]]:
+        """
+        Ask OpenAI for the filter_products arguments matching the user query.
+        Returns None if no usable tool call comes back.
+        """
+        response = self.client.chat.completions.create(**self.completion_request(user_query))
+        return self.arguments_from_response(response)
+    
+    def completion_request(self, user_query: str) -> Dict[str, Any]:
+        """Keyword arguments of the chat completion call that extracts filter arguments for the query."""
+        # The system message and tools are built once from the catalog statistics
+        self.refresh_prompt()
+        return dict(
+            model=MODEL,
+            messages=[
+                self.system_prompt,
+                {"role": "user", "content": user_query}
+            ],
+            tools=self.tools,
+            tool_choice={"type": "function", "function": {"name": "filter_products"}}
+        )
+    
+    def arguments_from_response(self, response: Any) -> Optional[Dict[str, Any]]:
+        """The filter_products arguments of a chat completion, or None if it has no such tool call."""
+        # Extract function call arguments from the response
+        response_message = response.choices[0].message
+        
+        # Check if there's a tool call
+        if response_message.tool_calls:
+            tool_call = response_message.tool_calls[0]
+            if tool_call.function.name == "filter_products":
+                return json.loads(tool_call.function.arguments)
+            else:
+                print("Error: Unexpected function call received from OpenAI")
+                return None
+        else:
+            print("Error: No tool call received from OpenAI")
+            return None
     
     def format_products_output(self, products: List[Dict[str, Any]]) -> str:
         """Format the filtered products for display."""
         if not products:
             return "No products found matching your criteria."
         
-        output = "Filtered Products:\n"
-        for i, product in enumerate(products, 1):
+        return "Filtered Products:\n" + "".join(line + "\n" for line in self.iter_products_output(products))
+    
+    def iter_products_output(self, products: Iterable[Dict[str, Any]], start: int = 1) -> Iterator[str]:
+        """Yield one display line per product, numbered from start, so output can be written as it is produced."""
+        for i, product in enumerate(products, start):
             stock_status = "In Stock" if product['in_stock'] else "Out of Stock"
-            output += f"{i}. {product['name']} - ${product['price']:.2f}, Rating: {product['rating']}, {stock_status}\n"
-        
-        return output
+            yield f"{i}. {product['name']} - ${product['price']:.2f}, Rating: {product['rating']}, {stock_status}"
+    
+    def print_page(self, page: Page, start: int = 1) -> None:
+        """Print a page of results, line by line."""
+        if not page.products:
+            print("\nNo products found matching your criteria.\n")
+            return
+        print(f"\nFiltered Products ({start}-{start + len(page.products) - 1} of {page.total}):")
+        for line in self.iter_products_output(page.products, start):
+            print(line)
+        if page.next_cursor:
+            print("Type 'more' for the next page.")
+        print()
     
     def run(self):
         """Main application loop."""
         print("=== Product Search Tool ===")
         print("Enter your search query in natural language (e.g., 'I need electronics under $200')")
-        print("Type 'quit' to exit\n")
+        print("Type 'more' for the next page of results, 'quit' to exit\n")
+        page_size = int(os.getenv('PAGE_SIZE', '10'))
+        # (arguments, cursor, products shown) of the last search, for 'more'
+        pager = None
+        changelog = os.getenv('CATALOG_CHANGELOG')
+        watcher = self.watch_changelog(changelog) if changelog else None
         
         while True:
             try:
@@ -198,11 +492,19 @@ If the user doesn't specify certain criteria, don't include those parameters in
                     print("Please enter a search query.")
                     continue
                 
-                print("\nSearching...")
-                filtered_products = self.search_products(user_input)
+                if user_input.lower() in ['more', 'next', 'm']:
+                    if pager is None or pager[1] is None:
+                        print("No more results. Enter a new search query.\n")
+                        continue
+                    arguments, cursor, shown = pager
+                    page = self.page_products(arguments, limit=page_size, cursor=cursor)
+                else:
+                    print("\nSearching...")
+                    page = self.search_page(user_input, page_size)
+                    arguments, shown = self.last_arguments, 0
                 
-                print("\n" + self.format_products_output(filtered_products))
-                print()
+                self.print_page(page, shown + 1)
+                pager = (arguments, page.next_cursor, shown + len(page.products))
                 
             except KeyboardInterrupt:
                 print("\n\nGoodbye!")
@@ -210,6 +512,14 @@ If the user doesn't specify certain criteria, don't include those parameters in
             except Exception as e:
                 print(f"An error occurred: {e}")
                 print("Please try again.\n")
+        
+        if watcher is not None:
+            watcher.stop()
+            print(f"Catalog changes applied: {watcher.applied}, rejected: {watcher.rejected}")
+        if self.paths:
+            print(f"Query paths: {self.path_report()}")
+        if self.cache.stats.lookups:
+            print(f"Query cache: {self.cache.stats}")
 
 def main():
     """Main entry point of the application."""
@@ -0,0 +1,197 @@
+"""
+Cache of natural-language queries to extracted filter_products arguments.
+
+Shoppers repeat the same queries ("electronics under $200") all the time, and
+each one otherwise costs an OpenAI round trip. Queries are normalized
+(Unicode-normalized, casefolded, whitespace collapsed, trailing punctuation
+dropped) and looked up in two tiers:
+
+- an in-memory LRU of recently used queries
+- an optional SQLite file that survives restarts and is shared by processes
+
+Reading the file is blocking I/O. Callers on an event loop pass disk=False
+to get(), which never touches the file, and run get_disk() and put() in an
+executor; the memory tier has its own lock, so it never waits for the file.
+
+Entries expire after a TTL. Every entry is tagged with a fingerprint of the
+tool schema and model that produced it; entries with another fingerprint are
+ignored and purged, so changing the schema invalidates the cache.
+"""
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+Arguments = Dict[str, Any]
+
+_SPACE = re.compile(r'\s+')
+_TRAILING = '.?! '
+
+
+def normalize_query(query: str) -> str:
+    """Key under which a query is cached"""
+    text = _SPACE.sub(' ', unicodedata.normalize('NFKC', query).casefold())
+    return text.strip().rstrip(_TRAILING)
+
+
+def fingerprint(*parts: Any) -> str:
+    """Stable hash of JSON-serializable parts, such as the tool schema and model name"""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+
+class CacheStats:
+    """Lookup counters of a QueryCache"""
+
+    def __init__(self):
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @property
+    def lookups(self) -> int:
+        return self.memory_hits + self.disk_hits + self.misses
+
+    @property
+    def hit_rate(self) -> float:
+        return (self.memory_hits + self.disk_hits) / self.lookups if self.lookups else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"lookups": self.lookups, "memory_hits": self.memory_hits, "disk_hits": self.disk_hits,
+                "misses": self.misses, "hit_rate": round(self.hit_rate, 4)}
+
+    def __str__(self) -> str:
+        return (f"{self.lookups} lookups, {self.hit_rate:.1%} hits "
+                f"({self.memory_hits} memory, {self.disk_hits} disk, {self.misses} misses)")
+
+
+class QueryCache:
+    """Two-tier cache from normalized queries to filter arguments
+
+    Args:
+        schema_fingerprint: fingerprint() of whatever the arguments depend on
+        path: SQLite file for the persistent tier, or None for memory only
+        max_entries: size of the in-memory LRU tier
+        ttl: seconds an entry stays valid, or None to keep entries forever
+        clock: source of the current time in seconds
+    """
+
+    def __init__(self, schema_fingerprint: str, path: Optional[str] = None, max_entries: int = 4096,
+                 ttl: Optional[float] = 24 * 3600, clock: Callable[[], float] = time.time):
+        self.schema_fingerprint = schema_fingerprint
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self.stats = CacheStats()
+        self._memory: 'OrderedDict[str, Tuple[float, Arguments]]' = OrderedDict()
+        # _lock guards the memory tier, _db_lock the SQLite connection
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            with self._db:
+                self._db.execute("CREATE TABLE IF NOT EXISTS queries (query TEXT PRIMARY KEY, "
+                                 "fingerprint TEXT NOT NULL, created REAL NOT NULL, arguments TEXT NOT NULL)")
+                self._db.execute("DELETE FROM queries WHERE fingerprint != ?", (schema_fingerprint,))
+                if ttl is not None:
+                    self._db.execute("DELETE FROM queries WHERE created < ?", (clock() - ttl,))
+
+    def __len__(self) -> int:
+        return len(self._memory)
+
+    def _expired(self, created: float) -> bool:
+        return self.ttl is not None and self.clock() - created > self.ttl
+
+    @property
+    def persistent(self) -> bool:
+        """Whether there is a SQLite tier, which get_disk() reads"""
+        return self._db is not None
+
+    def get(self, query: str, disk: bool = True) -> Optional[Arguments]:
+        """
+        Cached arguments for query, or None. With disk=False only the memory tier is read,
+        and a miss there is left for get_disk() to count.
+        """
+        key = normalize_query(query)
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if not self._expired(entry[0]):
+                    self._memory.move_to_end(key)
+                    self.stats.memory_hits += 1
+                    return dict(entry[1])
+                del self._memory[key]
+        if self._db is not None and not disk:
+            return None
+        return self._get_disk(key)
+
+    def get_disk(self, query: str) -> Optional[Arguments]:
+        """Cached arguments for query from the SQLite tier only, or None; a hit is kept in memory too"""
+        return self._get_disk(normalize_query(query))
+
+    def _get_disk(self, key: str) -> Optional[Arguments]:
+        schema_fingerprint = self.schema_fingerprint
+        with self._db_lock:
+            row = None
+            if self._db is not None:
+                row = self._db.execute("SELECT created, arguments FROM queries WHERE query = ? AND fingerprint = ?",
+                                       (key, schema_fingerprint)).fetchone()
+        with self._lock:
+            # An entry read just before a fingerprint change must not come back into memory
+            if row is not None and not self._expired(row[0]) and schema_fingerprint == self.schema_fingerprint:
+                arguments = json.loads(row[1])
+                self._remember(key, row[0], arguments)
+                self.stats.disk_hits += 1
+                return dict(arguments)
+            self.stats.misses += 1
+            return None
+
+    def put(self, query: str, arguments: Arguments) -> None:
+        """Cache the arguments extracted for query"""
+        key, created = normalize_query(query), self.clock()
+        with self._lock:
+            self._remember(key, created, dict(arguments))
+        with self._db_lock:
+            if self._db is not None:
+                with self._db:
+                    self._db.execute("INSERT OR REPLACE INTO queries VALUES (?, ?, ?, ?)",
+                                     (key, self.schema_fingerprint, created, json.dumps(arguments)))
+
+    def _remember(self, key: str, created: float, arguments: Arguments) -> None:
+        self._memory[key] = (created, arguments)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def set_fingerprint(self, schema_fingerprint: str) -> None:
+        """Switch to a new schema fingerprint, dropping the entries of the old one"""
+        with self._lock:
+            if schema_fingerprint == self.schema_fingerprint:
+                return
+            self.schema_fingerprint = schema_fingerprint
+            self._memory.clear()
+        with self._db_lock:
+            if self._db is not None:
+                with self._db:
+                    self._db.execute("DELETE FROM queries WHERE fingerprint != ?", (schema_fingerprint,))
+
+    def clear(self) -> None:
+        """Drop every entry from both tiers"""
+        with self._lock:
+            self._memory.clear()
+        with self._db_lock:
+            if self._db is not None:
+                with self._db:
+                    self._db.execute("DELETE FROM queries")
+
+    def close(self) -> None:
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
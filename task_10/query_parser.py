@@ -0,0 +1,224 @@
+"""
+Rule-based parser for simple product queries.
+
+Queries such as "kitchen under $100 in stock" or "books rated 4.5+" can be
+turned into filter_products arguments without asking a model. The parser
+recognizes:
+
+- categories, by name or a common synonym ("clothes", "gadgets")
+- a maximum price ("under $200", "less than 50", "$30 or less", "up to 1k")
+- a minimum rating ("rated 4.5+", "4 stars and up", "rating above 4")
+- stock ("in stock", "available", "out of stock")
+- keywords: words that occur in product names; adjacent words that occur
+  together in a name ("yoga mat") form one phrase keyword
+
+Filler words ("show me", "with", "products") are ignored. Anything else
+lowers the confidence of the result, and negations or alternatives ("not",
+"without", "or") make it low, so such queries go to the model instead. So do
+several separate keywords, which filter_products would match with OR: only
+the model can tell whether the shopper meant either of them.
+"""
+
+import re
+from bisect import bisect_left, insort
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from tokens import tokenize
+
+CATEGORY_SYNONYMS = {
+    "Electronics": ("electronics", "electronic", "gadget", "gadgets", "tech", "devices"),
+    "Fitness": ("fitness", "workout", "exercise", "gym", "sports"),
+    "Kitchen": ("kitchen", "kitchenware", "cookware", "cooking"),
+    "Books": ("books", "book", "novels", "reading"),
+    "Clothing": ("clothing", "clothes", "apparel", "outfits", "wear"),
+}
+
+FILLER = frozenset("""
+    a an the some any all me i i'm im we us my show find get give list search looking look want need would like
+    for to with that are is be which who have has of in on at please can you buy shop and also about from
+    products product items item things stuff equipment gear appliances options something
+""".split())
+
+NEGATIONS = frozenset("not no without except excluding non dont don't isn't aren't never or nor".split())
+
+_NUMBER = r'(\d[\d,]*(?:\.\d+)?)\s*(k\b)?'
+_RATING = r'([0-5](?:\.\d+)?)(?!\d|[.,]\d)'
+
+# Two consecutive words of a name separated by a single space
+_WORD_PAIR = re.compile(r'(?=\b(\w+ \w+))')
+
+# (pattern, argument, value when the pattern has no number); the first match of
+# each argument wins
+_PATTERNS: List[Tuple[re.Pattern, str, Any]] = [
+    (re.compile(r'\bout[ -]of[ -]stock\b|\bsold out\b|\bunavailable\b'), 'in_stock_only', False),
+    (re.compile(r'\bin[ -]stock\b|\bavailable\b|\bin[ -]store\b'), 'in_stock_only', True),
+    (re.compile(r'\b(?:rated|ratings?|stars?|reviews?)\s*(?:of\s+)?(?:at least|above|over|greater than|higher than'
+                r'|more than|>=?|of)?\s*' + _RATING + r'\s*(?:\+|stars?|or (?:more|higher|above|better)'
+                r'|and (?:up|above|higher))?(?!\s*(?:\$|dollars|k\b))'), 'min_rating', None),
+    (re.compile(r'(?:\bat least|\babove|\bover)?\s*' + _RATING + r'\s*(?:\+\s*)?stars?'
+                r'(?:\s*(?:and up|and above|or more|or higher|or better|\+|rating|ratings?|reviews?))?'),
+     'min_rating', None),
+    (re.compile(r'(?:\b(?:under|below|less than|cheaper than|up to|at most|max(?:imum)?(?: price)?(?: of)?'
+                r'|no more than|within|not more than|budget(?: of)?)|<=?)\s*\$?\s*' + _NUMBER
+                + r'(?:\s*(?:dollars|bucks|usd))?'), 'max_price', None),
+    (re.compile(r'\$\s*' + _NUMBER + r'\s*(?:or less|or under|or below|or cheaper|max(?:imum)?|and under'
+                r'|and below|budget|tops)'), 'max_price', None),
+]
+
+
+class ParsedQuery(NamedTuple):
+    """filter_products arguments, with how sure the parser is of them (0 to 1)"""
+    arguments: Dict[str, Any]
+    confidence: float
+    unknown: List[str]
+
+
+def _number(text: str, thousands: Optional[str]) -> float:
+    value = float(text.replace(',', ''))
+    return value * 1000 if thousands else value
+
+
+def name_words(names: Iterable[str]) -> Tuple[Set[str], Set[str]]:
+    """The words and adjacent word pairs ("yoga mat") of product names: the parser's vocabulary and phrases"""
+    names = list(names)
+    words = {word for name in names for word in tokenize(name)}
+    pairs = {pair for name in names for pair in _WORD_PAIR.findall(name.casefold())}
+    return words, pairs
+
+
+def _merge_sorted(items: List[str], new: Iterable[str]) -> List[str]:
+    """A new sorted list of items (sorted, distinct) plus new"""
+    new = set(new).difference(items)
+    if len(new) > len(items):
+        return sorted(new.union(items))
+    merged = list(items)
+    for item in new:
+        insort(merged, item)
+    return merged
+
+
+class QueryParser:
+    """Parses queries against a catalog's categories and name vocabulary"""
+
+    def __init__(self, categories: Iterable[Any] = (), names: Iterable[str] = (),
+                 vocabulary: Optional[List[str]] = None, phrases: Optional[List[str]] = None):
+        """
+        vocabulary, phrases: sorted words and word pairs of the names (see name_words), when already
+        known (e.g. from a catalog file)
+        """
+        self._vocabulary: List[str] = list(vocabulary or ())
+        # Sorted "word word" pairs of the names, for phrase keywords
+        self._phrases: List[str] = list(phrases or ())
+        self.set_categories(categories)
+        self.add_names(names)
+
+    def set_categories(self, categories: Iterable[Any]) -> None:
+        by_word: Dict[str, Any] = {}
+        for category in categories:
+            words = CATEGORY_SYNONYMS.get(category, ())
+            for word in words + (str(category).casefold(),):
+                by_word.setdefault(word, category)
+        # Replaced whole, so a query parsed meanwhile sees the old or the new categories
+        self._categories = by_word
+
+    def add_names(self, names: Iterable[str]) -> None:
+        """Add the words of product names to the keyword vocabulary"""
+        words, pairs = name_words(names)
+        self._vocabulary = _merge_sorted(self._vocabulary, words)
+        self._phrases = _merge_sorted(self._phrases, pairs)
+
+    def set_names(self, names: Iterable[str]) -> None:
+        """Replace the keyword vocabulary with the words of these product names, e.g. after products are removed"""
+        words, pairs = name_words(names)
+        self._vocabulary = sorted(words)
+        self._phrases = sorted(pairs)
+
+    def _phrase(self, first: str, second: str) -> Optional[str]:
+        """first and second as one keyword, if some name has them next to each other"""
+        phrase = f"{first} {second}"
+        index = bisect_left(self._phrases, phrase)
+        if index < len(self._phrases) and self._phrases[index].startswith(phrase):
+            return phrase
+        return None
+
+    def _keyword(self, word: str) -> Optional[str]:
+        """The form of word to search names for, or None if no product name has it"""
+        vocabulary = self._vocabulary
+        if not re.fullmatch(r'\w+', word):
+            # "men's": known if every part is a word of some name
+            parts = tokenize(word)
+            known = "'" in word and parts and all(self._keyword(part) == part for part in parts)
+            return word if known else None
+        forms = [word]
+        if word.endswith('es') and len(word) > 4:
+            forms.append(word[:-2])
+        if word.endswith('s') and len(word) > 3:
+            forms.append(word[:-1])
+        for form in forms:
+            index = bisect_left(vocabulary, form)
+            if index < len(vocabulary) and (vocabulary[index] == form or
+                                            (len(form) >= 4 and vocabulary[index].startswith(form))):
+                return form
+        return None
+
+    def parse(self, query: str) -> ParsedQuery:
+        text = query.casefold()
+        arguments: Dict[str, Any] = {}
+        doubtful = False
+        for pattern, argument, value in _PATTERNS:
+            match = pattern.search(text)
+            if match is None:
+                continue
+            if argument in arguments:
+                doubtful = True
+            else:
+                if argument == 'max_price':
+                    arguments[argument] = _number(match.group(1), match.group(2))
+                elif argument == 'min_rating':
+                    arguments[argument] = float(match.group(1))
+                else:
+                    arguments[argument] = value
+            text = text[:match.start()] + ' ' + text[match.end():]
+
+        keywords: List[str] = []
+        unknown: List[str] = []
+        categories = set()
+        by_word = self._categories
+        # Index of the word that gave the last keyword, while that keyword is a single word
+        single = -2
+        for index, word in enumerate(re.findall(r"[\w'$.+]+", text)):
+            word = word.strip(".'")
+            if not word or word in FILLER:
+                continue
+            if word in NEGATIONS:
+                doubtful = True
+            elif word in by_word:
+                categories.add(by_word[word])
+            else:
+                keyword = self._keyword(word)
+                if keyword is None:
+                    unknown.append(word)
+                    continue
+                phrase = self._phrase(keywords[-1], keyword) if single == index - 1 else None
+                if phrase is not None:
+                    keywords[-1] = phrase
+                    single = -2
+                    continue
+                if keyword not in keywords:
+                    keywords.append(keyword)
+                    single = index
+        if len(categories) == 1:
+            arguments['category'] = categories.pop()
+        elif categories:
+            doubtful = True
+        if keywords:
+            arguments['keywords'] = keywords
+
+        if not arguments:
+            return ParsedQuery(arguments, 0.0, unknown)
+        confidence = 0.5 ** len(unknown)
+        if len(keywords) > 1:
+            confidence = min(confidence, 0.5)
+        if doubtful or arguments.get('min_rating', 0) > 5:
+            confidence = min(confidence, 0.25)
+        return ParsedQuery(arguments, confidence, unknown)
@@ -0,0 +1,93 @@
+"""
+Top-K ranking and cursor pagination of filtered products.
+
+Sorting every match to show the first ten costs O(m log m) for m matches.
+Instead, each page is chosen with a bounded heap (heapq.nsmallest), which
+costs O(m log k) for a page of k, and a cursor marks where the page ended:
+the next page takes the k smallest items ranked after it. No query sorts or
+builds its full result set.
+
+Items are ranked by a key tuple ending in the product id, so the order is
+total and a cursor is just the last key. Sort orders:
+
+- 'rating': highest rating first, then lowest price
+- 'price': lowest price first, then highest rating
+- 'relevance': best keyword match first, then as 'rating'. A keyword found
+  in the name scores 1, plus 0.5 if it starts a word and 0.5 more if it is
+  a whole word. Without keywords this is the same as 'rating'.
+"""
+
+import base64
+import heapq
+import json
+import re
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+SORTS = ('relevance', 'rating', 'price')
+
+Key = Tuple[float, ...]
+Ranked = Tuple[Key, int]
+
+
+class Page(NamedTuple):
+    """One page of ranked products"""
+    products: List[Dict[str, Any]]
+    next_cursor: Optional[str]
+    total: int
+
+
+def relevance(name: str, needles: Sequence[str]) -> float:
+    """Keyword match score of a lowercased name"""
+    score = 0.0
+    for needle in needles:
+        position = name.find(needle)
+        if position < 0:
+            continue
+        score += 1
+        match = re.search(r'(?<!\w)' + re.escape(needle), name)
+        if match:
+            score += 0.5
+            end = match.end()
+            if end == len(name) or not name[end].isalnum():
+                score += 0.5
+    return score
+
+
+def sort_key(sort: str, price: float, rating: float, name: Optional[str] = None,
+             needles: Sequence[str] = ()) -> Key:
+    """Key ranking a product within a sort order; smaller ranks first"""
+    if sort == 'price':
+        return (price, -rating)
+    if sort == 'rating' or not needles:
+        return (-rating, price)
+    return (-relevance(name, needles), -rating, price)
+
+
+def check_sort(sort: str) -> None:
+    if sort not in SORTS:
+        raise ValueError(f"sort must be one of {', '.join(SORTS)}: {sort!r}")
+
+
+def select(keyed: Iterable[Ranked], limit: int, after: Optional[Ranked] = None) -> List[Ranked]:
+    """The limit smallest (key, id) items ranked after `after`, in order"""
+    if after is not None:
+        keyed = (item for item in keyed if item > after)
+    return heapq.nsmallest(limit, keyed)
+
+
+def encode_cursor(sort: str, item: Ranked) -> str:
+    key, product_id = item
+    data = json.dumps([sort, list(key), product_id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(data).decode('ascii')
+
+
+def decode_cursor(cursor: str, sort: str) -> Ranked:
+    """The item a cursor from encode_cursor() points after; ValueError if it is not for this sort"""
+    try:
+        cursor_sort, key, product_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        item = (tuple(float(value) for value in key), int(product_id))
+    except (ValueError, TypeError, UnicodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+    if cursor_sort != sort:
+        raise ValueError(f"Cursor is for sort {cursor_sort!r}, not {sort!r}")
+    return item
@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Concurrent HTTP search service over ProductSearchTool.
+
+ProductSearchTool.run() answers one query at a time and blocks on every
+OpenAI call. The service runs on asyncio instead, so a single process
+serves many shoppers at once:
+
+- one AsyncOpenAI client is shared by all requests, so connections to the
+  API are pooled and reused
+- at most `max_concurrency` completion calls are in flight, and at most
+  `rate` start per second; further calls wait their turn
+- identical queries (after normalization) arriving while a call for them is
+  in flight wait for that call instead of making their own
+- every search gets `timeout` seconds before it fails with 504; a call
+  shared with other requests keeps running for them
+
+Queries the local parser or the query cache can answer never reach OpenAI.
+The local parser and the in-memory cache tier run on the event loop. The
+cache's SQLite tier is file I/O, so its reads and writes run in the default
+executor. Filtering and ranking one page also run on the loop: they are CPU
+work on the in-memory indexes, and cost grows with the number of matches.
+An answer from the model is checked against the filter signature, without
+filtering, before it is cached.
+
+Endpoints (HTTP/1.1 with keep-alive, JSON responses):
+
+    GET /search?q=<query>[&limit=10][&sort=relevance|rating|price][&cursor=...]
+    GET /stats
+    POST /changes
+
+A search returns {"query", "path", "arguments", "total", "products",
+"next_cursor"};
+pass next_cursor back with the same q for the next page.
+
+POST /changes takes a catalog change or a list of them (see
+live_catalog.py) and applies them all or none, on a worker thread: searches
+keep being answered from the current catalog snapshot meanwhile. --changelog
+also applies the changes appended to an NDJSON file. Run with:
+
+    python3 service.py --port 8080 [--changelog changes.ndjson]
+
+The OpenAI client reads OPENAI_API_KEY and, to use another endpoint such as
+a local mock, OPENAI_BASE_URL.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from openai import AsyncOpenAI
+
+from product_search import ProductSearchTool
+from query_cache import normalize_query
+from ranking import Page, check_sort
+
+MAX_LIMIT = 100
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            502: "Bad Gateway", 504: "Gateway Timeout"}
+
+Request = Tuple[str, str, Dict[str, str], bytes]
+
+
+async def read_request(reader: asyncio.StreamReader) -> Optional[Request]:
+    """(method, target, headers, body) of the next HTTP request, or None when the client is done"""
+    line = await reader.readline()
+    if not line.strip():
+        return None
+    method, target, _ = line.decode('latin-1').split(' ', 2)
+    headers: Dict[str, str] = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(headers.get('content-length', 0)))
+    return method, target, headers, body
+
+
+def write_response(writer: asyncio.StreamWriter, status: int, payload: Any, keep_alive: bool = True) -> None:
+    body = json.dumps(payload).encode('utf-8')
+    head = (f"HTTP/1.1 {status} {_REASONS[status]}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    writer.write(head.encode('latin-1') + body)
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of sorted values"""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered) + 0.5) - 1))]
+
+
+class RateLimiter:
+    """Token bucket letting through at most `rate` calls per second, in bursts of up to `burst`"""
+
+    def __init__(self, rate: float, burst: int = 1, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self._tokens = float(burst)
+        self._updated = clock()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """Wait until a call may start; waiters are let through in arrival order"""
+        async with self._lock:
+            while True:
+                now = self.clock()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class ServiceStats:
+    """Request counters of a SearchService"""
+
+    def __init__(self):
+        self.requests = 0
+        self.completions = 0
+        self.deduplicated = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.peak_completions = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return dict(vars(self))
+
+    def __str__(self) -> str:
+        return (f"{self.requests} searches, {self.completions} completion calls "
+                f"(at most {self.peak_completions} at once), {self.deduplicated} deduplicated, "
+                f"{self.timeouts} timeouts, {self.errors} errors")
+
+
+class SearchService:
+    """Answers many searches concurrently with one ProductSearchTool
+
+    Args:
+        tool: the loaded catalog, parser, cache and prompt
+        client: AsyncOpenAI-compatible client; by default one is built with the tool's API key
+        max_concurrency: completion calls allowed in flight at once
+        timeout: seconds a search may take
+        rate: completion calls allowed to start per second, or None for no limit
+    """
+
+    def __init__(self, tool: ProductSearchTool, client: Optional[Any] = None, max_concurrency: int = 8,
+                 timeout: float = 10.0, rate: Optional[float] = None):
+        self.tool = tool
+        self.client = client if client is not None else AsyncOpenAI(api_key=tool.api_key, timeout=timeout)
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.stats = ServiceStats()
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._rate_limiter = RateLimiter(rate) if rate else None
+        self._active = 0
+        # Normalized query -> completion call in flight for it
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    async def search(self, query: str, limit: int = 10, sort: Optional[str] = None,
+                     cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        One page of results for the query. Raises ValueError for an invalid sort or cursor,
+        and asyncio.TimeoutError after `timeout` seconds.
+        """
+        if sort is not None:
+            check_sort(sort)
+        arguments, path = await asyncio.wait_for(self.resolve(query), self.timeout)
+        return self.page(query, path, arguments, limit, sort, cursor)
+
+    def page(self, query: str, path: str, arguments: Optional[Dict[str, Any]], limit: int = 10,
+             sort: Optional[str] = None, cursor: Optional[str] = None) -> Dict[str, Any]:
+        page = Page([], None, 0) if arguments is None else self.tool.page_products(arguments, sort, limit, cursor)
+        return {"query": query, "path": path, "arguments": arguments, "total": page.total,
+                "products": page.products, "next_cursor": page.next_cursor}
+
+    async def resolve(self, query: str) -> Tuple[Optional[Dict[str, Any]], str]:
+        """
+        Filter arguments for the query and how they were found: 'local', 'cache', 'llm', or
+        'shared' when an identical query's completion call was already in flight.
+        """
+        arguments = self.tool.known_arguments(query, disk=False)
+        if arguments is None and self.tool.cache.persistent:
+            arguments = await asyncio.get_running_loop().run_in_executor(None, self.tool.cache.get_disk, query)
+            if arguments is not None:
+                self.tool.record_path('cache')
+        if arguments is not None:
+            return arguments, self.tool.last_path
+        key = normalize_query(query)
+        call = self._in_flight.get(key)
+        if call is None:
+            call = asyncio.ensure_future(self._extract(query))
+            self._in_flight[key] = call
+            call.add_done_callback(lambda done: self._finish(key, done))
+            path = 'llm'
+        else:
+            self.stats.deduplicated += 1
+            path = 'shared'
+        # A search that times out must not cancel the call for the others waiting on it
+        return await asyncio.shield(call), path
+
+    def _finish(self, key: str, call: asyncio.Future) -> None:
+        if self._in_flight.get(key) is call:
+            del self._in_flight[key]
+        if not call.cancelled() and call.exception() is not None:
+            self.stats.errors += 1
+
+    async def _extract(self, query: str) -> Optional[Dict[str, Any]]:
+        async with self._slots:
+            # Inside the slot, so that calls cannot queue up past the limiter and then start in a burst
+            if self._rate_limiter is not None:
+                await self._rate_limiter.acquire()
+            self.tool.record_path('llm')
+            self.stats.completions += 1
+            self._active += 1
+            self.stats.peak_completions = max(self.stats.peak_completions, self._active)
+            try:
+                response = await self.client.chat.completions.create(**self.tool.completion_request(query))
+            finally:
+                self._active -= 1
+        arguments = self.tool.arguments_from_response(response)
+        if arguments is not None:
+            # Cached before the call leaves _in_flight, so the same query arriving next finds it.
+            # Cache only arguments that filter without error.
+            self.tool.check_arguments(arguments)
+            await asyncio.get_running_loop().run_in_executor(None, self.tool.cache.put, query, arguments)
+        return arguments
+
+    def report(self) -> Dict[str, Any]:
+        return {"paths": dict(self.tool.paths), "cache": self.tool.cache.stats.as_dict(),
+                "service": self.stats.as_dict()}
+
+    async def apply_changes(self, body: bytes) -> Tuple[int, Any]:
+        """Status and JSON payload of applying the change or list of changes in a JSON request body"""
+        try:
+            changes = json.loads(body or b'null')
+            if isinstance(changes, dict):
+                changes = [changes]
+            if not isinstance(changes, list):
+                raise ValueError("Expected a change or a list of changes")
+            # Off the event loop, so that searches go on while the indexes are updated
+            applied = await asyncio.get_running_loop().run_in_executor(None, self.tool.apply_changes, changes)
+        except ValueError as e:
+            return 400, {"error": str(e)}
+        return 200, {"applied": applied, "products": len(self.tool.catalog)}
+
+    async def handle(self, method: str, target: str, body: bytes = b'') -> Tuple[int, Any]:
+        """Status and JSON payload answering one HTTP request"""
+        url = urlsplit(target)
+        routes = {'/search': 'GET', '/stats': 'GET', '/changes': 'POST'}
+        if url.path not in routes:
+            return 404, {"error": f"Not found: {url.path}"}
+        if method != routes[url.path]:
+            return 405, {"error": f"Method not allowed: {method}"}
+        if url.path == '/stats':
+            return 200, self.report()
+        if url.path == '/changes':
+            return await self.apply_changes(body)
+
+        params = {name: values[0] for name, values in parse_qs(url.query).items()}
+        query = params.get('q', '').strip()
+        if not query:
+            return 400, {"error": "Missing query parameter q"}
+        sort, cursor = params.get('sort'), params.get('cursor')
+        try:
+            limit = int(params.get('limit', 10))
+            if not 1 <= limit <= MAX_LIMIT:
+                raise ValueError(f"limit must be between 1 and {MAX_LIMIT}")
+            if sort is not None:
+                check_sort(sort)
+        except ValueError as e:
+            return 400, {"error": str(e)}
+
+        self.stats.requests += 1
+        try:
+            arguments, path = await asyncio.wait_for(self.resolve(query), self.timeout)
+        except asyncio.TimeoutError:
+            self.stats.timeouts += 1
+            return 504, {"error": f"Search timed out after {self.timeout:g} s"}
+        except Exception as e:
+            return 502, {"error": f"Error during API call: {e}"}
+        try:
+            return 200, self.page(query, path, arguments, limit, sort, cursor)
+        except ValueError as e:
+            return 400, {"error": str(e)}
+
+    async def serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                except (ValueError, asyncio.IncompleteReadError):
+                    write_response(writer, 400, {"error": "Malformed request"}, keep_alive=False)
+                    break
+                if request is None:
+                    break
+                method, target, headers, body = request
+                status, payload = await self.handle(method, target, body)
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host: str = '127.0.0.1', port: int = 8080) -> asyncio.AbstractServer:
+        """Listen for HTTP requests; port 0 picks a free port"""
+        return await asyncio.start_server(self.serve_connection, host, port)
+
+    async def close(self) -> None:
+        await self.client.close()
+
+
+async def serve(service: SearchService, host: str, port: int) -> None:
+    server = await service.start(host, port)
+    host, port = server.sockets[0].getsockname()[:2]
+    print(f"Serving product search on http://{host}:{port}/search?q=... (Ctrl+C to stop)")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve product searches over HTTP")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--concurrency', type=int, default=8, help="completion calls in flight at once")
+    parser.add_argument('--timeout', type=float, default=10.0, help="seconds allowed per search")
+    parser.add_argument('--rate', type=float, help="completion calls started per second at most")
+    parser.add_argument('--changelog', help="NDJSON file of catalog changes to apply as lines are appended")
+    args = parser.parse_args(argv)
+    service = SearchService(ProductSearchTool(), max_concurrency=args.concurrency, timeout=args.timeout,
+                            rate=args.rate)
+    watcher = service.tool.watch_changelog(args.changelog) if args.changelog else None
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    print(f"\nQuery paths: {service.tool.path_report()}")
+    print(f"Service: {service.stats}")
+    if watcher is not None:
+        watcher.stop()
+        print(f"Catalog changes applied: {watcher.applied}, rejected: {watcher.rejected}")
+
+
+if __name__ == '__main__':
+    main()
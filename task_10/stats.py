@@ -0,0 +1,155 @@
+"""
+Catalog statistics kept up to date as products are added and removed.
+
+The search prompt describes the catalog: product count, categories, and
+price and rating ranges. Recomputing these with min()/max() over every
+product costs a full pass per query. CatalogStats computes them once and
+then adjusts them per added or removed product:
+
+- counts per category, in order of first appearance
+- price and rating ranges, from counted values kept in sorted order
+- in-stock count
+- price and rating histograms
+
+`version` changes whenever the statistics do, so anything derived from them
+(such as the prompt) can be rebuilt only when needed.
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+Product = Dict[str, Any]
+
+PRICE_BUCKETS = (25, 50, 100, 200, 500, 1000)
+RATING_BUCKETS = (2.0, 3.0, 3.5, 4.0, 4.5, 5.0)
+
+
+class _CountedValues:
+    """Multiset of numbers with O(1) min and max"""
+
+    def __init__(self):
+        self._counts: Counter = Counter()
+        self._sorted: List[float] = []
+
+    def add(self, value: float) -> None:
+        if not self._counts[value]:
+            insort(self._sorted, value)
+        self._counts[value] += 1
+
+    def remove(self, value: float) -> None:
+        if not self._counts[value]:
+            raise KeyError(value)
+        self._counts[value] -= 1
+        if not self._counts[value]:
+            del self._counts[value]
+            del self._sorted[bisect_left(self._sorted, value)]
+
+    def range(self) -> Optional[Tuple[float, float]]:
+        return (self._sorted[0], self._sorted[-1]) if self._sorted else None
+
+    def state(self) -> Dict[str, List[float]]:
+        return {"values": list(self._sorted), "counts": [self._counts[value] for value in self._sorted]}
+
+    @classmethod
+    def from_state(cls, state: Dict[str, List[float]]) -> '_CountedValues':
+        values = cls()
+        values._sorted = list(state["values"])
+        values._counts = Counter(dict(zip(values._sorted, state["counts"])))
+        return values
+
+
+def _bucket_labels(edges: Tuple[float, ...], unit: str) -> List[str]:
+    labels = [f"< {unit}{edges[0]:g}"]
+    labels += [f"{unit}{low:g}-{unit}{high:g}" for low, high in zip(edges, edges[1:])]
+    return labels + [f">= {unit}{edges[-1]:g}"]
+
+
+class CatalogStats:
+    """Counts, ranges and histograms of a set of products"""
+
+    def __init__(self, products: Iterable[Product] = ()):
+        self.count = 0
+        self.in_stock = 0
+        self.categories: Dict[Any, int] = {}
+        self.price_histogram = [0] * (len(PRICE_BUCKETS) + 1)
+        self.rating_histogram = [0] * (len(RATING_BUCKETS) + 1)
+        self.version = 0
+        self._prices = _CountedValues()
+        self._ratings = _CountedValues()
+        for product in products:
+            self._apply(product, 1)
+        self.version = 1
+
+    def add(self, product: Product) -> None:
+        self._apply(product, 1)
+        self.version += 1
+
+    def remove(self, product: Product) -> None:
+        """Forget a product previously added"""
+        self._apply(product, -1)
+        self.version += 1
+
+    def replace(self, old: Product, new: Product) -> None:
+        self._apply(old, -1)
+        self._apply(new, 1)
+        self.version += 1
+
+    def _apply(self, product: Product, sign: int) -> None:
+        price, rating, category = product['price'], product['rating'], product['category']
+        if sign > 0:
+            self._prices.add(price)
+            self._ratings.add(rating)
+            self.categories[category] = self.categories.get(category, 0) + 1
+        else:
+            self._prices.remove(price)
+            self._ratings.remove(rating)
+            self.categories[category] -= 1
+            if not self.categories[category]:
+                del self.categories[category]
+        self.count += sign
+        self.in_stock += sign * bool(product['in_stock'])
+        self.price_histogram[bisect_right(PRICE_BUCKETS, price)] += sign
+        self.rating_histogram[bisect_right(RATING_BUCKETS, rating)] += sign
+
+    @property
+    def price_range(self) -> Optional[Tuple[float, float]]:
+        return self._prices.range()
+
+    @property
+    def rating_range(self) -> Optional[Tuple[float, float]]:
+        return self._ratings.range()
+
+    def state(self) -> Dict[str, Any]:
+        """JSON-serializable snapshot that from_state() restores, incremental updates included"""
+        return {
+            "count": self.count,
+            "in_stock": self.in_stock,
+            "categories": [[category, count] for category, count in self.categories.items()],
+            "price_histogram": self.price_histogram,
+            "rating_histogram": self.rating_histogram,
+            "prices": self._prices.state(),
+            "ratings": self._ratings.state(),
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> 'CatalogStats':
+        stats = cls()
+        stats.count, stats.in_stock = state["count"], state["in_stock"]
+        stats.categories = {category: count for category, count in state["categories"]}
+        stats.price_histogram = list(state["price_histogram"])
+        stats.rating_histogram = list(state["rating_histogram"])
+        stats._prices = _CountedValues.from_state(state["prices"])
+        stats._ratings = _CountedValues.from_state(state["ratings"])
+        return stats
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "in_stock": self.in_stock,
+            "categories": dict(self.categories),
+            "price_range": self.price_range,
+            "rating_range": self.rating_range,
+            "price_histogram": dict(zip(_bucket_labels(PRICE_BUCKETS, '$'), self.price_histogram)),
+            "rating_histogram": dict(zip(_bucket_labels(RATING_BUCKETS, ''), self.rating_histogram)),
+        }
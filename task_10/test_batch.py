@@ -0,0 +1,77 @@
+import asyncio
+import io
+import json
+import os
+import time
+import unittest
+
+from openai import AsyncOpenAI
+
+from batch import batch, read_queries
+from loadtest import MockCompletions
+from product_search import ProductSearchTool
+from query_cache import QueryCache
+from service import RateLimiter
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+class TestBatch(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.mock = MockCompletions(latency=0.02)
+        await self.mock.start()
+        self.addAsyncCleanup(self.mock.close)
+        self.tool = ProductSearchTool(client=object(), products_path=os.path.join(HERE, 'products.json'),
+                                      cache=QueryCache("test"))
+
+    async def run_batch(self, lines, **options):
+        output = io.StringIO()
+        client = AsyncOpenAI(api_key="test", base_url=self.mock.url, max_retries=0)
+        report = await batch(self.tool, read_queries(lines), output, client=client, **options)
+        return report, [json.loads(line) for line in output.getvalue().splitlines()]
+
+    async def test_results_in_input_order(self):
+        lines = ["gift for a fan of yoga\n", "\n", "kitchen under $50\n", "present for a fan of coffee\n",
+                 "gift for a fan of yoga\n", "books rated 4.5+\n"]
+        report, results = await self.run_batch(lines, concurrency=2, limit=3)
+        self.assertEqual([result["line"] for result in results], [1, 3, 4, 5, 6])
+        self.assertEqual([result["query"] for result in results], [line.strip() for line in lines if line.strip()])
+        self.assertEqual(results[1]["path"], 'local')
+        self.assertEqual(results[1]["arguments"], {"category": "Kitchen", "max_price": 50.0})
+        self.assertTrue(all(len(result["products"]) <= 3 and "latency_ms" in result for result in results))
+        self.assertEqual({result["path"] for result in (results[0], results[3])}, {'llm', 'shared'})
+        self.assertEqual(self.mock.calls, 2)
+        self.assertEqual((report.queries, report.errors, sum(report.paths.values())), (5, 0, 5))
+        self.assertEqual(len(report.latencies), 5)
+        self.assertIn("queries/s", str(report))
+
+    async def test_rate_limit(self):
+        lines = [f"gift for a fan of item {i}\n" for i in range(6)]
+        started = time.perf_counter()
+        report, results = await self.run_batch(lines, concurrency=6, rate=20)
+        # The first call starts at once, the other five 50 ms apart
+        self.assertGreaterEqual(time.perf_counter() - started, 0.24)
+        self.assertEqual((self.mock.calls, report.errors, len(results)), (6, 0, 6))
+
+    async def test_errors_are_reported_per_query(self):
+        self.mock.latency = 0.5
+        report, results = await self.run_batch(["gift for a fan of yoga\n", "books\n"], timeout=0.1)
+        self.assertEqual(report.errors, 1)
+        self.assertIn("Timed out", results[0]["error"])
+        self.assertEqual(results[1]["path"], 'local')
+        await asyncio.sleep(0.5)
+
+    async def test_rate_limiter(self):
+        now = [0.0]
+        limiter = RateLimiter(rate=2, burst=2, clock=lambda: now[0])
+        await limiter.acquire()
+        await limiter.acquire()
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0.01)
+        self.assertFalse(waiter.done())
+        now[0] = 0.5
+        await asyncio.wait_for(waiter, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import json
+import os
+import random
+import unittest
+
+from catalog import ProductCatalog
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def linear_filter(products, category=None, max_price=None, min_rating=None, in_stock_only=None, keywords=None):
+    """The original list-scanning filter_products(), kept as the reference"""
+    filtered = list(products)
+    if category:
+        filtered = [p for p in filtered if p['category'] == category]
+    if max_price is not None:
+        filtered = [p for p in filtered if p['price'] <= max_price]
+    if min_rating is not None:
+        filtered = [p for p in filtered if p['rating'] >= min_rating]
+    if in_stock_only is not None:
+        filtered = [p for p in filtered if p['in_stock'] == in_stock_only]
+    if keywords:
+        filtered = [p for p in filtered if any(k.lower() in p['name'].lower() for k in keywords)]
+    return filtered
+
+
+def load_sample_products():
+    with open(os.path.join(HERE, 'products.json'), encoding='utf-8') as file:
+        return json.load(file)
+
+
+def random_query(rng, products):
+    names = [p['name'] for p in products]
+    query = {}
+    if rng.random() < 0.4:
+        query['category'] = rng.choice(["Electronics", "Fitness", "Kitchen", "Books", "Clothing", "Toys", ""])
+    if rng.random() < 0.4:
+        query['max_price'] = rng.choice([0, 9.99, 25, 49.99, 100, 500, 5000])
+    if rng.random() < 0.4:
+        query['min_rating'] = rng.choice([0, 4.0, 4.35, 4.5, 4.8, 5.0])
+    if rng.random() < 0.3:
+        query['in_stock_only'] = rng.choice([True, False])
+    if rng.random() < 0.5:
+        words = []
+        for _ in range(rng.randint(0, 3)):
+            name = rng.choice(names)
+            start = rng.randrange(len(name))
+            words.append(rng.choice([name[start:start + rng.randint(1, 8)].upper(), "zzz", "", "phone"]))
+        query['keywords'] = words
+    return query
+
+
+class TestProductCatalog(unittest.TestCase):
+    def test_matches_linear_filter(self):
+        products = load_sample_products()
+        rng = random.Random(5)
+        # A larger catalog with many ties in price and rating
+        synthetic = [dict(rng.choice(products), price=rng.choice([5, 9.99, 25, 100, 500]),
+                          rating=rng.choice([3.9, 4.0, 4.5, 5.0]), in_stock=rng.random() < 0.7)
+                     for _ in range(2000)]
+        for data in (products, synthetic):
+            catalog = ProductCatalog(data)
+            for _ in range(1500):
+                query = random_query(rng, data)
+                result = catalog.filter(**query)
+                self.assertEqual(result, linear_filter(data, **query), query)
+                self.assertTrue(all(a is b for a, b in zip(result, linear_filter(data, **query))))
+
+    def test_examples(self):
+        catalog = ProductCatalog(load_sample_products())
+        self.assertEqual([p['name'] for p in catalog.filter(category="Electronics", max_price=60, in_stock_only=True)],
+                         ["Bluetooth Speaker", "Gaming Mouse", "Portable Charger"])
+        self.assertEqual([p['name'] for p in catalog.filter(keywords=["headphones"], min_rating=4.8)],
+                         ["Noise-Cancelling Headphones"])
+        self.assertEqual(len(catalog.filter()), len(catalog))
+        self.assertEqual(catalog.filter(category="Toys"), [])
+        self.assertEqual(ProductCatalog([]).filter(max_price=10, keywords=["a"]), [])
+
+    def test_keyword_match(self):
+        catalog = ProductCatalog(load_sample_products())
+        names = lambda products: [p['name'] for p in products]
+        self.assertEqual(names(catalog.filter(keywords=["wireles", "yoga"], keyword_match='fuzzy')),
+                         ["Wireless Headphones", "Yoga Mat"])
+        self.assertEqual(names(catalog.filter(category="Electronics", keywords=["Noise headphnes"],
+                                              keyword_match='fuzzy')), ["Noise-Cancelling Headphones"])
+        self.assertEqual(catalog.filter(keywords=["head"], keyword_match='exact'), [])
+        self.assertEqual(catalog.filter(keywords=["head"], keyword_match='prefix'), catalog.filter(keywords=["headp"]))
+        self.assertEqual(len(catalog.filter(keywords=["", "zzz"], keyword_match='prefix')), len(catalog))
+        with self.assertRaises(ValueError):
+            catalog.filter(keyword_match='regex')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import os
+import random
+import tempfile
+import unittest
+
+from catalog_file import MappedCatalog, convert_json, write_catalog
+from columnar import ColumnarCatalog, np
+from query_cache import QueryCache
+from stats import CatalogStats
+from test_catalog import HERE, linear_filter, load_sample_products, random_query
+from test_query_cache import StubClient
+from product_search import ProductSearchTool
+
+
+class TestCatalogFile(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.products = load_sample_products() + [
+            {"name": "İstanbul Straße Lamp", "category": "Home", "price": 19.5, "rating": 3.5, "in_stock": False},
+            {"name": "", "category": "Home", "price": 0, "rating": 0, "in_stock": True},
+        ]
+
+    def mapped(self, products):
+        path = os.path.join(self.directory, 'products.pcat')
+        write_catalog(products, path)
+        mapped = MappedCatalog(path)
+        self.addCleanup(mapped.close)
+        return mapped
+
+    def test_round_trip(self):
+        for products in (self.products, load_sample_products(), []):
+            mapped = self.mapped(products)
+            self.assertEqual(list(mapped), products)
+            self.assertEqual(len(mapped), len(products))
+            self.assertEqual(mapped.load_stats().as_dict(), CatalogStats(products).as_dict())
+        mapped = self.mapped(self.products)
+        self.assertEqual(mapped[-2]["name"], "İstanbul Straße Lamp")
+        self.assertEqual(mapped[1:3], self.products[1:3])
+        self.assertIn("strasse", mapped.vocabulary)
+        self.assertIn("strasse lamp", mapped.phrases)
+        with self.assertRaises(IndexError):
+            mapped[len(self.products)]
+
+    def test_convert_json_and_invalid_files(self):
+        path = os.path.join(self.directory, 'sample.pcat')
+        self.assertEqual(convert_json(os.path.join(HERE, 'products.json'), path), 50)
+        mapped = MappedCatalog(path)
+        self.assertEqual(list(mapped), load_sample_products())
+        mapped.close()
+        for data in (b'', b'PCAT', b'PCAT\x01\x00\x00\x00' + bytes(8), b'{"not": "a catalog"}'):
+            with open(path, 'wb') as file:
+                file.write(data)
+            with self.assertRaises(ValueError):
+                MappedCatalog(path)
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_columnar_view(self):
+        mapped = self.mapped(self.products)
+        catalog = ColumnarCatalog.from_mapped(mapped)
+        rng = random.Random(2)
+        for _ in range(1000):
+            query = random_query(rng, self.products[:-1])
+            self.assertEqual(catalog.filter(**query), linear_filter(self.products, **query), query)
+        self.assertEqual(catalog.filter(keywords=["STRASSE", "straße"])[0]["name"], "İstanbul Straße Lamp")
+        self.assertFalse(catalog.prices.flags.writeable)
+        del catalog
+
+    def test_search_tool_starts_from_catalog_file(self):
+        path = os.path.join(self.directory, 'products.pcat')
+        convert_json(os.path.join(HERE, 'products.json'), path)
+        from_json = ProductSearchTool(client=StubClient({}), products_path=os.path.join(HERE, 'products.json'),
+                                      cache=QueryCache("test"))
+        from_file = ProductSearchTool(client=StubClient({}), products_path=path, cache=QueryCache("test"))
+        self.assertIsInstance(from_file.products, MappedCatalog)
+        self.assertEqual(from_file.stats.as_dict(), from_json.stats.as_dict())
+        from_file.refresh_prompt()
+        from_json.refresh_prompt()
+        self.assertEqual(from_file.system_prompt, from_json.system_prompt)
+        for query in ("electronics under $60 in stock", "books rated 4.5+", "headphones", "smart watch",
+                      "yoga mats under 30"):
+            self.assertEqual(from_file.search_products(query), from_json.search_products(query))
+            self.assertEqual(from_file.last_path, 'local')
+        # Both sources give the parser the same words and phrases
+        for query in ("smart watch", "yoga mats", "mat for yoga", "smart headphones"):
+            self.assertEqual(from_file.parser.parse(query), from_json.parser.parse(query), query)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import random
+import unittest
+
+from catalog import ProductCatalog
+from columnar import ColumnarCatalog, np
+from test_catalog import linear_filter, load_sample_products, random_query
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class TestColumnarCatalog(unittest.TestCase):
+    def test_matches_linear_filter(self):
+        products = load_sample_products()
+        rng = random.Random(11)
+        synthetic = [dict(rng.choice(products), price=rng.choice([5, 9.99, 25, 100, 500]),
+                          rating=rng.choice([3.9, 4.0, 4.5, 5.0]), in_stock=rng.random() < 0.7)
+                     for _ in range(2000)]
+        # Names whose lowercase form has a different UTF-8 length than the original
+        synthetic += [dict(products[0], name="İstanbul Lamp"), dict(products[1], name="Straße Bike\nLine 2")]
+        for data in (products, synthetic):
+            catalog = ColumnarCatalog(data)
+            for _ in range(1500):
+                query = random_query(rng, data)
+                self.assertEqual(catalog.filter(**query), linear_filter(data, **query), query)
+        for query in (dict(keywords=["i̇stanbul"]), dict(keywords=["lamp"]), dict(keywords=["bike\nline"]),
+                      dict(in_stock_only=1), dict(in_stock_only="yes")):
+            self.assertEqual(catalog.filter(**query), linear_filter(synthetic, **query), query)
+
+    def test_keyword_match(self):
+        products = load_sample_products()
+        columnar, indexed = ColumnarCatalog(products), ProductCatalog(products)
+        for keywords in (["wireles", "yoga"], ["head"], ["noise headphnes"], ["", "zzz"]):
+            for mode in ('exact', 'prefix', 'fuzzy'):
+                self.assertEqual(columnar.filter(keywords=keywords, keyword_match=mode),
+                                 indexed.filter(keywords=keywords, keyword_match=mode), (keywords, mode))
+        with self.assertRaises(ValueError):
+            columnar.mask(keyword_match='regex')
+
+    def test_from_columns(self):
+        catalog = ColumnarCatalog.from_columns(["Desk Lamp", "Floor Lamp", "Kettle"], ["Home", "Home", "Kitchen"],
+                                               [25.0, 80.0, 30.0], [4.1, 4.6, 3.9], [True, False, True])
+        self.assertEqual(len(catalog), 3)
+        self.assertEqual(catalog.filter_ids(keywords=["LAMP"], max_price=50).tolist(), [0])
+        self.assertEqual(catalog.product(1), {"name": "Floor Lamp", "category": "Home", "price": 80.0,
+                                              "rating": 4.6, "in_stock": False})
+        self.assertEqual(catalog.filter(category="Garden"), [])
+        self.assertLess(catalog.nbytes, 200)
+        with self.assertRaises(ValueError):
+            ColumnarCatalog.from_columns(["A"], [], [1.0], [1.0], [True])
+
+
+if __name__ == '__main__':
+    unittest.main()
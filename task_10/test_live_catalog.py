@@ -0,0 +1,285 @@
+import asyncio
+import json
+import os
+import random
+import tempfile
+import threading
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from openai import AsyncOpenAI
+
+from catalog import KEYWORD_MATCHES, ProductCatalog
+from live_catalog import ChangelogWatcher, LiveCatalog, parse_change
+from loadtest import request
+from persistent import SortedMap, Vector
+from product_search import ProductSearchTool
+from query_cache import QueryCache
+from service import SearchService
+from test_catalog import load_sample_products, random_query
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def random_change(rng, catalog, number):
+    """An upsert of a new or known product, or a delete of a known one"""
+    names = [product['name'] for product in catalog]
+    if names and rng.random() < 0.3:
+        return {"op": "delete", "name": rng.choice(names)}
+    if names and rng.random() < 0.5:
+        name = rng.choice(names)
+    else:
+        name = f"{rng.choice(['Smart', 'Wireless', 'Mini'])} {rng.choice(['Phone', 'Lamp', 'Mat'])} {number}"
+    return {"op": "upsert", "product": {
+        "name": name, "category": rng.choice(["Electronics", "Fitness", "Kitchen", "Garden"]),
+        "price": rng.choice([5, 9.99, 25, 49.99, 100, 500]), "rating": rng.choice([3.9, 4.0, 4.5, 5.0]),
+        "in_stock": rng.random() < 0.7}}
+
+
+def apply(catalog, change):
+    if change["op"] == "delete":
+        return catalog.delete(change["name"])
+    return catalog.upsert(change["product"])
+
+
+class TestPersistent(unittest.TestCase):
+    def test_sorted_map_matches_dict(self):
+        rng = random.Random(3)
+        versions = [(SortedMap(), {})]
+        for _ in range(2000):
+            tree, reference = versions[-1]
+            key = rng.randrange(300)
+            if reference and rng.random() < 0.4:
+                key = rng.choice(list(reference))
+                tree, reference = tree.remove(key), {k: v for k, v in reference.items() if k != key}
+            else:
+                tree, reference = tree.set(key, -key), {**reference, key: -key}
+            versions.append((tree, reference))
+        # Every version still holds what it held when it was made
+        for tree, reference in versions[::50]:
+            self.assertEqual(list(tree.items()), sorted(reference.items()))
+            self.assertEqual(len(tree), len(reference))
+            for bound in (-1, 0, 150, 299, 300):
+                self.assertEqual(tree.rank(bound), sum(key < bound for key in reference))
+                self.assertEqual(list(tree.items(bound, bound + 40)),
+                                 sorted((key, value) for key, value in reference.items() if bound <= key < bound + 40))
+                self.assertEqual(list(tree.values(stop=bound)), [-key for key in sorted(reference) if key < bound])
+        with self.assertRaises(KeyError):
+            SortedMap.from_keys([1, 2]).remove(3)
+        self.assertEqual(list(SortedMap.from_keys([3, 1, 2, 1])), [1, 2, 3])
+
+    def test_vector_matches_list(self):
+        rng = random.Random(4)
+        vector, reference = Vector(range(40)), list(range(40))
+        old = vector
+        for i in range(3000):
+            if rng.random() < 0.5:
+                vector, reference = vector.append(i), reference + [i]
+            else:
+                index = rng.randrange(len(reference))
+                vector = vector.set(index, -i)
+                reference = reference[:index] + [-i] + reference[index + 1:]
+        self.assertEqual(list(vector), reference)
+        self.assertEqual([vector[i] for i in range(len(reference))], reference)
+        self.assertEqual(list(old), list(range(40)))
+        with self.assertRaises(IndexError):
+            vector[len(reference)]
+        with self.assertRaises(IndexError):
+            vector.set(len(reference) + 1, 0)
+
+
+class TestLiveCatalog(unittest.TestCase):
+    def test_matches_rebuilt_catalog(self):
+        rng = random.Random(6)
+        catalog = LiveCatalog(load_sample_products())
+        for number in range(300):
+            catalog = apply(catalog, random_change(rng, catalog, number))
+            if number % 30:
+                continue
+            products = list(catalog)
+            rebuilt = ProductCatalog(products)
+            self.assertEqual(len(catalog), len(products))
+            for _ in range(40):
+                query = dict(random_query(rng, products), keyword_match=rng.choice(KEYWORD_MATCHES))
+                self.assertEqual(catalog.filter(**query), rebuilt.filter(**query), query)
+                sort, keywords = rng.choice(['relevance', 'rating', 'price']), query.get('keywords')
+                ranked = catalog.top(catalog.filter_ids(**query, ordered=False), sort, keywords, 5)
+                expected = rebuilt.top(rebuilt.filter_ids(**query), sort, keywords, 5)
+                self.assertEqual([catalog.product(i) for _, i in ranked], [rebuilt.product(i) for _, i in expected])
+
+    def test_snapshots_are_unchanged(self):
+        before = LiveCatalog(load_sample_products())
+        smart = before.filter(keywords=["smart"])
+        after = before.upsert({**smart[1], "price": 1.0}).delete(smart[0]["name"])
+        after = after.upsert({"name": "Smart Speaker", "category": "Electronics", "price": 30, "rating": 4.4,
+                              "in_stock": True})
+        self.assertEqual(before.filter(keywords=["smart"]), smart)
+        self.assertEqual(len(before), 50)
+        self.assertEqual([p["name"] for p in after.filter(keywords=["smart"])], ["Smartphone", "Smart Speaker"])
+        self.assertEqual(after.filter(max_price=1.0), [{**smart[1], "price": 1.0}])
+
+    def test_errors(self):
+        catalog = LiveCatalog(load_sample_products())
+        with self.assertRaises(KeyError):
+            catalog.delete("No Such Product")
+        with self.assertRaises(ValueError):
+            catalog.upsert({"name": "Half a Product", "price": 10})
+        with self.assertRaises(ValueError):
+            LiveCatalog(load_sample_products() * 2)
+
+    def test_parse_change(self):
+        self.assertEqual(parse_change({"op": "delete", "name": "Mat", "extra": 1}), {"op": "delete", "name": "Mat"})
+        self.assertEqual(parse_change({"op": "upsert", "product": {"name": "Mat", "price": 3}}),
+                         {"op": "upsert", "product": {"name": "Mat", "price": 3}})
+        for change in ([], {"op": "rename"}, {"op": "delete"}, {"op": "upsert", "product": {"price": 3}},
+                       {"op": "upsert", "product": {"name": "Mat", "colour": "red"}},
+                       {"op": "upsert", "product": {"name": "Mat", "price": "cheap"}},
+                       {"op": "upsert", "product": {"name": "Mat", "rating": True}},
+                       {"op": "upsert", "product": {"name": "Mat", "in_stock": 1}}):
+            with self.assertRaises(ValueError, msg=change):
+                parse_change(change)
+
+
+class TestUpdates(unittest.TestCase):
+    def setUp(self):
+        self.tool = ProductSearchTool(client=object(), products_path=os.path.join(HERE, 'products.json'),
+                                      cache=QueryCache("test"))
+
+    def test_apply_changes(self):
+        tool = self.tool
+        tool.get_filter_function_schema()
+        applied = tool.apply_changes([
+            {"op": "upsert", "product": {"name": "Garden Hose", "category": "Garden", "price": 19.99,
+                                         "rating": 4.2, "in_stock": True}},
+            {"op": "upsert", "product": {"name": "Yoga Mat", "price": 9.5}},
+            {"op": "delete", "name": "No Such Product"},
+        ])
+        self.assertEqual(applied, 3)
+        self.assertIsInstance(tool.catalog, LiveCatalog)
+        self.assertEqual(tool.stats.count, 51)
+        self.assertEqual(tool.stats.categories["Garden"], 1)
+        self.assertIn("Garden", tool.get_filter_function_schema()["function"]["parameters"]["properties"]
+                      ["category"]["enum"])
+        self.assertIn("Garden", tool.system_prompt["content"])
+        self.assertEqual(tool.parser.parse("garden hose").arguments, {"category": "Garden", "keywords": ["hose"]})
+        mat = tool.catalog.get("Yoga Mat")
+        self.assertEqual((mat["price"], mat["category"]), (9.5, "Fitness"))
+        self.assertEqual([p["name"] for p in tool.filter_products(max_price=9.5, category="Fitness")], ["Yoga Mat"])
+
+        tool.delete_product("Garden Hose")
+        self.assertNotIn("Garden", tool.stats.categories)
+        self.assertNotIn("Garden", tool.get_filter_function_schema()["function"]["parameters"]["properties"]
+                         ["category"]["enum"])
+        self.assertEqual(len(tool.catalog), 50)
+        self.assertLess(tool.parser.parse("hose").confidence, 0.75)
+        self.assertEqual(tool.parser.parse("yoga mat").arguments, {"keywords": ["yoga mat"]})
+
+    def test_invalid_batch_changes_nothing(self):
+        tool = self.tool
+        catalog, version = tool.catalog, tool.stats.version
+        for changes in ([{"op": "delete", "name": "Yoga Mat"}, {"op": "upsert", "product": {"name": "New"}}],
+                        [{"op": "delete", "name": "Yoga Mat"}, {"op": "upsert", "product": {"price": 1}}]):
+            with self.assertRaises(ValueError):
+                tool.apply_changes(changes)
+        self.assertIs(tool.catalog, catalog)
+        self.assertEqual(tool.stats.version, version)
+
+    def test_readers_see_whole_batches(self):
+        tool = self.tool
+        tool.apply_changes([])
+        stop = threading.Event()
+        seen = set()
+
+        def read():
+            while not stop.is_set():
+                seen.add(tool.page_products({"keywords": ["e"]}, limit=100).total
+                         + tool.page_products({"keywords": ["e"]}, limit=100, sort='price').total * 1000)
+
+        reader = threading.Thread(target=read)
+        reader.start()
+        try:
+            products = load_sample_products()
+            expected = len(tool.filter_products(keywords=["e"]))
+            # Each batch removes a product and adds it back, so every snapshot has the same products
+            for i in range(200):
+                product = products[i % len(products)]
+                tool.apply_changes([{"op": "delete", "name": product["name"]},
+                                    {"op": "upsert", "product": product}])
+        finally:
+            stop.set()
+            reader.join()
+        self.assertEqual(seen, {expected * 1001})
+
+    def test_changelog(self):
+        tool = self.tool
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "changes.ndjson")
+            watcher = ChangelogWatcher(path, tool.apply_changes)
+            self.assertEqual(watcher.poll(), 0)
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write(json.dumps({"op": "upsert", "product": {"name": "Yoga Mat", "price": 5.0}}) + "\n")
+                file.write("not json\n\n")
+                file.write(json.dumps({"op": "upsert", "product": {"name": "Unknown", "price": 1.0}}) + "\n")
+                file.write(json.dumps({"op": "delete", "name": "Coffee Maker"})[:20])
+            with redirect_stdout(StringIO()) as output:
+                self.assertEqual(watcher.poll(), 1)
+            self.assertEqual(output.getvalue().count("skipped invalid change"), 2)
+            self.assertEqual((watcher.applied, watcher.rejected), (1, 2))
+            self.assertEqual(tool.catalog.get("Yoga Mat")["price"], 5.0)
+            self.assertIsNotNone(tool.catalog.get("Coffee Maker"))
+
+            # The rest of the line arrives
+            with open(path, 'a', encoding='utf-8') as file:
+                file.write(json.dumps({"op": "delete", "name": "Coffee Maker"})[20:] + "\n")
+            self.assertEqual(watcher.poll(), 1)
+            self.assertIsNone(tool.catalog.get("Coffee Maker"))
+
+            # Truncated and written again: read from the start
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write(json.dumps({"op": "upsert", "product": {"name": "Yoga Mat", "price": 6.0}}) + "\n")
+            self.assertEqual(watcher.poll(), 1)
+            self.assertEqual(tool.catalog.get("Yoga Mat")["price"], 6.0)
+
+            watcher = tool.watch_changelog(path, interval=0.01)
+            try:
+                with open(path, 'a', encoding='utf-8') as file:
+                    file.write(json.dumps({"op": "delete", "name": "Yoga Mat"}) + "\n")
+                for _ in range(200):
+                    if tool.catalog.get("Yoga Mat") is None:
+                        break
+                    threading.Event().wait(0.01)
+            finally:
+                watcher.stop()
+            self.assertIsNone(tool.catalog.get("Yoga Mat"))
+
+
+class TestChangesEndpoint(unittest.IsolatedAsyncioTestCase):
+    async def test_post_changes(self):
+        tool = ProductSearchTool(client=object(), products_path=os.path.join(HERE, 'products.json'),
+                                 cache=QueryCache("test"))
+        service = SearchService(tool, AsyncOpenAI(api_key="test", base_url="http://127.0.0.1:9/v1"))
+        self.addAsyncCleanup(service.close)
+        server = await service.start(port=0)
+        self.addAsyncCleanup(server.wait_closed)
+        self.addCleanup(server.close)
+        reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+        self.addCleanup(writer.close)
+
+        status, result = await request(reader, writer, 'POST', '/changes', [
+            {"op": "upsert", "product": {"name": "Garden Hose", "category": "Garden", "price": 19.99,
+                                         "rating": 4.2, "in_stock": True}},
+            {"op": "delete", "name": "Yoga Mat"}])
+        self.assertEqual((status, result), (200, {"applied": 2, "products": 50}))
+        status, result = await request(reader, writer, 'POST', '/changes', {"op": "delete", "name": "Garden Hose"})
+        self.assertEqual((status, result), (200, {"applied": 1, "products": 49}))
+        for payload in ({"op": "upsert"}, "delete everything", [{"op": "upsert", "product": {"name": "New"}}]):
+            self.assertEqual((await request(reader, writer, 'POST', '/changes', payload))[0], 400, payload)
+        self.assertEqual((await request(reader, writer, 'GET', '/changes'))[0], 405)
+        status, result = await request(reader, writer, 'GET', '/search?q=fitness')
+        self.assertEqual((status, result["path"]), (200, 'local'))
+        self.assertNotIn("Yoga Mat", [product["name"] for product in result["products"]])
+
+
+if __name__ == '__main__':
+    unittest.main()
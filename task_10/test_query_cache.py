@@ -0,0 +1,140 @@
+import json
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+from product_search import ProductSearchTool
+from query_cache import QueryCache, fingerprint, normalize_query
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class StubClient:
+    """Stands in for OpenAI(): answers every completion with a filter_products tool call"""
+
+    def __init__(self, arguments):
+        self.arguments = arguments
+        self.calls = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **request):
+        self.calls.append(request)
+        function = SimpleNamespace(name="filter_products", arguments=json.dumps(self.arguments))
+        message = SimpleNamespace(tool_calls=[SimpleNamespace(function=function)])
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def make_tool(client, cache, local=False):
+    tool = ProductSearchTool(client=client, products_path=os.path.join(HERE, 'products.json'), cache=cache)
+    if not local:
+        # Exercise the model path even for queries the local parser understands
+        tool.parser_confidence = float('inf')
+    return tool
+
+
+class TestQueryCache(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'cache.sqlite3')
+        self.clock = Clock()
+
+    def cache(self, schema="v1", **options):
+        cache = QueryCache(fingerprint(schema), path=self.path, clock=self.clock, **options)
+        self.addCleanup(cache.close)
+        return cache
+
+    def test_normalize_query(self):
+        self.assertEqual(normalize_query("  Electronics   under $200?! "), "electronics under $200")
+        self.assertEqual(normalize_query("ＢＯＯＫＳ\trated 4.5+"), "books rated 4.5+")
+
+    def test_tiers_and_stats(self):
+        cache = self.cache(max_entries=2)
+        self.assertIsNone(cache.get("kitchen under $100"))
+        cache.put("kitchen under $100", {"category": "Kitchen", "max_price": 100})
+        cache.put("books", {"category": "Books"})
+        cache.put("fitness", {"category": "Fitness"})
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.get("Books."), {"category": "Books"})
+        # Evicted from memory, still on disk
+        self.assertEqual(cache.get("KITCHEN under $100"), {"category": "Kitchen", "max_price": 100})
+        self.assertEqual(cache.stats.as_dict(), {"lookups": 3, "memory_hits": 1, "disk_hits": 1, "misses": 1,
+                                                 "hit_rate": 0.6667})
+        # Returned arguments are copies
+        cache.get("books")["category"] = "Toys"
+        self.assertEqual(cache.get("books"), {"category": "Books"})
+
+    def test_memory_only_lookups(self):
+        self.cache().put("books", {"category": "Books"})
+        cache = self.cache()
+        self.assertTrue(cache.persistent)
+        # A memory miss is left for get_disk(), which counts it
+        self.assertIsNone(cache.get("books", disk=False))
+        self.assertEqual(cache.stats.lookups, 0)
+        self.assertEqual(cache.get_disk("Books"), {"category": "Books"})
+        self.assertEqual(cache.get("books", disk=False), {"category": "Books"})
+        self.assertIsNone(cache.get_disk("fitness"))
+        self.assertEqual((cache.stats.memory_hits, cache.stats.disk_hits, cache.stats.misses), (1, 1, 1))
+
+        memory = QueryCache("v1")
+        self.assertFalse(memory.persistent)
+        self.assertIsNone(memory.get("books", disk=False))
+        self.assertEqual(memory.stats.misses, 1)
+
+    def test_check_arguments(self):
+        tool = make_tool(StubClient({}), QueryCache("test"))
+        tool.check_arguments({"category": "Books", "max_price": 20, "keywords": ["guide"], "sort_by": "price"})
+        for arguments, error in (({"colour": "red"}, TypeError), ({"max_price": "20"}, TypeError),
+                                 ({"keywords": "guide"}, TypeError), ({"keyword_match": "regex"}, ValueError),
+                                 ({"sort_by": "name"}, ValueError)):
+            with self.assertRaises(error, msg=arguments):
+                tool.check_arguments(arguments)
+
+    def test_ttl_and_schema_change(self):
+        cache = self.cache(ttl=60)
+        cache.put("books", {"category": "Books"})
+        self.clock.now += 30
+        self.assertEqual(self.cache(ttl=60).get("books"), {"category": "Books"})
+        self.clock.now += 31
+        self.assertIsNone(cache.get("books"))
+        self.assertIsNone(self.cache(ttl=60).get("books"))
+
+        self.cache().put("books", {"category": "Books"})
+        self.assertIsNotNone(self.cache().get("books"))
+        self.assertIsNone(self.cache(schema="v2").get("books"))
+        self.assertIsNone(self.cache().get("books"))
+
+    def test_search_products_skips_repeated_calls(self):
+        client = StubClient({"category": "Electronics", "max_price": 60, "in_stock_only": True})
+        tool = make_tool(client, self.cache())
+        first = tool.search_products("Electronics under $60 in stock")
+        self.assertEqual([p['name'] for p in first], ["Bluetooth Speaker", "Gaming Mouse", "Portable Charger"])
+        self.assertEqual(tool.search_products("electronics under $60 in stock!"), first)
+        self.assertEqual(len(client.calls), 1)
+        self.assertEqual(client.calls[0]['model'], "gpt-4.1-mini")
+
+        # A new process with the same cache file makes no call either
+        restarted = make_tool(StubClient({}), self.cache())
+        self.assertEqual(restarted.search_products("Electronics under $60 in stock"), first)
+        self.assertEqual(restarted.client.calls, [])
+        self.assertEqual(restarted.cache.stats.disk_hits, 1)
+
+    def test_failed_arguments_are_not_cached(self):
+        client = StubClient({"colour": "red"})
+        tool = make_tool(client, self.cache())
+        self.assertEqual(tool.search_products("red things"), [])
+        self.assertEqual(tool.search_products("red things"), [])
+        self.assertEqual(len(client.calls), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
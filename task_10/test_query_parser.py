@@ -0,0 +1,85 @@
+import unittest
+
+from query_cache import QueryCache
+from query_parser import QueryParser
+from test_catalog import load_sample_products
+from test_query_cache import StubClient, make_tool
+
+
+class TestQueryParser(unittest.TestCase):
+    def setUp(self):
+        products = load_sample_products()
+        self.parser = QueryParser(dict.fromkeys(p['category'] for p in products), (p['name'] for p in products))
+
+    def test_confident_queries(self):
+        cases = {
+            "Show me all electronics": {"category": "Electronics"},
+            "kitchen under $100 in stock": {"category": "Kitchen", "max_price": 100, "in_stock_only": True},
+            "Kitchen appliances that are in stock and under $100":
+                {"category": "Kitchen", "max_price": 100, "in_stock_only": True},
+            "books rated 4.5+": {"category": "Books", "min_rating": 4.5},
+            "Fitness equipment with ratings above 4.5": {"category": "Fitness", "min_rating": 4.5},
+            "I need a smartphone under $800": {"max_price": 800, "keywords": ["smartphone"]},
+            "4 stars and up yoga mats under 30": {"min_rating": 4, "max_price": 30, "keywords": ["yoga mat"]},
+            "out of stock clothes": {"category": "Clothing", "in_stock_only": False},
+            "speakers $50 or less": {"max_price": 50, "keywords": ["speaker"]},
+            "headphones under 1k": {"max_price": 1000, "keywords": ["headphones"]},
+            "gadgets less than $1,200.50": {"category": "Electronics", "max_price": 1200.5},
+            "Men's clothing under $50": {"category": "Clothing", "max_price": 50, "keywords": ["men's"]},
+        }
+        for query, expected in cases.items():
+            parsed = self.parser.parse(query)
+            self.assertEqual(parsed.arguments, expected, query)
+            self.assertEqual(parsed.confidence, 1.0, query)
+
+    def test_unsure_queries(self):
+        for query in ("Wireless headphones with good ratings", "cheap speakers", "electronics not in stock",
+                      "books or clothing", "hello", "", "reviews over 100", "under $50 and under $80",
+                      "electronics and kitchen", "rated 7 stars"):
+            self.assertLess(self.parser.parse(query).confidence, 0.75, query)
+        self.assertEqual(self.parser.parse("cheap speakers").unknown, ["cheap"])
+
+    def test_adjacent_words_form_a_phrase(self):
+        products = load_sample_products()
+        for query, keywords in {"smart watch": ["smart watch"], "Yoga mats": ["yoga mat"],
+                                "smart watches in stock": ["smart watch"]}.items():
+            parsed = self.parser.parse(query)
+            self.assertEqual(parsed.arguments.get('keywords'), keywords, query)
+            self.assertEqual(parsed.confidence, 1.0, query)
+        self.assertEqual([p['name'] for p in products if "smart watch" in p['name'].lower()], ["Smart Watch"])
+
+        # Separate keywords would be OR'd, so the model decides what was meant
+        for query in ("mat for yoga", "watch smartphone", "headphones speaker"):
+            parsed = self.parser.parse(query)
+            self.assertGreater(len(parsed.arguments['keywords']), 1, query)
+            self.assertLess(parsed.confidence, 0.75, query)
+
+    def test_vocabulary_updates(self):
+        self.assertLess(self.parser.parse("kite").confidence, 0.75)
+        self.parser.add_names(["Stunt Kite"])
+        self.parser.set_categories(["Toys"])
+        self.assertEqual(self.parser.parse("toys: kites").arguments, {"category": "Toys", "keywords": ["kite"]})
+        self.parser.set_names(["Yoga Mat"])
+        self.assertLess(self.parser.parse("kite").confidence, 0.75)
+        self.assertLess(self.parser.parse("smart watch").confidence, 0.75)
+        self.assertEqual(self.parser.parse("yoga mat").arguments, {"keywords": ["yoga mat"]})
+
+
+class TestSearchPaths(unittest.TestCase):
+    def test_local_fast_path_and_fallback(self):
+        client = StubClient({"category": "Books", "keywords": ["programming"]})
+        tool = make_tool(client, QueryCache("test"), local=True)
+        local = tool.search_products("electronics under $60 in stock")
+        self.assertEqual([p['name'] for p in local], ["Bluetooth Speaker", "Gaming Mouse", "Portable Charger"])
+        self.assertEqual((tool.last_path, client.calls), ('local', []))
+
+        self.assertEqual([p['name'] for p in tool.search_products("something to learn coding")],
+                         ["Programming Guide"])
+        self.assertEqual(tool.search_products("something to learn coding"), tool.search_products("books about code"))
+        self.assertEqual(len(client.calls), 2)
+        self.assertEqual(dict(tool.paths), {'local': 1, 'llm': 2, 'cache': 1})
+        self.assertEqual(tool.path_report(), "local 1 (25.0%), cache 1 (25.0%), llm 2 (50.0%)")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import random
+import unittest
+
+from catalog import ProductCatalog
+from columnar import ColumnarCatalog, np
+from query_cache import QueryCache
+from ranking import SORTS, decode_cursor, encode_cursor, relevance, sort_key
+from test_catalog import load_sample_products, random_query
+from test_query_cache import StubClient, make_tool
+
+
+def full_sort(products, ids, sort, keywords):
+    """Reference ranking: sort every match"""
+    needles = [keyword.lower() for keyword in keywords or ()]
+    return sorted((sort_key(sort, products[i]['price'], products[i]['rating'], products[i]['name'].lower(),
+                            needles), i) for i in ids)
+
+
+def all_pages(catalog, ids, sort, keywords, limit):
+    ranked, after = [], None
+    while True:
+        page = catalog.top(ids, sort, keywords, limit + 1, after)
+        ranked += page[:limit]
+        if len(page) <= limit:
+            return ranked
+        after = decode_cursor(encode_cursor(sort, page[limit - 1]), sort)
+
+
+class TestRanking(unittest.TestCase):
+    def test_relevance(self):
+        self.assertEqual(relevance("wireless earbuds", ["earbuds"]), 2)
+        self.assertEqual(relevance("wireless earbuds", ["ear"]), 1.5)
+        self.assertEqual(relevance("wireless earbuds", ["buds"]), 1)
+        self.assertEqual(relevance("wireless earbuds", ["wireless", "phone"]), 2)
+        self.assertEqual(sort_key('relevance', 10.0, 4.5), sort_key('rating', 10.0, 4.5))
+
+    def test_pages_match_full_sort(self):
+        products = load_sample_products()
+        rng = random.Random(5)
+        synthetic = [dict(rng.choice(products), price=rng.choice([5, 9.99, 25, 100]),
+                          rating=rng.choice([3.9, 4.0, 4.5])) for _ in range(1000)]
+        catalogs = [ProductCatalog]
+        if np is not None:
+            catalogs.append(ColumnarCatalog)
+        for data in (products, synthetic):
+            for catalog_type in catalogs:
+                catalog = catalog_type(data)
+                for _ in range(100):
+                    query = random_query(rng, data)
+                    ids = catalog.filter_ids(**query)
+                    self.assertEqual(sorted(catalog.filter_ids(**query, ordered=False)), list(ids))
+                    sort, limit = rng.choice(SORTS), rng.choice([1, 3, 10])
+                    expected = full_sort(data, list(ids), sort, query.get('keywords'))
+                    self.assertEqual(catalog.top(ids, sort, query.get('keywords'), limit), expected[:limit])
+                    self.assertEqual(all_pages(catalog, ids, sort, query.get('keywords'), limit), expected,
+                                     (catalog_type, query, sort))
+
+    def test_sort_orders(self):
+        catalog = ProductCatalog(load_sample_products())
+        ids = catalog.filter_ids(category="Electronics")
+        prices = [catalog.product(i)['price'] for _, i in catalog.top(ids, 'price', limit=len(ids))]
+        ratings = [catalog.product(i)['rating'] for _, i in catalog.top(ids, 'rating', limit=len(ids))]
+        self.assertEqual(prices, sorted(prices))
+        self.assertEqual(ratings, sorted(ratings, reverse=True))
+        with self.assertRaises(ValueError):
+            catalog.top(ids, 'name')
+
+    def test_invalid_cursor(self):
+        cursor = encode_cursor('price', ((9.99, -4.5), 3))
+        self.assertEqual(decode_cursor(cursor, 'price'), ((9.99, -4.5), 3))
+        for bad in ("not a cursor", "", encode_cursor('price', ((1.0,), 2))[:-4]):
+            with self.assertRaises(ValueError):
+                decode_cursor(bad, 'price')
+        with self.assertRaises(ValueError):
+            decode_cursor(cursor, 'rating')
+
+
+class TestSearchPages(unittest.TestCase):
+    def setUp(self):
+        self.client = StubClient({"category": "Electronics", "sort_by": "price"})
+        self.tool = make_tool(self.client, QueryCache("test"))
+
+    def test_search_page(self):
+        everything = self.tool.filter_products(category="Electronics")
+        page = self.tool.search_page("cheapest electronics", limit=4)
+        self.assertEqual(page.total, len(everything))
+        self.assertEqual(page.products, sorted(everything, key=lambda p: (p['price'], -p['rating']))[:4])
+        self.assertEqual(self.tool.last_arguments, {"category": "Electronics", "sort_by": "price"})
+
+        shown, cursor = list(page.products), page.next_cursor
+        while cursor:
+            page = self.tool.page_products(self.tool.last_arguments, limit=4, cursor=cursor)
+            shown += page.products
+            cursor = page.next_cursor
+        self.assertEqual(sorted(shown, key=lambda p: p['name']), sorted(everything, key=lambda p: p['name']))
+        self.assertEqual(len(self.client.calls), 1)
+
+    def test_streamed_output(self):
+        products = self.tool.filter_products(category="Books")
+        lines = list(self.tool.iter_products_output(products, start=3))
+        self.assertEqual(len(lines), len(products))
+        self.assertTrue(lines[0].startswith(f"3. {products[0]['name']} - $"))
+        self.assertEqual(self.tool.format_products_output(products),
+                         "Filtered Products:\n" + "".join(line + "\n" for line in
+                                                          self.tool.iter_products_output(products)))
+        self.assertEqual(self.tool.format_products_output([]), "No products found matching your criteria.")
+
+
+if __name__ == '__main__':
+    unittest.main()
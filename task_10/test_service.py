@@ -0,0 +1,141 @@
+import asyncio
+import os
+import tempfile
+import threading
+import unittest
+from urllib.parse import urlencode
+
+from openai import AsyncOpenAI
+
+from loadtest import MockCompletions, get, make_queries, run_load
+from product_search import ProductSearchTool
+from query_cache import QueryCache
+from service import SearchService
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+class TestSearchService(unittest.IsolatedAsyncioTestCase):
+    async def start(self, latency=0.05, concurrency=4, timeout=5.0, local=False):
+        self.mock = MockCompletions(latency)
+        await self.mock.start()
+        self.addAsyncCleanup(self.mock.close)
+        self.tool = ProductSearchTool(client=object(), products_path=os.path.join(HERE, 'products.json'),
+                                      cache=QueryCache("test"))
+        if not local:
+            self.tool.parser_confidence = float('inf')
+        self.service = SearchService(self.tool, AsyncOpenAI(api_key="test", base_url=self.mock.url, max_retries=0),
+                                     max_concurrency=concurrency, timeout=timeout)
+        self.addAsyncCleanup(self.service.close)
+
+    async def serve(self):
+        server = await self.service.start(port=0)
+        self.addAsyncCleanup(server.wait_closed)
+        self.addCleanup(server.close)
+        host, port = server.sockets[0].getsockname()[:2]
+        reader, writer = await asyncio.open_connection(host, port)
+        self.addCleanup(writer.close)
+        return host, port, lambda target: get(reader, writer, target)
+
+    async def test_identical_queries_share_a_call(self):
+        await self.start()
+        queries = [f"gift for a fan of {word}" for word in ("yoga", "coffee", "running")]
+        variants = [variant for query in queries for variant in (query, query.upper(), f"  {query}?")]
+        results = await asyncio.gather(*(self.service.search(query) for query in variants * 5))
+        self.assertEqual(self.mock.calls, len(queries))
+        self.assertEqual(self.service.stats.deduplicated, len(variants) * 5 - len(queries))
+        self.assertEqual(sorted(result["path"] for result in results).count('llm'), len(queries))
+        yoga = [result for result in results if "yoga" in result["query"].lower()]
+        self.assertTrue(all(result["products"] == yoga[0]["products"] for result in yoga))
+        self.assertTrue(all("Yoga" in product["name"] for product in yoga[0]["products"]))
+
+        # Answered from the cache afterwards
+        self.assertEqual((await self.service.search(queries[0]))["path"], 'cache')
+        self.assertEqual(self.mock.calls, len(queries))
+
+    async def test_disk_cache_runs_off_the_loop(self):
+        await self.start()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'cache.sqlite3')
+        threads = []
+
+        def recorded(method):
+            def call(*args):
+                threads.append(threading.current_thread())
+                return method(*args)
+            return call
+
+        def cache():
+            cache = QueryCache("test", path=path)
+            self.addCleanup(cache.close)
+            cache.get_disk, cache.put = recorded(cache.get_disk), recorded(cache.put)
+            return cache
+
+        self.tool.cache = cache()
+        self.assertEqual((await self.service.search("gift for a yoga fan"))["path"], 'llm')
+        # A restarted service finds the answer on disk
+        self.tool.cache = cache()
+        self.assertEqual((await self.service.search("gift for a yoga fan"))["path"], 'cache')
+        self.assertEqual(self.mock.calls, 1)
+        self.assertEqual(len(threads), 3)
+        self.assertNotIn(threading.main_thread(), threads)
+
+    async def test_concurrency_is_bounded(self):
+        await self.start(concurrency=3)
+        queries = make_queries([product['name'] for product in self.tool.products], 12)
+        await asyncio.gather(*(self.service.search(query) for query in queries))
+        self.assertEqual(self.mock.calls, 12)
+        self.assertEqual(self.mock.peak, 3)
+        self.assertEqual(self.service.stats.peak_completions, 3)
+
+    async def test_timeout(self):
+        await self.start(latency=0.5, timeout=0.1)
+        with self.assertRaises(asyncio.TimeoutError):
+            await self.service.search("gift for a yoga fan")
+        # The call was not cancelled, so its answer still reaches the cache
+        await asyncio.sleep(0.6)
+        self.assertEqual((await self.service.search("gift for a yoga fan"))["path"], 'cache')
+        self.assertEqual(self.mock.calls, 1)
+
+    async def test_local_queries_skip_the_endpoint(self):
+        await self.start(local=True)
+        result = await self.service.search("kitchen under $50", limit=3, sort='price')
+        self.assertEqual((result["path"], self.mock.calls), ('local', 0))
+        self.assertEqual([product["price"] for product in result["products"]],
+                         sorted(product["price"] for product in result["products"]))
+
+    async def test_http(self):
+        await self.start(latency=0.3, timeout=0.1, local=True)
+        _, _, fetch = await self.serve()
+        query = urlencode({"q": "kitchen in stock", "limit": 3})
+        status, first = await fetch(f"/search?{query}")
+        self.assertEqual((status, first["path"], len(first["products"])), (200, 'local', 3))
+        status, second = await fetch(f"/search?{query}&{urlencode({'cursor': first['next_cursor']})}")
+        self.assertEqual(status, 200)
+        self.assertFalse({p["name"] for p in first["products"]} & {p["name"] for p in second["products"]})
+
+        self.assertEqual((await fetch("/search?q=gift+for+a+yoga+fan"))[0], 504)
+        # Let the completion call finish before the mock shuts down
+        await asyncio.sleep(0.3)
+        for target in ("/search", "/search?q=books&limit=0", "/search?q=books&sort=name",
+                       "/search?q=books&cursor=bogus"):
+            self.assertEqual((await fetch(target))[0], 400, target)
+        self.assertEqual((await fetch("/missing"))[0], 404)
+        status, stats = await fetch("/stats")
+        self.assertEqual(status, 200)
+        self.assertEqual(stats["service"]["timeouts"], 1)
+
+    async def test_load(self):
+        await self.start(latency=0.05, concurrency=8)
+        host, port, _ = await self.serve()
+        queries = make_queries([product['name'] for product in self.tool.products], 20)
+        result = await run_load(host, port, queries, 200, 25)
+        self.assertEqual(result.statuses, {200: 200})
+        self.assertEqual(len(result.latencies), 200)
+        self.assertEqual(self.mock.calls, 20)
+        self.assertLessEqual(self.mock.peak, 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
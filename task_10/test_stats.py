@@ -0,0 +1,72 @@
+import random
+import unittest
+
+from query_cache import QueryCache
+from stats import CatalogStats
+from test_catalog import load_sample_products
+from test_query_cache import StubClient, make_tool
+
+
+class TestCatalogStats(unittest.TestCase):
+    def test_incremental_matches_rebuild(self):
+        rng = random.Random(4)
+        products = load_sample_products()
+        stats, current = CatalogStats(), []
+        for _ in range(3000):
+            if current and rng.random() < 0.45:
+                product = current.pop(rng.randrange(len(current)))
+                stats.remove(product)
+            elif current and rng.random() < 0.2:
+                index = rng.randrange(len(current))
+                new = dict(rng.choice(products), price=rng.choice([5, 24.99, 25, 1000, 1500]))
+                stats.replace(current[index], new)
+                current[index] = new
+            else:
+                product = rng.choice(products)
+                stats.add(product)
+                current.append(product)
+            expected = CatalogStats(current)
+            self.assertEqual(stats.as_dict(), expected.as_dict())
+        self.assertEqual(CatalogStats().as_dict()["price_range"], None)
+
+    def test_summary(self):
+        stats = CatalogStats(load_sample_products())
+        summary = stats.as_dict()
+        self.assertEqual(summary["count"], 50)
+        self.assertEqual(list(summary["categories"]), ["Electronics", "Fitness", "Kitchen", "Books", "Clothing"])
+        self.assertEqual(sum(summary["price_histogram"].values()), 50)
+        self.assertEqual(sum(summary["rating_histogram"].values()), 50)
+        version = stats.version
+        with self.assertRaises(KeyError):
+            stats.remove({"name": "X", "category": "Books", "price": 123456, "rating": 4, "in_stock": True})
+        stats.add({"name": "X", "category": "Toys", "price": 1, "rating": 1, "in_stock": False})
+        self.assertGreater(stats.version, version)
+        self.assertEqual(stats.price_range[0], 1)
+
+
+class TestPrebuiltPrompt(unittest.TestCase):
+    def test_prompt_is_built_once_and_follows_updates(self):
+        products = load_sample_products()
+        client = StubClient({"category": "Books"})
+        tool = make_tool(client, QueryCache("test"))
+        tool.search_products("books")
+        tool.search_products("novels")
+        first, second = client.calls
+        self.assertIs(first['messages'][0], second['messages'][0])
+        self.assertIs(first['tools'], second['tools'])
+        prompt = first['messages'][0]['content']
+        self.assertIn("dataset of 50 products", prompt)
+        self.assertIn(f"Price range: ${min(p['price'] for p in products):.2f} - "
+                      f"${max(p['price'] for p in products):.2f}", prompt)
+        self.assertIn("Available categories: Electronics, Fitness, Kitchen, Books, Clothing", prompt)
+
+        tool.stats.add({"name": "Kite", "category": "Toys", "price": 12.5, "rating": 4.0, "in_stock": True})
+        tool.search_products("kites")
+        third = client.calls[2]
+        self.assertIn("dataset of 51 products", third['messages'][0]['content'])
+        self.assertEqual(third['tools'][0]['function']['parameters']['properties']['category']['enum'][-1], "Toys")
+        self.assertNotEqual(tool.cache.schema_fingerprint, "test")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import random
+import unittest
+
+from test_catalog import load_sample_products
+from tokens import TokenIndex, edit_distance, fuzziness, tokenize
+
+
+def distance(a, b):
+    """Optimal string alignment distance, from the full table"""
+    table = [[i + j if not i or not j else 0 for j in range(len(b) + 1)] for i in range(len(a) + 1)]
+    for i in range(1, len(a) + 1):
+        for j in range(1, len(b) + 1):
+            table[i][j] = min(table[i - 1][j] + 1, table[i][j - 1] + 1, table[i - 1][j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                table[i][j] = min(table[i][j], table[i - 2][j - 2] + 1)
+    return table[-1][-1]
+
+
+def scan(names, keyword, matches):
+    """Reference search: every keyword token must match some token of the name"""
+    tokens = tokenize(keyword)
+    if not tokens:
+        return None
+    return {i for i, name in enumerate(names)
+            if all(any(matches(token, word) for word in tokenize(name)) for token in tokens)}
+
+
+MODES = {
+    'exact': lambda token, word: token == word,
+    'prefix': lambda token, word: word.startswith(token),
+    'fuzzy': lambda token, word: distance(token, word) <= fuzziness(token),
+}
+
+
+def typo(rng, word):
+    position = rng.randrange(len(word) + 1)
+    edit = rng.choice(['insert', 'delete', 'replace', 'swap'])
+    if edit == 'insert':
+        return word[:position] + rng.choice('aeiouxyz') + word[position:]
+    if edit == 'delete':
+        return word[:position] + word[position + 1:]
+    if edit == 'replace':
+        return word[:position] + rng.choice('aeiouxyz') + word[position + 1:]
+    return word[:position] + word[position + 1:position + 2] + word[position:position + 1] + word[position + 2:]
+
+
+class TestTokenIndex(unittest.TestCase):
+    def test_edit_distance(self):
+        rng = random.Random(3)
+        for _ in range(3000):
+            a = ''.join(rng.choice('abc') for _ in range(rng.randint(0, 6)))
+            b = ''.join(rng.choice('abc') for _ in range(rng.randint(0, 6)))
+            limit = rng.randint(0, 3)
+            self.assertEqual(edit_distance(a, b, limit), min(distance(a, b), limit + 1), (a, b, limit))
+
+    def test_matches_scan(self):
+        rng = random.Random(9)
+        names = [p['name'] for p in load_sample_products()] + ["Straße Café Lamp", "USB-C hub, 7-in-1", "a b"]
+        index = TokenIndex(names)
+        words = [word for name in names for word in tokenize(name)]
+        for _ in range(1500):
+            word = rng.choice(words)
+            keyword = rng.choice([word, word.upper(), word[:rng.randint(1, len(word))], typo(rng, word),
+                                  typo(rng, typo(rng, word)), f"{rng.choice(words)} {typo(rng, word)}", "!!"])
+            for mode, matches in MODES.items():
+                self.assertEqual(index.search(keyword, mode), scan(names, keyword, matches), (keyword, mode))
+
+    def test_examples(self):
+        index = TokenIndex(["Wireless Headphones", "Noise-Cancelling Headphones", "Yoga Mat"])
+        self.assertEqual(index.search("head"), {0, 1})
+        self.assertEqual(index.search("hedphones", 'fuzzy'), {0, 1})
+        self.assertEqual(index.search("noise headphnes", 'fuzzy'), {1})
+        self.assertEqual(index.search("mat", 'exact'), {2})
+        self.assertEqual(index.search("mta", 'fuzzy'), {2})
+        self.assertEqual(index.search("mtx", 'fuzzy'), set())
+        self.assertEqual([index.terms[i] for i in index.fuzzy_terms("yogi", 2)], ["yoga"])
+        with self.assertRaises(ValueError):
+            index.search("mat", 'regex')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,220 @@
+"""
+Inverted index over the words of product names.
+
+Names are split into casefolded word tokens. Each distinct token (term) maps
+to the ids of the products whose name contains it, and the terms are kept
+sorted so that all terms starting with a prefix form one contiguous range
+found with bisect. Typo-tolerant lookups find the terms within a small edit
+distance of a word: candidates are the terms sharing enough padded bigrams
+with it, confirmed with a bounded edit distance in which swapping two
+adjacent characters counts as one typo.
+
+Every lookup touches only the matching terms and their postings, so its cost
+follows the number of matches rather than the size of the catalog.
+"""
+
+import re
+from array import array
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from persistent import EMPTY, SortedMap, add_posting, postings_from, remove_posting
+
+_TOKEN = re.compile(r'\w+')
+_GRAM = 2
+_PAD = '\x00' * (_GRAM - 1)
+_LAST_CHAR = chr(0x10FFFF)
+
+MATCH_MODES = ('exact', 'prefix', 'fuzzy')
+
+
+def tokenize(text: str) -> List[str]:
+    """Casefolded word tokens of text"""
+    return _TOKEN.findall(text.casefold())
+
+
+def fuzziness(term: str) -> int:
+    """Edit distance tolerated for a term: none up to 2 characters, 1 up to 5, then 2"""
+    return 0 if len(term) < 3 else 1 if len(term) < 6 else 2
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Edits (insert, delete, replace, swap adjacent) turning a into b, or limit + 1 once above limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before, previous = None, list(range(len(b) + 1))
+    for i, char in enumerate(a, 1):
+        current = [i]
+        for j, other in enumerate(b, 1):
+            cost = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char != other))
+            if before is not None and j > 1 and char == b[j - 2] and a[i - 2] == other:
+                cost = min(cost, before[j - 2] + 1)
+            current.append(cost)
+        if min(current) > limit and min(previous) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return min(previous[-1], limit + 1)
+
+
+def _grams(term: str) -> List[str]:
+    padded = _PAD + term + _PAD
+    return [padded[i:i + _GRAM] for i in range(len(padded) - _GRAM + 1)]
+
+
+class TokenIndex:
+    """Sorted terms of a list of names, each with the ids of the names containing it"""
+
+    def __init__(self, names: Iterable[str]):
+        postings: Dict[str, array] = {}
+        for name_id, name in enumerate(names):
+            for term in set(tokenize(name)):
+                postings.setdefault(term, array('l')).append(name_id)
+        self.terms = sorted(postings)
+        self._postings = [postings[term] for term in self.terms]
+        self._term_ids = {term: term_id for term_id, term in enumerate(self.terms)}
+
+        # Padded bigram -> ids of the terms containing it, for fuzzy candidates
+        self._by_gram: Dict[str, array] = {}
+        for term_id, term in enumerate(self.terms):
+            for gram in set(_grams(term)):
+                self._by_gram.setdefault(gram, array('l')).append(term_id)
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def exact_terms(self, term: str) -> List[int]:
+        term_id = self._term_ids.get(term)
+        return [] if term_id is None else [term_id]
+
+    def prefix_terms(self, prefix: str) -> range:
+        """Ids of the terms starting with prefix"""
+        return range(bisect_left(self.terms, prefix), bisect_left(self.terms, prefix + _LAST_CHAR))
+
+    def fuzzy_terms(self, term: str, max_distance: Optional[int] = None) -> List[int]:
+        """Ids of the terms within max_distance edits of term (default: fuzziness(term))"""
+        if max_distance is None:
+            max_distance = fuzziness(term)
+        if max_distance == 0:
+            return self.exact_terms(term)
+        # Each edit changes at most _GRAM + 1 of the query's padded bigrams (a
+        # swap touches two characters), so a close term contains the rest.
+        # With fuzziness() at least one bigram is always left.
+        grams = _grams(term)
+        needed = len(grams) - (_GRAM + 1) * max_distance
+        if needed > 0:
+            shared: Dict[Any, int] = {}
+            for gram in grams:
+                for term_id in self._gram_terms(gram):
+                    shared[term_id] = shared.get(term_id, 0) + 1
+            candidates: Iterable[Any] = (term_id for term_id, count in shared.items() if count >= needed)
+        else:
+            candidates = self._all_terms()
+        term_of, length = self._term, len(term)
+        return sorted(term_id for term_id in candidates
+                      if abs(len(term_of(term_id)) - length) <= max_distance
+                      and edit_distance(term, term_of(term_id), max_distance) <= max_distance)
+
+    def _gram_terms(self, gram: str) -> Iterable[int]:
+        return self._by_gram.get(gram, ())
+
+    def _all_terms(self) -> Iterable[int]:
+        return range(len(self.terms))
+
+    def _term(self, term_id: int) -> str:
+        return self.terms[term_id]
+
+    def ids(self, term_ids: Iterable[int]) -> Set[int]:
+        """Ids of the names containing any of the given terms"""
+        matches: Set[int] = set()
+        for term_id in term_ids:
+            matches.update(self._postings[term_id])
+        return matches
+
+    def search(self, keyword: str, mode: str = 'prefix') -> Optional[Set[int]]:
+        """Ids of the names matching every token of keyword; None if keyword has no tokens
+
+        In 'exact' mode each token must be a word of the name, in 'prefix' mode
+        the start of one, and in 'fuzzy' mode within fuzziness(token) edits of one.
+        """
+        if mode not in MATCH_MODES:
+            raise ValueError(f"Unknown match mode: {mode}")
+        lookup = {'exact': self.exact_terms, 'prefix': self.prefix_terms, 'fuzzy': self.fuzzy_terms}[mode]
+        matches: Optional[Set[int]] = None
+        for token in dict.fromkeys(tokenize(keyword)):
+            ids = self.ids(lookup(token))
+            matches = ids if matches is None else matches & ids
+            if not matches:
+                return set()
+        return matches
+
+
+class LiveTokenIndex(TokenIndex):
+    """TokenIndex that can be updated: add() and remove() return a new index, leaving this one unchanged
+
+    Terms serve as their own ids, and postings are persistent sorted sets
+    (see persistent.py), so an update copies O(log n) nodes per term.
+    """
+
+    def __init__(self, names: Iterable[Optional[str]] = ()):
+        """names: name per id; None for ids without a name"""
+        postings: Dict[str, List[int]] = {}
+        for name_id, name in enumerate(names):
+            for term in set(tokenize(name or '')):
+                postings.setdefault(term, []).append(name_id)
+        by_gram: Dict[str, List[str]] = {}
+        for term in postings:
+            for gram in set(_grams(term)):
+                by_gram.setdefault(gram, []).append(term)
+        self._postings = postings_from(postings)
+        self._by_gram = postings_from(by_gram)
+
+    def _with(self, postings: SortedMap, by_gram: SortedMap) -> 'LiveTokenIndex':
+        index = LiveTokenIndex.__new__(LiveTokenIndex)
+        index._postings, index._by_gram = postings, by_gram
+        return index
+
+    def add(self, name_id: int, name: str) -> 'LiveTokenIndex':
+        postings, by_gram = self._postings, self._by_gram
+        for term in set(tokenize(name)):
+            if term not in postings:
+                for gram in set(_grams(term)):
+                    by_gram = add_posting(by_gram, gram, term)
+            postings = add_posting(postings, term, name_id)
+        return self._with(postings, by_gram)
+
+    def remove(self, name_id: int, name: str) -> 'LiveTokenIndex':
+        postings, by_gram = self._postings, self._by_gram
+        for term in set(tokenize(name)):
+            postings = remove_posting(postings, term, name_id)
+            if term not in postings:
+                for gram in set(_grams(term)):
+                    by_gram = remove_posting(by_gram, gram, term)
+        return self._with(postings, by_gram)
+
+    @property
+    def terms(self) -> List[str]:
+        return list(self._postings)
+
+    def __len__(self) -> int:
+        return len(self._postings)
+
+    def exact_terms(self, term: str) -> List[str]:
+        return [term] if term in self._postings else []
+
+    def prefix_terms(self, prefix: str) -> List[str]:
+        return list(self._postings.keys(prefix, prefix + _LAST_CHAR))
+
+    def ids(self, term_ids: Iterable[str]) -> Set[int]:
+        matches: Set[int] = set()
+        for term in term_ids:
+            matches.update(self._postings.get(term, EMPTY))
+        return matches
+
+    def _gram_terms(self, gram: str) -> Iterable[str]:
+        return self._by_gram.get(gram, EMPTY)
+
+    def _all_terms(self) -> Iterable[str]:
+        return self._postings.keys()
+
+    def _term(self, term_id: str) -> str:
+        return term_id
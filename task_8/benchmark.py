@@ -0,0 +1,509 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the validation library.
+
+Run with:
+    python3 benchmark.py              # everything
+    python3 benchmark.py shapes       # only the named benchmarks
+    python3 benchmark.py --list
+"""
+
+import argparse
+import timeit
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+
+from validator import FieldTimings, Schema, ValidationError, Validator
+
+
+def build_deep_schema(depth: int) -> Tuple[Validator, Dict[str, Any]]:
+    """Build a schema nested `depth` objects deep and a record that satisfies it"""
+    schema = Schema.object({
+        "id": Schema.string().min_length(1).max_length(20),
+        "score": Schema.number().min(0).max(100),
+        "tags": Schema.array(Schema.string().pattern(r'^[a-z]+$')),
+    })
+    record: Dict[str, Any] = {"id": "leaf", "score": 50, "tags": ["alpha", "beta", "gamma"]}
+    for level in range(depth):
+        schema = Schema.object({
+            "name": Schema.string().min_length(2).max_length(50),
+            "level": Schema.number().min(0),
+            "active": Schema.boolean(),
+            "note": Schema.string().optional(),
+            "child": schema,
+        })
+        record = {"name": f"level-{level}", "level": level, "active": True, "child": record}
+    return schema, record
+
+
+def bench(label: str, func, number: int, items: int = 1, unit: str = 'calls') -> float:
+    """Time `number` calls of func, each handling `items` units, and print the rate"""
+    seconds = min(timeit.repeat(func, number=number, repeat=3))
+    rate = number * items / seconds
+    print(f"{label:<40} {rate:>12,.0f} {unit}/sec")
+    return rate
+
+
+def bench_compile(depth: int = 20, number: int = 2000) -> None:
+    """Compare interpreted validate() with the compiled function"""
+    schema, record = build_deep_schema(depth)
+    compiled = schema.compile()
+    print(f"Deep schema ({depth} levels)")
+    interpreted_rate = bench("  validate()", lambda: schema.validate(record), number)
+    compiled_rate = bench("  compile()", lambda: compiled(record), number)
+    print(f"  speedup: {compiled_rate / interpreted_rate:.1f}x")
+
+
+def bench_validate_many(rows: int = 100_000) -> None:
+    """Compare a try/except loop over validate() with validate_many()"""
+    schema = Schema.object({
+        "name": Schema.string().min_length(2).max_length(50),
+        "age": Schema.number().min(0).max(150),
+        "email": Schema.string().pattern(r'^[^\s@]+@[^\s@]+\.[^\s@]+$'),
+        "isActive": Schema.boolean(),
+    })
+    records = [
+        {"name": f"user{i}", "age": i % 200, "email": f"user{i}@example.com", "isActive": True}
+        for i in range(rows)
+    ]
+
+    def loop():
+        errors = {}
+        for index, record in enumerate(records):
+            try:
+                schema.validate(record)
+            except ValidationError as e:
+                errors[index] = e.message
+        return errors
+
+    validate_many = schema.compile_many()
+    print(f"Batch of {rows:,} flat records (25% invalid)")
+    loop_rate = bench("  validate() loop", loop, 1, rows, 'records')
+    batch_rate = bench("  validate_many()", lambda: validate_many(records), 1, rows, 'records')
+    print(f"  speedup: {batch_rate / loop_rate:.1f}x")
+
+
+def bench_columnar(rows: int = 1_000_000) -> None:
+    """Compare validate_many() on records with validate_columns() on NumPy columns"""
+    try:
+        import numpy as np
+        from columnar import validate_columns
+    except ImportError:
+        print("Columnar benchmark skipped: numpy is not installed")
+        return
+
+    schema = Schema.object({
+        "score": Schema.number().min(0).max(100),
+        "weight": Schema.number().min(0),
+        "code": Schema.string().min_length(2).max_length(3),
+    })
+    rng = np.random.default_rng(0)
+    columns = {
+        "score": rng.uniform(-5, 105, rows),
+        "weight": rng.uniform(0, 10, rows),
+        "code": rng.choice(np.array(["US", "DE", "FRA", "X"]), rows),
+    }
+    records = [
+        {"score": score, "weight": weight, "code": code}
+        for score, weight, code in zip(columns["score"].tolist(), columns["weight"].tolist(),
+                                       columns["code"].tolist())
+    ]
+
+    validate_many = schema.compile_many()
+    print(f"Columnar batch of {rows:,} records")
+    row_rate = bench("  validate_many() on records", lambda: validate_many(records), 1, rows, 'records')
+    column_rate = bench("  validate_columns()", lambda: validate_columns(schema, columns), 1, rows, 'records')
+    print(f"  speedup: {column_rate / row_rate:.1f}x")
+
+
+def bench_parallel(rows: int = 1_000_000) -> None:
+    """Compare validate_many() with validate_parallel() on all available cores"""
+    import os
+    from parallel import ParallelValidator
+
+    schema = Schema.object({
+        "name": Schema.string().min_length(2).max_length(50),
+        "email": Schema.string().pattern(r'^[^\s@]+@[^\s@]+\.[^\s@]+$'),
+        "tags": Schema.array(Schema.string().min_length(1)),
+    })
+    records = [
+        {"name": f"user{i}", "email": f"user{i}@example.com", "tags": ["a", "b", "c"]}
+        for i in range(rows)
+    ]
+    print(f"Parallel batch of {rows:,} records on {os.cpu_count()} CPUs")
+    serial_rate = bench("  validate_many()", lambda: schema.validate_many(records), 1, rows, 'records')
+    with ParallelValidator(schema) as parallel:
+        parallel_rate = bench("  ParallelValidator", lambda: parallel.validate_many(records), 1, rows, 'records')
+        print(f"  path taken: {parallel.last_mode}, speedup: {parallel_rate / serial_rate:.1f}x")
+
+
+def bench_pattern_cache(values: int = 200_000) -> None:
+    """Compare an uncached pattern with a result-cached one on repetitive values"""
+    email = r'^[A-Za-z0-9._%+-]+@(?:[A-Za-z0-9-]+\.)+[A-Za-z]{2,}$'
+    samples = [f"team{i % 50}@example.com" for i in range(values)]
+    plain = Schema.array(Schema.string().pattern(email)).compile()
+    cached = Schema.array(Schema.string().pattern(email, cache_size=256)).compile()
+    print(f"Pattern on {values:,} values with 50 distinct")
+    plain_rate = bench("  pattern()", lambda: plain(samples), 1, values, 'values')
+    cached_rate = bench("  pattern(cache_size=256)", lambda: cached(samples), 1, values, 'values')
+    print(f"  speedup: {cached_rate / plain_rate:.1f}x")
+
+
+def bench_validator_footprint(count: int = 10_000, calls: int = 200_000) -> None:
+    """Report memory per validator instance and interpreted validate() speed"""
+    import tracemalloc
+
+    def build():
+        return [Schema.string().min_length(2).max_length(50) for _ in range(count)]
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    validators = build()
+    per_validator = (tracemalloc.get_traced_memory()[0] - before) / count
+    tracemalloc.stop()
+    del validators
+
+    string = Schema.string().min_length(2).max_length(50)
+    number = Schema.number()
+    print(f"Validator footprint ({count:,} string validators with two rules)")
+    print(f"  {'memory per validator':<38} {per_validator:>12,.0f} bytes")
+    bench("  string validate()", lambda: string.validate("hello"), calls)
+    bench("  number validate()", lambda: number.validate(42), calls)
+
+    def rejected():
+        try:
+            number.validate("42")
+        except ValidationError:
+            pass
+    bench("  number validate() of a wrong type", rejected, calls)
+
+
+def build_wide_schema(fields: int) -> Validator:
+    """Build an object schema with `fields` mixed leaf fields"""
+    schema = {}
+    for index in range(fields):
+        kind = index % 4
+        if kind == 0:
+            schema[f"name{index}"] = Schema.string().min_length(1).max_length(64)
+        elif kind == 1:
+            schema[f"count{index}"] = Schema.number().min(0).max(10_000)
+        elif kind == 2:
+            schema[f"code{index}"] = Schema.string().pattern(rf'^[A-Z]{{2}}{index}$').optional()
+        else:
+            schema[f"tags{index}"] = Schema.array(Schema.string())
+    return Schema.object(schema)
+
+
+def bench_schema_cache(fields: int = 500) -> None:
+    """Compare building and compiling a schema with loading it from the on-disk cache"""
+    import tempfile
+    from serialize import CompiledSchemaCache, dumps, loads
+    from validator import clear_pattern_cache
+
+    document = dumps(build_wide_schema(fields))
+    with tempfile.TemporaryDirectory() as directory:
+        cache = CompiledSchemaCache(directory)
+        cache.load(document)
+
+        def rebuild():
+            clear_pattern_cache()
+            loads(document).compile()
+
+        def from_cache():
+            clear_pattern_cache()
+            CompiledSchemaCache(directory).load(document)
+
+        print(f"Cold start of a {fields}-field schema")
+        build_rate = bench("  loads() + compile()", rebuild, 20)
+        cache_rate = bench("  CompiledSchemaCache.load()", from_cache, 20)
+        print(f"  {1000 / build_rate:.1f} ms vs {1000 / cache_rate:.1f} ms per load")
+
+
+def build_flat_schema() -> Tuple[Validator, Callable[[int], Dict[str, Any]], Callable[[Dict[str, Any]], None]]:
+    """A small user record"""
+    schema = Schema.object({
+        "name": Schema.string().min_length(2).max_length(50),
+        "age": Schema.number().min(0).max(150),
+        "email": Schema.string().pattern(r'^[^\s@]+@[^\s@]+\.[^\s@]+$'),
+        "isActive": Schema.boolean(),
+        "nickname": Schema.string().optional(),
+    })
+
+    def record(i):
+        return {"name": f"user{i}", "age": i % 100, "email": f"user{i}@example.com", "isActive": True}
+
+    def break_record(record):
+        record["email"] = "not-an-email"
+    return schema, record, break_record
+
+
+def build_wide_shape(fields: int = 500):
+    """build_wide_schema() with matching records; invalid ones fail halfway through"""
+    schema = build_wide_schema(fields)
+    keys = list(schema.schema)
+
+    def record(i):
+        row = {}
+        for index, key in enumerate(keys):
+            kind = index % 4
+            if kind == 0:
+                row[key] = f"value{i}"
+            elif kind == 1:
+                row[key] = (i + index) % 10_000
+            elif kind == 2:
+                row[key] = f"AB{index}"
+            else:
+                row[key] = ["x", "y"]
+        return row
+
+    def break_record(record):
+        record[f"count{fields // 2 + 1}"] = -1
+    return schema, record, break_record
+
+
+def build_deep_shape(depth: int = 20):
+    """build_deep_schema(); invalid records fail at the innermost level"""
+    schema, template = build_deep_schema(depth)
+
+    def record(i):
+        def copy(node):
+            return {key: copy(value) if isinstance(value, dict) else
+                    list(value) if isinstance(value, list) else value
+                    for key, value in node.items()}
+        return copy(template)
+
+    def break_record(record):
+        while "child" in record:
+            record = record["child"]
+        record["score"] = 101
+    return schema, record, break_record
+
+
+def build_array_shape(items: int = 50):
+    """Records dominated by arrays of scalars and of small objects"""
+    schema = Schema.object({
+        "id": Schema.string(),
+        "scores": Schema.array(Schema.number().min(0).max(100)),
+        "tags": Schema.array(Schema.string().min_length(1).max_length(20)),
+        "lines": Schema.array(Schema.object({
+            "sku": Schema.string().pattern(r'^[A-Z]{3}-\d{4}$'),
+            "quantity": Schema.number().min(1),
+        })),
+    })
+
+    def record(i):
+        return {
+            "id": f"order{i}",
+            "scores": [(i + n) % 100 for n in range(items)],
+            "tags": [f"tag{n}" for n in range(items)],
+            "lines": [{"sku": f"ABC-{n:04d}", "quantity": n + 1} for n in range(items)],
+        }
+
+    def break_record(record):
+        record["lines"][-1]["quantity"] = 0
+    return schema, record, break_record
+
+
+SHAPES = {
+    "flat": build_flat_schema,
+    "wide": build_wide_shape,
+    "deep": build_deep_shape,
+    "array": build_array_shape,
+}
+
+
+def make_records(shape: str, rows: int, invalid: float) -> Tuple[Validator, List[Dict[str, Any]]]:
+    """Build rows records of a shape, spreading `invalid` (a fraction) broken ones evenly"""
+    schema, record, break_record = SHAPES[shape]()
+    records = [record(i) for i in range(rows)]
+    broken = int(rows * invalid)
+    for index in range(broken):
+        break_record(records[index * rows // broken])
+    return schema, records
+
+
+def peak_memory(func) -> int:
+    """Peak bytes allocated while running func once"""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_shapes(rows: int = 2_000, mixes: Tuple[float, ...] = (0.0, 0.1, 0.5), sample: int = 100) -> None:
+    """Throughput and peak memory of validate() and validate_many() per schema shape and invalid mix"""
+    # tracemalloc slows validation down by orders of magnitude, so peak memory
+    # is measured on the first `sample` records only
+    print(f"Schema shapes ({rows:,} records each, peak memory of validate_many() on {sample})")
+    print(f"  {'shape / invalid':<24} {'validate()':>16} {'validate_many()':>20} {'peak memory':>14}")
+    for shape in SHAPES:
+        for invalid in mixes:
+            schema, records = make_records(shape, rows, invalid)
+            validate_many = schema.compile_many()
+
+            def loop():
+                for record in records:
+                    try:
+                        schema.validate(record)
+                    except ValidationError:
+                        pass
+
+            loop_rate = rows / min(timeit.repeat(loop, number=1, repeat=3))
+            batch_rate = rows / min(timeit.repeat(lambda: validate_many(records), number=1, repeat=3))
+            peak = peak_memory(lambda: validate_many(records[:sample]))
+            label = f"{shape} / {invalid:.0%}"
+            print(f"  {label:<24} {loop_rate:>10,.0f} rec/s {batch_rate:>14,.0f} rec/s {peak / 1024:>11,.0f} KiB")
+
+
+def profile_fields(shape: str = "array", rows: int = 500, limit: int = 8) -> None:
+    """Show which fields of a shape dominate validate() time, using the field timing hook"""
+    schema, records = make_records(shape, rows, 0.1)
+    with FieldTimings() as timings:
+        for record in records:
+            try:
+                schema.validate(record)
+            except ValidationError:
+                pass
+    print(f"Slowest fields of the {shape} shape ({rows:,} records, times include nested fields)")
+    for path, calls, total in timings.report(limit):
+        print(f"  {path:<38} {calls:>10,} calls {total * 1000:>10.1f} ms")
+
+
+def bench_lazy(calls: int = 500) -> None:
+    """Compare json.loads() + validate() with validate_bytes() on raw request bodies"""
+    import base64
+    import json
+    from lazy import validate_bytes
+
+    schema = Schema.object({
+        "user": Schema.string().min_length(2),
+        "action": Schema.string().pattern(r'^[a-z_]+$'),
+        "amount": Schema.number().min(0),
+    })
+    attachment = base64.b64encode(bytes(range(256)) * 400).decode()
+    metadata = {f"meta{i}": {"text": "lorem ipsum " * 4, "values": list(range(10))} for i in range(100)}
+    bodies = [
+        ("valid, 100 KB attachment", {"user": "alice", "action": "pay", "amount": 5, "attachment": attachment}),
+        ("invalid first field, 100 KB attachment",
+         {"user": "a", "action": "pay", "amount": 5, "attachment": attachment}),
+        ("valid, 100 unknown objects", {"user": "alice", "action": "pay", "amount": 5, **metadata}),
+        ("invalid first field, 100 unknown objects", {"user": "a", "action": "pay", "amount": 5, **metadata}),
+        ("valid, every field used", {"user": "alice", "action": "pay", "amount": 5}),
+    ]
+
+    def decoded(body):
+        try:
+            schema.validate(json.loads(body))
+        except ValidationError:
+            pass
+
+    def lazy(body):
+        try:
+            validate_bytes(schema, body)
+        except ValidationError:
+            pass
+
+    for label, document in bodies:
+        body = json.dumps(document).encode()
+        print(f"Request body: {label} ({len(body):,} bytes)")
+        decoded_rate = bench("  json.loads() + validate()", lambda: decoded(body), calls)
+        lazy_rate = bench("  validate_bytes()", lambda: lazy(body), calls)
+        print(f"  speedup: {lazy_rate / decoded_rate:.1f}x")
+
+
+def bench_coerce(rows: int = 20_000) -> None:
+    """Compare a conversion pass followed by validation with single-pass coerce()"""
+    from datetime import datetime
+    from validator import ArrayValidator, DateValidator, NumberValidator, ObjectValidator
+
+    schema = Schema.object({
+        "id": Schema.string().min_length(1),
+        "amount": Schema.number().min(0),
+        "created": Schema.date(),
+        "lines": Schema.array(Schema.object({
+            "sku": Schema.string(),
+            "price": Schema.number().min(0),
+            "quantity": Schema.number().min(1),
+        })),
+    })
+    records = [
+        {"id": f"order{i}", "amount": f"{i % 500}.25", "created": f"2024-03-{i % 28 + 1:02d}T10:30:00",
+         "lines": [{"sku": f"SKU{n}", "price": f"{n}.5", "quantity": n + 1} for n in range(3)]}
+        for i in range(rows)
+    ]
+
+    def convert(validator, value):
+        # A schema-driven conversion pass, as used ahead of validation
+        if isinstance(validator, ObjectValidator) and isinstance(value, dict):
+            return {key: convert(validator.schema[key], item) if key in validator.schema else item
+                    for key, item in value.items()}
+        if isinstance(validator, ArrayValidator) and isinstance(value, list):
+            return [convert(validator.item_validator, item) for item in value]
+        if isinstance(value, str):
+            try:
+                if isinstance(validator, NumberValidator):
+                    return float(value)
+                if isinstance(validator, DateValidator):
+                    return datetime.fromisoformat(value)
+            except ValueError:
+                pass
+        return value
+
+    def convert_by_hand(record):
+        # The cheapest possible conversion pass, written for this one schema
+        converted = dict(record)
+        converted["amount"] = float(record["amount"])
+        converted["created"] = datetime.fromisoformat(record["created"])
+        converted["lines"] = [dict(line, price=float(line["price"])) for line in record["lines"]]
+        return converted
+
+    validate = schema.compile()
+    coerce = schema.compile_coerce()
+    print(f"Parse and validate {rows:,} records with string amounts and dates")
+    generic_rate = bench("  convert pass + validate()",
+                         lambda: [schema.validate(convert(schema, record)) for record in records], 1, rows, 'records')
+    bench("  convert pass + compile()",
+          lambda: [validate(convert(schema, record)) for record in records], 1, rows, 'records')
+    by_hand_rate = bench("  hand-written convert + compile()",
+                         lambda: [validate(convert_by_hand(record)) for record in records], 1, rows, 'records')
+    single_rate = bench("  coerce()", lambda: [schema.coerce(record) for record in records], 1, rows, 'records')
+    compiled_rate = bench("  compile_coerce()", lambda: [coerce(record) for record in records], 1, rows, 'records')
+    print(f"  speedup: coerce() {single_rate / generic_rate:.1f}x over convert pass + validate(), "
+          f"compile_coerce() {compiled_rate / by_hand_rate:.1f}x over hand-written convert + compile()")
+
+
+BENCHMARKS = {
+    "footprint": bench_validator_footprint,
+    "compile": bench_compile,
+    "patterns": bench_pattern_cache,
+    "batch": bench_validate_many,
+    "shapes": bench_shapes,
+    "profile": profile_fields,
+    "lazy": bench_lazy,
+    "coerce": bench_coerce,
+    "columnar": bench_columnar,
+    "parallel": bench_parallel,
+    "cache": bench_schema_cache,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run validation benchmarks")
+    parser.add_argument('names', nargs='*', metavar='name', help="benchmarks to run (default: all)")
+    parser.add_argument('--list', action='store_true', help="list benchmark names and exit")
+    args = parser.parse_args(argv)
+    if args.list:
+        for name, func in BENCHMARKS.items():
+            print(f"{name:<12} {func.__doc__}")
+        return
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark: {', '.join(unknown)}")
+    for name in args.names or BENCHMARKS:
+        BENCHMARKS[name]()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+"""
+Columnar validation of object schemas with NumPy.
+
+Instead of one record at a time, each field is checked as a whole column:
+type checks become dtype checks and range and length rules become single
+vectorized comparisons. Requires numpy (`pip install numpy`).
+"""
+
+from typing import Any, Dict, Mapping
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised only without numpy
+    np = None
+
+from validator import ObjectValidator, ValidationError, Validator
+
+# dtype kinds that hold values of the Python types a leaf validator accepts
+_TYPE_KINDS = {
+    (str,): 'U',
+    (int, float): 'biuf',
+    (bool,): 'b',
+}
+
+_COERCIBLE_TYPES = ({str}, {bool}, {int}, {float}, {int, float})
+
+
+class ColumnarResult:
+    """Boolean mask per field plus the combined mask of fully valid rows"""
+    def __init__(self, masks: Dict[str, Any], mask: Any):
+        self.masks = masks
+        self.mask = mask
+
+    def __len__(self) -> int:
+        return len(self.mask)
+
+    @property
+    def valid_count(self) -> int:
+        return int(self.mask.sum())
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise ImportError("Columnar validation requires numpy: pip install numpy")
+
+
+def to_columns(data: Any) -> Dict[str, Any]:
+    """Normalize a dict of arrays, a NumPy structured array or a record batch to {name: ndarray}"""
+    _require_numpy()
+    if isinstance(data, np.ndarray) and data.dtype.names:
+        return {name: data[name] for name in data.dtype.names}
+    if hasattr(data, 'schema') and hasattr(data, 'column'):
+        # pyarrow.RecordBatch / Table
+        return {name: np.asarray(data.column(name).to_numpy(zero_copy_only=False))
+                for name in data.schema.names}
+    if isinstance(data, Mapping):
+        return {name: _as_column(column) for name, column in data.items()}
+    raise TypeError(f"Expected a dict of arrays, a structured array or a record batch, got {type(data)}")
+
+
+def _as_column(values: Any) -> Any:
+    """
+    Convert values to a 1-D array. Python sequences only get a typed dtype when
+    NumPy's coercion cannot change the outcome (e.g. [1, "a"] would become
+    strings); everything else becomes an object column.
+    """
+    if isinstance(values, np.ndarray) and values.ndim == 1:
+        return values
+    values = list(values)
+    if set(map(type, values)) in _COERCIBLE_TYPES:
+        return np.asarray(values)
+    column = np.empty(len(values), dtype=object)
+    for index, value in enumerate(values):
+        column[index] = value
+    return column
+
+
+def validate_columns(validator: ObjectValidator, data: Any) -> ColumnarResult:
+    """
+    Validate columnar data against an object schema. Leaf fields whose column
+    has a matching dtype are checked with vectorized operations; object
+    columns and nested fields fall back to validate_many() on that column.
+    """
+    if not isinstance(validator, ObjectValidator):
+        raise TypeError("Columnar validation needs an ObjectValidator")
+    columns = to_columns(data)
+    lengths = {len(column) for column in columns.values()}
+    if len(lengths) > 1:
+        raise ValueError("All columns must have the same length")
+    count = lengths.pop() if lengths else 0
+
+    masks = {}
+    mask = np.ones(count, dtype=bool)
+    for key, field in validator.schema.items():
+        if key not in columns:
+            field_mask = np.full(count, field._is_optional, dtype=bool)
+        else:
+            field_mask = column_mask(field, columns[key])
+        masks[key] = field_mask
+        mask &= field_mask
+    if validator._validators:
+        # The object's own rules see whole rows; only rows whose fields all passed are built
+        names = list(columns)
+        values = [columns[name].tolist() for name in names]
+        for index in np.flatnonzero(mask).tolist():
+            try:
+                Validator.validate(validator, {name: column[index] for name, column in zip(names, values)})
+            except ValidationError:
+                mask[index] = False
+    return ColumnarResult(masks, mask)
+
+
+def column_mask(validator: Validator, column: Any) -> Any:
+    """Return a boolean mask of the values in column that pass validator"""
+    _require_numpy()
+    column = _as_column(column)
+    mask = _vectorized_mask(validator, column)
+    if mask is None:
+        mask = np.ones(len(column), dtype=bool)
+        errors = validator.validate_many(column.tolist()).errors
+        if errors:
+            mask[list(errors)] = False
+    return mask
+
+
+def _vectorized_mask(validator: Validator, column: Any) -> Any:
+    """Evaluate a leaf's rules on a typed column, or return None if they cannot be vectorized"""
+    rules = validator._rules
+    if (type(validator).validate is not Validator.validate or column.dtype.kind == 'O'
+            or len(rules) != len(validator._validators)):
+        return None
+    kinds = _TYPE_KINDS.get(validator._type)
+    if kinds is None:
+        return None
+    if column.dtype.kind not in kinds:
+        # Every value in a typed column has the wrong type
+        return np.zeros(len(column), dtype=bool)
+
+    mask = np.ones(len(column), dtype=bool)
+    lengths = None
+    for name, arg in rules:
+        if name in ('min_length', 'max_length'):
+            if lengths is None:
+                lengths = _str_len(column)
+            mask &= lengths >= arg if name == 'min_length' else lengths <= arg
+        elif name == 'min':
+            mask &= column >= arg
+        elif name == 'max':
+            mask &= column <= arg
+        elif name == 'pattern':
+            # Match each distinct value once; repeated values share the result
+            uniques, inverse = np.unique(column, return_inverse=True)
+            matched = np.fromiter((bool(arg.match(value)) for value in uniques.tolist()),
+                                  dtype=bool, count=len(uniques))
+            mask &= matched[inverse.reshape(-1)]
+        else:
+            return None
+    return mask
+
+
+def _str_len(column: Any) -> Any:
+    strings = getattr(np, 'strings', None)
+    if strings is not None:
+        return strings.str_len(column)
+    return np.char.str_len(column)
@@ -0,0 +1,209 @@
+"""
+Validation of JSON payloads straight from bytes, bytearray or memoryview.
+
+Instead of decoding the whole body and then validating it, the buffer is
+scanned in place. Only values the schema touches are decoded; everything else
+(unknown keys, large blobs) is skipped with regular expressions over the
+buffer and never turned into Python objects. Fields are checked as they are
+scanned, but since a repeated key replaces the earlier value, as in
+json.loads(), a failure only counts once the object has closed; the first
+failing field in schema order is then reported with the same message
+validate() would give. Skipped values are only checked for well-formed
+strings and balanced brackets, not for full JSON syntax.
+
+Scanning runs in Python, so for small bodies json.loads() + validate() is
+faster; the gain is on large bodies with big fields the schema does not
+describe, and on rejecting them early.
+"""
+
+import json
+import re
+from typing import Any, Dict, Tuple, Union
+
+from validator import ArrayValidator, ObjectValidator, ValidationError, Validator
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+_WHITESPACE = re.compile(rb'[ \t\n\r]*')
+# A literal search is much faster than a character class over long strings
+_QUOTE_SEARCH = re.compile(rb'"')
+_PLAIN = re.compile(rb'[^"\[\]{}]*')
+_SCALAR = re.compile(rb'-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?|true|false|null|NaN|-?Infinity')
+
+_QUOTE, _BACKSLASH, _COMMA, _COLON = ord('"'), ord('\\'), ord(','), ord(':')
+_OPEN_OBJECT, _CLOSE_OBJECT = ord('{'), ord('}')
+_OPEN_ARRAY, _CLOSE_ARRAY = ord('['), ord(']')
+_CLOSING = {_OPEN_OBJECT: _CLOSE_OBJECT, _OPEN_ARRAY: _CLOSE_ARRAY}
+
+
+def validate_bytes(validator: Validator, data: Buffer) -> bool:
+    """Validate a JSON document held in a bytes-like object without decoding all of it"""
+    load_bytes(validator, data)
+    return True
+
+
+def load_bytes(validator: Validator, data: Buffer) -> Any:
+    """
+    Validate a JSON document held in a bytes-like object and return the decoded
+    value, restricted to what the schema describes: object keys outside the
+    schema are dropped without being decoded.
+    """
+    buffer = memoryview(data).cast('B')
+    value, end = _load(validator, buffer, _skip_whitespace(buffer, 0))
+    if _skip_whitespace(buffer, end) != len(buffer):
+        raise _syntax_error("extra data", end)
+    return value
+
+
+def _syntax_error(message: str, position: int) -> ValidationError:
+    return ValidationError(f"Invalid JSON: {message} at byte {position}")
+
+
+def _skip_whitespace(buffer: memoryview, position: int) -> int:
+    return _WHITESPACE.match(buffer, position).end()
+
+
+def _string_end(buffer: memoryview, start: int) -> int:
+    """Return the end of the string whose opening quote is at start"""
+    position = start
+    while True:
+        match = _QUOTE_SEARCH.search(buffer, position + 1)
+        if match is None:
+            raise _syntax_error("unterminated string", start)
+        position = match.start()
+        # The quote is escaped if an odd number of backslashes precede it
+        backslashes = 0
+        while buffer[position - 1 - backslashes] == _BACKSLASH:
+            backslashes += 1
+        if not backslashes % 2:
+            return position + 1
+
+
+def _skip(buffer: memoryview, position: int) -> int:
+    """Return the end of the value starting at position without decoding it"""
+    if position >= len(buffer):
+        raise _syntax_error("unexpected end of input", position)
+    first = buffer[position]
+    if first == _QUOTE:
+        return _string_end(buffer, position)
+    if first in _CLOSING:
+        expected = [_CLOSING[first]]
+        size = len(buffer)
+        position += 1
+        while True:
+            position = _PLAIN.match(buffer, position).end()
+            if position >= size:
+                raise _syntax_error("unexpected end of input", position)
+            char = buffer[position]
+            if char == _QUOTE:
+                position = _string_end(buffer, position)
+                continue
+            if char in _CLOSING:
+                expected.append(_CLOSING[char])
+            elif char != expected.pop():
+                raise _syntax_error("mismatched bracket", position)
+            elif not expected:
+                return position + 1
+            position += 1
+    match = _SCALAR.match(buffer, position)
+    if match is None:
+        raise _syntax_error("expected a value", position)
+    return match.end()
+
+
+def _decode(buffer: memoryview, start: int, end: int) -> Any:
+    try:
+        return json.loads(bytes(buffer[start:end]))
+    except ValueError as e:
+        raise _syntax_error(getattr(e, 'msg', str(e)).lower(), start)
+
+
+def _load(validator: Validator, buffer: memoryview, position: int) -> Tuple[Any, int]:
+    """Validate the value at position and return it decoded, with its end offset"""
+    kind = type(validator)
+    if (kind is ObjectValidator and not validator._validators
+            and position < len(buffer) and buffer[position] == _OPEN_OBJECT):
+        return _load_object(validator, buffer, position)
+    if (kind is ArrayValidator and not validator._validators
+            and position < len(buffer) and buffer[position] == _OPEN_ARRAY):
+        return _load_array(validator, buffer, position)
+    # Leaves, custom validators, containers with their own rules (which see the
+    # whole value, unknown keys included) and mismatched types: decode just this value
+    end = _skip(buffer, position)
+    value = _decode(buffer, position, end)
+    validator.validate(value)
+    return value, end
+
+
+def _load_object(validator: ObjectValidator, buffer: memoryview, position: int) -> Tuple[Dict[str, Any], int]:
+    # A repeated key replaces the earlier value, as in json.loads(), so a field
+    # only fails at its last occurrence: a failed load records where the value
+    # starts and is repeated once the object has closed, in schema order, which
+    # keeps the first error identical to validate()
+    schema = validator.schema
+    loaded = {}
+    failed: Dict[str, int] = {}
+    position = _skip_whitespace(buffer, position + 1)
+    if position < len(buffer) and buffer[position] == _CLOSE_OBJECT:
+        end = position + 1
+    else:
+        while True:
+            if position >= len(buffer) or buffer[position] != _QUOTE:
+                raise _syntax_error("expected a property name", position)
+            key_end = _string_end(buffer, position)
+            key = bytes(buffer[position + 1:key_end - 1])
+            key = _decode(buffer, position, key_end) if b'\\' in key else key.decode('utf-8')
+            position = _skip_whitespace(buffer, key_end)
+            if position >= len(buffer) or buffer[position] != _COLON:
+                raise _syntax_error("expected ':'", position)
+            start = _skip_whitespace(buffer, position + 1)
+            if key in schema:
+                try:
+                    loaded[key], position = _load(schema[key], buffer, start)
+                    failed.pop(key, None)
+                except ValidationError:
+                    loaded.pop(key, None)
+                    failed[key] = start
+                    position = _skip(buffer, start)
+            else:
+                position = _skip(buffer, start)
+            position = _skip_whitespace(buffer, position)
+            if position >= len(buffer):
+                raise _syntax_error("unexpected end of input", position)
+            char = buffer[position]
+            if char == _CLOSE_OBJECT:
+                end = position + 1
+                break
+            if char != _COMMA:
+                raise _syntax_error("expected ',' or '}'", position)
+            position = _skip_whitespace(buffer, position + 1)
+
+    result = {}
+    for key, field in schema.items():
+        if key in failed:
+            result[key] = _load(field, buffer, failed[key])[0]
+        elif key in loaded:
+            result[key] = loaded[key]
+        elif not field._is_optional:
+            raise ValidationError(f"Missing required field: {key}")
+    return result, end
+
+
+def _load_array(validator: ArrayValidator, buffer: memoryview, position: int) -> Tuple[list, int]:
+    item_validator = validator.item_validator
+    items = []
+    position = _skip_whitespace(buffer, position + 1)
+    if position < len(buffer) and buffer[position] == _CLOSE_ARRAY:
+        return items, position + 1
+    while True:
+        item, position = _load(item_validator, buffer, position)
+        items.append(item)
+        position = _skip_whitespace(buffer, position)
+        if position >= len(buffer):
+            raise _syntax_error("unexpected end of input", position)
+        char = buffer[position]
+        if char == _CLOSE_ARRAY:
+            return items, position + 1
+        if char != _COMMA:
+            raise _syntax_error("expected ',' or ']'", position)
+        position = _skip_whitespace(buffer, position + 1)
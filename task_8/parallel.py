@@ -0,0 +1,106 @@
+"""
+Multi-process batch validation.
+
+The schema is pickled once, when the pool first starts, and installed in
+every worker; afterwards only record chunks and their errors cross process
+boundaries. Small inputs never pay for a pool: a first chunk is validated
+in-process and timed, and the rest only goes parallel when the estimated
+serial time outweighs the cost of using the pool. A schema that cannot be
+pickled, such as one with a lambda rule, still validates inputs that stay
+serial.
+"""
+
+import os
+import pickle
+import time
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence
+
+from validator import BatchResult, Validator
+
+DEFAULT_CHUNK_SIZE = 10_000
+# Rough cost of starting the pool and shipping work to it; below this much
+# estimated serial work the serial path is always faster.
+PARALLEL_OVERHEAD = 0.25
+
+_worker_validate: Optional[Callable[[Iterable[Any]], BatchResult]] = None
+
+
+def _init_worker(payload: bytes) -> None:
+    global _worker_validate
+    _worker_validate = pickle.loads(payload).compile_many()
+
+
+def _validate_chunk(chunk: Sequence[Any]) -> Dict[int, str]:
+    return _worker_validate(chunk).errors
+
+
+class ParallelValidator:
+    """Validate large record sets on a reusable process pool"""
+    def __init__(self, validator: Validator, workers: Optional[int] = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, overhead: float = PARALLEL_OVERHEAD):
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.overhead = overhead
+        self._validator = validator
+        self._validate_many = validator.compile_many()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.last_mode = None
+
+    def __enter__(self) -> 'ParallelValidator':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Shut the worker processes down"""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                             initargs=(pickle.dumps(self._validator),))
+        return self._pool
+
+    def validate_many(self, records: Iterable[Any]) -> BatchResult:
+        """Validate records and return one BatchResult with errors in input order"""
+        if not isinstance(records, Sequence):
+            records = list(records)
+        count = len(records)
+
+        # Validate the first chunk here and time it to decide whether the
+        # remaining records are worth sending to the pool
+        started = time.perf_counter()
+        sample = records[:self.chunk_size]
+        errors = dict(self._validate_many(sample).errors)
+        per_record = (time.perf_counter() - started) / max(len(sample), 1)
+        remaining = count - len(sample)
+        if not remaining:
+            self.last_mode = 'serial'
+            return BatchResult(count, errors)
+        serial_time = remaining * per_record
+        if self.workers < 2 or serial_time - serial_time / self.workers < self.overhead:
+            self.last_mode = 'serial'
+            rest = self._validate_many(islice(records, len(sample), None)).errors
+            errors.update((index + len(sample), error) for index, error in rest.items())
+            return BatchResult(count, errors)
+
+        self.last_mode = 'parallel'
+        starts = range(len(sample), count, self.chunk_size)
+        chunks = (records[start:start + self.chunk_size] for start in starts)
+        for start, chunk_errors in zip(starts, self._get_pool().map(_validate_chunk, chunks)):
+            errors.update((index + start, error) for index, error in chunk_errors.items())
+        return BatchResult(count, errors)
+
+
+def validate_parallel(validator: Validator, records: Iterable[Any], workers: Optional[int] = None,
+                      chunk_size: int = DEFAULT_CHUNK_SIZE) -> BatchResult:
+    """Validate records across a temporary process pool; see ParallelValidator"""
+    with ParallelValidator(validator, workers, chunk_size) as parallel:
+        return parallel.validate_many(records)
@@ -0,0 +1,221 @@
+"""
+Schema serialization and an on-disk cache of compiled validators.
+
+Validators built with the Schema builders serialize to a JSON Schema
+compatible subset (plus a few `x-` extension keywords for things JSON Schema
+cannot express) and to a compact binary form. `CompiledSchemaCache` keys
+compiled validators by a hash of that canonical form, so short-lived workers
+can load a ready-to-use validator instead of rebuilding and compiling it.
+"""
+
+import hashlib
+import json
+import marshal
+import os
+import pickle
+import sys
+import tempfile
+import zlib
+from typing import Any, Callable, Dict, NamedTuple, Union
+
+from validator import (ArrayValidator, BooleanValidator, DateValidator, NumberValidator,
+                       ObjectValidator, PatternCache, Schema, StringValidator, Validator,
+                       _SchemaCompiler)
+
+JSON_SCHEMA_DIALECT = "https://json-schema.org/draft/2020-12/schema"
+BINARY_MAGIC = b'VSB1'
+
+# Rule name -> JSON Schema keyword, and keyword -> builder method
+_KEYWORDS = {
+    'min_length': 'minLength',
+    'max_length': 'maxLength',
+    'pattern': 'pattern',
+    'min': 'minimum',
+    'max': 'maximum',
+}
+_BUILDERS = {
+    'minLength': 'min_length',
+    'maxLength': 'max_length',
+    'minimum': 'min',
+    'maximum': 'max',
+}
+_TYPE_NAMES = [
+    (StringValidator, 'string'),
+    (NumberValidator, 'number'),
+    (BooleanValidator, 'boolean'),
+    (DateValidator, 'string'),
+    (ObjectValidator, 'object'),
+    (ArrayValidator, 'array'),
+]
+
+SchemaSource = Union[Validator, Dict[str, Any], str]
+
+
+def to_json_schema(validator: Validator) -> Dict[str, Any]:
+    """Describe a validator tree as a JSON Schema document"""
+    document = {"$schema": JSON_SCHEMA_DIALECT}
+    document.update(_node(validator))
+    if validator._is_optional:
+        document["x-optional"] = True
+    return document
+
+
+def _node(validator: Validator) -> Dict[str, Any]:
+    type_name = next((name for cls, name in _TYPE_NAMES if type(validator) is cls), None)
+    if type_name is None:
+        raise ValueError(f"Cannot serialize {type(validator).__name__}; only Schema builders are supported")
+    if len(validator._rules) != len(validator._validators):
+        raise ValueError("Cannot serialize validators with custom checks")
+
+    # Optional leaves and arrays also accept None; optional objects may only be omitted
+    nullable = validator._is_optional and not isinstance(validator, ObjectValidator)
+    node: Dict[str, Any] = {"type": [type_name, "null"] if nullable else type_name}
+    if isinstance(validator, DateValidator):
+        node["format"] = "date-time"
+        node["x-type"] = "date"
+    for name, arg in validator._rules:
+        if name not in _KEYWORDS:
+            raise ValueError("Cannot serialize validators with custom checks")
+        keyword = _KEYWORDS[name]
+        if keyword in node:
+            raise ValueError(f"Cannot serialize repeated rule {name}")
+        if name == 'pattern':
+            if isinstance(arg, PatternCache):
+                node["x-patternCacheSize"] = arg.maxsize
+                arg = arg.regex
+            if arg.flags & ~32:  # anything beyond the implicit re.UNICODE
+                raise ValueError("Cannot serialize patterns with flags")
+            arg = arg.pattern
+        node[keyword] = arg
+    if validator._custom_message:
+        node["x-message"] = validator._custom_message
+
+    if isinstance(validator, ObjectValidator):
+        node["properties"] = {key: _node(child) for key, child in validator.schema.items()}
+        node["required"] = [key for key, child in validator.schema.items() if not child._is_optional]
+    elif isinstance(validator, ArrayValidator):
+        node["items"] = _node(validator.item_validator)
+    return node
+
+
+def from_json_schema(document: Dict[str, Any]) -> Validator:
+    """Rebuild a validator tree from a document produced by to_json_schema()"""
+    return _build(document, document.get("x-optional", False))
+
+
+def _build(node: Dict[str, Any], optional: bool) -> Validator:
+    types = node.get("type")
+    types = types if isinstance(types, list) else [types]
+    type_name = next((t for t in types if t != "null"), None)
+
+    if node.get("x-type") == "date":
+        validator: Validator = Schema.date()
+    elif type_name == "string":
+        validator = Schema.string()
+    elif type_name == "number":
+        validator = Schema.number()
+    elif type_name == "boolean":
+        validator = Schema.boolean()
+    elif type_name == "object":
+        required = set(node.get("required", ()))
+        validator = Schema.object({
+            key: _build(child, key not in required)
+            for key, child in node.get("properties", {}).items()
+        })
+    elif type_name == "array":
+        validator = Schema.array(_build(node["items"], False))
+    else:
+        raise ValueError(f"Unsupported schema type: {node.get('type')!r}")
+
+    # Keywords are applied in document order, which is the original rule order
+    for keyword, arg in node.items():
+        if keyword == "pattern":
+            validator.pattern(arg, node.get("x-patternCacheSize", 0))
+        elif keyword in _BUILDERS:
+            getattr(validator, _BUILDERS[keyword])(arg)
+    if "x-message" in node:
+        validator.with_message(node["x-message"])
+    if optional or "null" in types:
+        validator.optional()
+    return validator
+
+
+def dumps(validator: Validator) -> str:
+    """Serialize a validator to canonical, compact JSON"""
+    return json.dumps(to_json_schema(validator), separators=(',', ':'), ensure_ascii=False)
+
+
+def loads(text: str) -> Validator:
+    return from_json_schema(json.loads(text))
+
+
+def dumps_binary(validator: Validator) -> bytes:
+    """Serialize a validator to the compact binary form: a magic header plus deflated JSON"""
+    return BINARY_MAGIC + zlib.compress(dumps(validator).encode('utf-8'), 9)
+
+
+def loads_binary(data: bytes) -> Validator:
+    if not data.startswith(BINARY_MAGIC):
+        raise ValueError("Not a serialized schema")
+    return loads(zlib.decompress(data[len(BINARY_MAGIC):]).decode('utf-8'))
+
+
+def schema_hash(schema: SchemaSource) -> str:
+    """Content hash of a schema's canonical serialized form"""
+    return hashlib.sha256(_canonical(schema).encode('utf-8')).hexdigest()
+
+
+def _canonical(schema: SchemaSource) -> str:
+    if isinstance(schema, Validator):
+        return dumps(schema)
+    if isinstance(schema, str):
+        schema = json.loads(schema)
+    return json.dumps(schema, separators=(',', ':'), ensure_ascii=False)
+
+
+class CachedValidator(NamedTuple):
+    validator: Validator
+    validate: Callable[[Any], bool]
+    key: str
+
+
+class CompiledSchemaCache:
+    """
+    On-disk cache of compiled validators keyed by schema content hash.
+
+    Entries hold the pickled validator and the marshalled code of its compiled
+    function, so they are tied to the Python version (it is part of the file
+    name). Like __pycache__, the directory must only be writable by trusted users.
+    """
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.{sys.implementation.cache_tag}.schema")
+
+    def load(self, schema: SchemaSource) -> CachedValidator:
+        """Return the validator and its compiled function, compiling and storing on a miss"""
+        canonical = _canonical(schema)
+        key = hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as file:
+                validator, code, constants, name = pickle.loads(file.read())
+            self.hits += 1
+            return CachedValidator(validator, _SchemaCompiler.load_module(marshal.loads(code), constants, name), key)
+        except (OSError, EOFError, ValueError, TypeError, AttributeError, pickle.UnpicklingError):
+            pass
+
+        self.misses += 1
+        validator = schema if isinstance(schema, Validator) else loads(canonical)
+        code, constants, name = _SchemaCompiler().compile_module(validator)
+        payload = pickle.dumps((validator, marshal.dumps(code), constants, name), pickle.HIGHEST_PROTOCOL)
+        # Write atomically so concurrent workers never read a partial entry
+        fd, temp_path = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(fd, 'wb') as file:
+            file.write(payload)
+        os.replace(temp_path, path)
+        return CachedValidator(validator, _SchemaCompiler.load_module(code, constants, name), key)
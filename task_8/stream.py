@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Streaming validation of NDJSON files and top-level JSON arrays.
+
+Records are parsed one at a time and validated in small batches, so memory use
+stays flat no matter how large the input is.
+
+Command line usage:
+    python3 stream.py myschemas:user_schema users.ndjson
+    cat users.json | python3 stream.py myschemas:user_schema - --format array
+"""
+
+import argparse
+import codecs
+import importlib
+import json
+import sys
+from typing import Any, BinaryIO, Iterator, Optional, Tuple, Union
+
+from validator import Validator
+
+READ_SIZE = 64 * 1024
+BATCH_SIZE = 1000
+_NUMBER_CHARS = '0123456789+-.eE'
+# A decode error this close to the end of the buffer may be a literal or
+# escape cut by a chunk boundary ("tru", "\\u12"), so more input is read first
+_TRUNCATION_WINDOW = 16
+
+Source = Union[str, BinaryIO]
+StreamResult = Tuple[int, bool, Optional[str]]
+
+
+class _ParseError:
+    """Placeholder yielded by the record readers for input that is not valid JSON"""
+    def __init__(self, message: str):
+        self.message = message
+
+
+def _open(source: Source) -> Tuple[BinaryIO, bool]:
+    """Return a binary stream for source and whether the caller must close it"""
+    if isinstance(source, str):
+        return open(source, 'rb'), True
+    return getattr(source, 'buffer', source), False
+
+
+def iter_ndjson(stream: BinaryIO) -> Iterator[Any]:
+    """Yield one decoded value per non-blank line of an NDJSON stream"""
+    for line_number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            yield _ParseError(f"Invalid JSON on line {line_number}: {e}")
+
+
+def iter_json_array(stream: BinaryIO, read_size: int = READ_SIZE) -> Iterator[Any]:
+    """Yield the elements of a top-level JSON array, reading the stream incrementally"""
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    buffer = ''
+    position = 0
+    # Characters dropped from the front of the buffer, for error positions
+    consumed = 0
+    eof = False
+
+    def fill() -> bool:
+        nonlocal buffer, position, consumed, eof
+        # Read at least as much as is buffered so one huge element is decoded
+        # a logarithmic number of times rather than once per chunk
+        chunk = stream.read(max(read_size, len(buffer) - position))
+        eof = not chunk
+        buffer = buffer[position:] + text_decoder.decode(chunk, final=eof)
+        consumed += position
+        position = 0
+        return not eof
+
+    def truncated(error: ValueError) -> bool:
+        # Only an element running into the end of the buffer can be completed
+        # by reading more; any other error is final, and reading on would
+        # buffer the rest of the input before reporting it
+        pos = getattr(error, 'pos', len(buffer))
+        return (getattr(error, 'msg', '').startswith('Unterminated string')
+                or len(buffer) - pos <= _TRUNCATION_WINDOW)
+
+    def skip_whitespace() -> str:
+        nonlocal position
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n':
+                position += 1
+            if position < len(buffer):
+                return buffer[position]
+            if not fill():
+                return ''
+
+    if skip_whitespace() != '[':
+        yield _ParseError("Invalid JSON: expected a top-level array")
+        return
+    position += 1
+    if skip_whitespace() == ']':
+        return
+    while True:
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, position)
+            except ValueError as e:
+                if not eof and truncated(e) and fill():
+                    continue
+                where = f" at character {consumed + e.pos}" if hasattr(e, 'pos') else ""
+                yield _ParseError(f"Invalid JSON: {getattr(e, 'msg', e)}{where}")
+                return
+            # A number cut by the chunk boundary ("1." or "1e") decodes as a
+            # shorter number, so only accept it once a delimiter is buffered
+            if (type(value) in (int, float) and not buffer[end:].lstrip(_NUMBER_CHARS)
+                    and fill()):
+                continue
+            break
+        position = end
+        yield value
+
+        char = skip_whitespace()
+        if char == ']':
+            return
+        if not char:
+            yield _ParseError("Invalid JSON: unexpected end of input")
+            return
+        if char != ',':
+            yield _ParseError(f"Invalid JSON: expected ',' or ']' but found {char!r}")
+            return
+        position += 1
+        skip_whitespace()
+
+
+def validate_stream(validator: Validator, source: Source, format: str = 'auto',
+                    batch_size: int = BATCH_SIZE) -> Iterator[StreamResult]:
+    """
+    Validate every record of an NDJSON file or JSON array and yield
+    (index, ok, error) tuples in input order. `source` is a path or a binary
+    stream; `format` is 'ndjson', 'array' or 'auto' (sniffed from the first byte).
+    """
+    if format not in ('auto', 'ndjson', 'array'):
+        raise ValueError(f"Unknown format: {format}")
+    stream, close = _open(source)
+    try:
+        if format == 'auto':
+            format = 'array' if _peek(stream) == b'[' else 'ndjson'
+        records = iter_json_array(stream) if format == 'array' else iter_ndjson(stream)
+        yield from _validate_records(validator, records, batch_size)
+    finally:
+        if close:
+            stream.close()
+
+
+def _peek(stream: BinaryIO) -> bytes:
+    """Return the first non-whitespace byte of a stream without consuming it"""
+    if not hasattr(stream, 'peek'):
+        raise ValueError("format='auto' needs a buffered stream; pass format explicitly")
+    data = stream.peek(READ_SIZE)
+    stripped = data.lstrip(b' \t\r\n')
+    if stripped.startswith(codecs.BOM_UTF8):
+        stripped = stripped[len(codecs.BOM_UTF8):].lstrip(b' \t\r\n')
+    return stripped[:1]
+
+
+def _validate_records(validator: Validator, records: Iterator[Any], batch_size: int) -> Iterator[StreamResult]:
+    validate_many = validator.compile_many()
+    batch = []
+    start = 0
+
+    def flush() -> Iterator[StreamResult]:
+        result = validate_many(batch)
+        errors = result.errors
+        for offset in range(len(batch)):
+            error = errors.get(offset)
+            yield start + offset, error is None, error
+
+    for record in records:
+        if isinstance(record, _ParseError):
+            yield from flush()
+            start += len(batch)
+            batch = []
+            yield start, False, record.message
+            start += 1
+            continue
+        batch.append(record)
+        if len(batch) >= batch_size:
+            yield from flush()
+            start += len(batch)
+            batch = []
+    if batch:
+        yield from flush()
+
+
+def load_validator(spec: str) -> Validator:
+    """Import a validator given as 'module:attribute'"""
+    module_name, _, attribute = spec.partition(':')
+    if not attribute:
+        raise ValueError(f"Expected 'module:attribute', got {spec!r}")
+    validator = getattr(importlib.import_module(module_name), attribute)
+    if not isinstance(validator, Validator):
+        raise ValueError(f"{spec} is not a Validator")
+    return validator
+
+
+def main(argv=None) -> int:
+    """Validate a file from the command line; exit status 1 if any record is invalid"""
+    parser = argparse.ArgumentParser(description="Validate NDJSON or JSON array files against a schema")
+    parser.add_argument('schema', help="validator to use, as module:attribute")
+    parser.add_argument('file', help="input file, or - for stdin")
+    parser.add_argument('--format', choices=['auto', 'ndjson', 'array'], default='auto')
+    parser.add_argument('--max-errors', type=int, default=20,
+                        help="number of invalid records to print (default: 20)")
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, '')
+    validator = load_validator(args.schema)
+    source = sys.stdin.buffer if args.file == '-' else args.file
+
+    total = invalid = 0
+    for index, ok, error in validate_stream(validator, source, args.format):
+        total += 1
+        if not ok:
+            invalid += 1
+            if invalid <= args.max_errors:
+                print(f"Record {index}: {error}")
+    print(f"Checked {total} records: {total - invalid} valid, {invalid} invalid")
+    return 1 if invalid else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
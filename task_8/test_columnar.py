@@ -0,0 +1,78 @@
+import unittest
+from datetime import datetime
+
+from validator import Schema
+
+try:
+    import numpy as np
+    from columnar import column_mask, validate_columns
+except ImportError:
+    np = None
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class TestColumnar(unittest.TestCase):
+    def setUp(self):
+        self.schema = Schema.object({
+            "name": Schema.string().min_length(2).max_length(5).pattern(r'^[a-z]+$'),
+            "age": Schema.number().min(0).max(100),
+            "active": Schema.boolean(),
+            "tags": Schema.array(Schema.string()),
+            "nickname": Schema.string().optional()
+        })
+        self.data = {
+            "name": ["ab", "a", "abcdef", "AB", "abc"],
+            "age": [1, -1, 50, 101, 3.5],
+            "active": [True, False, True, True, 1],
+            "tags": [["a", "b"], ["c", "d"], [], ["x", 1], "no"],
+            "nickname": ["x", None, 3, "y", "z"]
+        }
+
+    def test_matches_row_validation(self):
+        result = validate_columns(self.schema, self.data)
+        rows = [dict(zip(self.data, values)) for values in zip(*self.data.values())]
+        errors = self.schema.validate_many(rows).errors
+        self.assertEqual(result.mask.tolist(), [index not in errors for index in range(len(rows))])
+        self.assertEqual(result.masks["name"].tolist(), [True, False, False, False, True])
+        self.assertEqual(result.masks["age"].tolist(), [True, False, True, False, True])
+        self.assertEqual(result.masks["active"].tolist(), [True, True, True, True, False])
+        self.assertEqual(result.masks["tags"].tolist(), [True, True, True, False, False])
+        self.assertEqual(result.masks["nickname"].tolist(), [True, True, False, True, True])
+        self.assertEqual(result.valid_count, 1)
+
+    def test_object_rules(self):
+        schema = Schema.object({"low": Schema.number(), "high": Schema.number()}).custom(
+            lambda row: row["low"] <= row["high"])
+        data = {"low": [1, 5, "x"], "high": [2, 3, 0]}
+        self.assertEqual(validate_columns(schema, data).mask.tolist(), [True, False, False])
+
+    def test_typed_columns(self):
+        data = np.array([("ab", 3, True), ("c", -4, False)],
+                        dtype=[("name", "U10"), ("age", "i8"), ("active", "?")])
+        schema = Schema.object({
+            "name": Schema.string().min_length(2),
+            "age": Schema.number().min(0),
+            "active": Schema.boolean(),
+            "score": Schema.number().optional()
+        })
+        result = validate_columns(schema, data)
+        self.assertEqual(result.mask.tolist(), [True, False])
+        self.assertEqual(result.masks["score"].tolist(), [True, True])
+
+        # A typed column of the wrong type fails every row; missing required columns fail too
+        self.assertFalse(column_mask(Schema.string(), np.arange(3)).any())
+        result = validate_columns(Schema.object({"id": Schema.number()}), {"other": [1, 2]})
+        self.assertEqual(result.mask.tolist(), [False, False])
+
+        dates = validate_columns(Schema.object({"when": Schema.date()}), {"when": [datetime.now(), "2024-01-01"]})
+        self.assertEqual(dates.mask.tolist(), [True, False])
+
+    def test_invalid_input(self):
+        with self.assertRaises(ValueError):
+            validate_columns(self.schema, {"name": ["a"], "age": [1, 2]})
+        with self.assertRaises(TypeError):
+            validate_columns(Schema.string(), {"name": ["a"]})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import json
+import random
+import unittest
+
+from lazy import load_bytes, validate_bytes
+from validator import Schema, ValidationError
+
+
+def outcome(func, *args):
+    try:
+        return func(*args)
+    except ValidationError as e:
+        return e.message
+
+
+class TestLazy(unittest.TestCase):
+    def setUp(self):
+        self.schema = Schema.object({
+            "name": Schema.string().min_length(2),
+            "age": Schema.number().min(0).optional(),
+            "tags": Schema.array(Schema.string().pattern(r'^[a-z]+$')),
+            "address": Schema.object({"city": Schema.string(), "zip": Schema.string().optional()}).optional()
+        })
+
+    def test_matches_decoded_validation(self):
+        values = [None, True, 0, -3, 2.5, "", "x", "Jo", "abc", "A b", [], ["a"], ["a", "B"], {}, {"city": "X"},
+                  {"city": 1}, {"zip": "1"}]
+        keys = ["name", "age", "tags", "address", "extra"]
+        rng = random.Random(7)
+        for _ in range(2000):
+            document = {key: rng.choice(values) for key in keys if rng.random() < 0.8}
+            if rng.random() < 0.1:
+                document = rng.choice(values)
+            text = json.dumps(document)
+            expected = outcome(self.schema.validate, document)
+            self.assertEqual(outcome(validate_bytes, self.schema, text.encode()), expected, text)
+
+    def test_repeated_keys(self):
+        # Only the last occurrence of a key counts, as with json.loads()
+        for data in (b'{"name": "J", "tags": [], "name": "John"}', b'{"tags": ["A"], "name": "Jo", "tags": []}',
+                     b'{"name": "Jo", "tags": [], "address": {"city": 1}, "address": {"city": "X"}}'):
+            self.assertEqual(load_bytes(self.schema, data), self.schema.coerce(json.loads(data)), data)
+        self.assertEqual(load_bytes(self.schema, b'{"name": "J", "name": "John", "tags": []}'),
+                         {"name": "John", "tags": []})
+
+        values = ['null', '1', '-3', '"J"', '"Jo"', '"A b"', '[]', '["a"]', '["B"]', '{}', '{"city": "X"}']
+        keys = ["name", "age", "tags", "address"]
+        rng = random.Random(11)
+        for _ in range(2000):
+            pairs = [f'"{rng.choice(keys)}": {rng.choice(values)}' for _ in range(rng.randint(0, 7))]
+            text = '{' + ', '.join(pairs) + '}'
+            expected = outcome(self.schema.validate, json.loads(text))
+            self.assertEqual(outcome(validate_bytes, self.schema, text.encode()), expected, text)
+
+    def test_projection_and_buffers(self):
+        data = b'{"blob": {"a": ["]", "}"], "b": "\\"x\\"", "c": "\\\\"}, "tags": ["ab"], "name": "J\\u00f6rg",' \
+               b' "address": {"city": "Berlin", "floor": 3}}'
+        expected = {"name": "Jörg", "tags": ["ab"], "address": {"city": "Berlin"}}
+        for buffer in (data, bytearray(data), memoryview(data)):
+            self.assertEqual(load_bytes(self.schema, buffer), expected)
+        self.assertTrue(validate_bytes(Schema.array(Schema.number()), b' [1, 2.5e3, -0] '))
+        # Out-of-order and repeated keys behave as with json.loads()
+        self.assertEqual(load_bytes(self.schema, b'{"tags": [], "name": "Jo", "age": 1, "age": 2}'),
+                         {"name": "Jo", "age": 2, "tags": []})
+        with self.assertRaises(ValidationError):
+            validate_bytes(self.schema, b'{"name": "Jo", "tags": [], "name": "J"}')
+
+    def test_object_rules_see_the_whole_object(self):
+        schema = Schema.object({"name": Schema.string()}).custom(lambda obj: "extra" not in obj)
+        self.assertEqual(load_bytes(schema, b'{"name": "Jo"}'), {"name": "Jo"})
+        with self.assertRaises(ValidationError):
+            validate_bytes(schema, b'{"name": "Jo", "extra": 1}')
+
+    def test_rejects_before_decoding_the_rest(self):
+        # The failing field is reported even though a skipped value is malformed JSON
+        # that json.loads() would refuse
+        data = b'{"name": "J", "blob": [1, 2, nonsense], "tags": []}'
+        with self.assertRaises(ValidationError) as context:
+            validate_bytes(self.schema, data)
+        self.assertEqual(str(context.exception), "Validation failed for value: J")
+
+    def test_invalid_json(self):
+        for data in (b'', b'{"name": "Jo", "tags": []', b'{"name": "Jo" "tags": []}', b'{"name": "Jo", "tags": [}',
+                     b'{"name": "Jo", "tags": [], "x": [1}]}', b'{"name": "Jo", "tags": []} x', b'{name: 1}',
+                     b'{"name": "Jo", "tags": ["a",]}', b'{"name": "Jo", "tags": [], "x": "open}'):
+            with self.assertRaises(ValidationError) as context:
+                validate_bytes(self.schema, data)
+            self.assertTrue(context.exception.message.startswith("Invalid JSON"), data)
+
+
+if __name__ == '__main__':
+    unittest.main()
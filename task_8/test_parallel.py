@@ -0,0 +1,50 @@
+import unittest
+
+from parallel import ParallelValidator, validate_parallel
+from validator import Schema
+
+
+class TestParallel(unittest.TestCase):
+    def setUp(self):
+        self.schema = Schema.object({
+            "name": Schema.string().min_length(2),
+            "tags": Schema.array(Schema.string().pattern(r'^[a-z]+$'))
+        })
+        self.records = [
+            {"name": "ab" if i % 3 else "a", "tags": ["x"] if i % 5 else ["X"]}
+            for i in range(50)
+        ]
+
+    def test_parallel_matches_serial(self):
+        expected = self.schema.validate_many(self.records)
+        with ParallelValidator(self.schema, workers=2, chunk_size=7, overhead=0) as parallel:
+            result = parallel.validate_many(self.records)
+            self.assertEqual(parallel.last_mode, 'parallel')
+            self.assertEqual(result.errors, expected.errors)
+            self.assertEqual(result.bitmap, expected.bitmap)
+
+            # The pool is reused and iterables are accepted
+            result = parallel.validate_many(iter(self.records))
+            self.assertEqual(result.errors, expected.errors)
+
+    def test_small_inputs_stay_serial(self):
+        with ParallelValidator(self.schema, workers=4, chunk_size=10) as parallel:
+            result = parallel.validate_many(self.records)
+            self.assertEqual(parallel.last_mode, 'serial')
+            self.assertIsNone(parallel._pool)
+        self.assertEqual(result.errors, self.schema.validate_many(self.records).errors)
+
+        result = validate_parallel(self.schema, [], workers=2)
+        self.assertEqual(len(result), 0)
+
+    def test_unpicklable_schema_runs_serially(self):
+        schema = Schema.object({"name": Schema.string().custom(lambda name: name.islower())})
+        records = [{"name": "ab"}, {"name": "AB"}]
+        with ParallelValidator(schema, workers=4) as parallel:
+            result = parallel.validate_many(records)
+            self.assertEqual(parallel.last_mode, 'serial')
+        self.assertEqual(result.errors, schema.validate_many(records).errors)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime
+
+from serialize import (CompiledSchemaCache, dumps, dumps_binary, from_json_schema, loads,
+                       loads_binary, schema_hash, to_json_schema)
+from validator import Schema, ValidationError
+
+
+class TestSerialize(unittest.TestCase):
+    def setUp(self):
+        address_schema = Schema.object({
+            "street": Schema.string(),
+            "postalCode": Schema.string().pattern(r'^\d{5}$', cache_size=16).with_message('Postal code must be 5 digits')
+        })
+        self.schema = Schema.object({
+            "name": Schema.string().min_length(2).max_length(50),
+            "age": Schema.number().min(0).optional(),
+            "joined": Schema.date(),
+            "isActive": Schema.boolean(),
+            "tags": Schema.array(Schema.string()).optional(),
+            "address": address_schema.optional()
+        })
+        self.valid = {"name": "John", "joined": datetime.now(), "isActive": True,
+                      "address": {"street": "Main St", "postalCode": "12345"}}
+        self.invalid = {**self.valid, "address": {"street": "Main St", "postalCode": "1234"}}
+
+    def test_json_schema(self):
+        document = to_json_schema(self.schema)
+        self.assertEqual(document["type"], "object")
+        self.assertEqual(document["required"], ["name", "joined", "isActive"])
+        self.assertEqual(document["properties"]["name"], {"type": "string", "minLength": 2, "maxLength": 50})
+        self.assertEqual(document["properties"]["age"], {"type": ["number", "null"], "minimum": 0})
+
+        restored = from_json_schema(document)
+        self.assertEqual(dumps(restored), dumps(self.schema))
+        self.assertTrue(restored.validate(self.valid))
+        with self.assertRaises(ValidationError) as context:
+            restored.validate(self.invalid)
+        self.assertEqual(str(context.exception), 'Postal code must be 5 digits')
+
+    def test_binary_round_trip(self):
+        data = dumps_binary(self.schema)
+        self.assertLess(len(data), len(dumps(self.schema)))
+        self.assertEqual(dumps(loads_binary(data)), dumps(self.schema))
+        self.assertEqual(dumps(loads(dumps(self.schema))), dumps(self.schema))
+        with self.assertRaises(ValueError):
+            loads_binary(b'not a schema')
+
+    def test_unsupported(self):
+        class CustomValidator(Schema.string().__class__):
+            pass
+        with self.assertRaises(ValueError):
+            to_json_schema(Schema.object({"x": CustomValidator()}))
+        with self.assertRaises(ValueError):
+            to_json_schema(Schema.number().min(0).min(1))
+
+    def test_compiled_cache(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = CompiledSchemaCache(directory)
+            first = cache.load(self.schema)
+            self.assertEqual((cache.hits, cache.misses), (0, 1))
+            self.assertEqual(first.key, schema_hash(self.schema))
+            self.assertEqual(len(os.listdir(directory)), 1)
+
+            # A cold process only has the serialized document
+            cold = CompiledSchemaCache(directory)
+            entry = cold.load(dumps(self.schema))
+            self.assertEqual((cold.hits, cold.misses), (1, 0))
+            self.assertTrue(entry.validate(self.valid))
+            with self.assertRaises(ValidationError) as context:
+                entry.validate(self.invalid)
+            self.assertEqual(str(context.exception), 'Postal code must be 5 digits')
+            self.assertTrue(entry.validator.validate(self.valid))
+
+            # A corrupt entry is rebuilt
+            with open(os.path.join(directory, os.listdir(directory)[0]), 'wb') as file:
+                file.write(b'garbage')
+            entry = cold.load(to_json_schema(self.schema))
+            self.assertEqual(cold.misses, 1)
+            self.assertTrue(entry.validate(self.valid))
+
+
+if __name__ == '__main__':
+    unittest.main()
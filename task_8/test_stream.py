@@ -0,0 +1,79 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+from stream import iter_json_array, main, validate_stream
+from validator import Schema
+
+
+class TestStream(unittest.TestCase):
+    def setUp(self):
+        self.schema = Schema.object({
+            "name": Schema.string().min_length(2),
+            "age": Schema.number().min(0)
+        })
+
+    def test_ndjson(self):
+        data = b'{"name": "John", "age": 30}\n\n{"name": "J", "age": 30}\nnot json\n{"name": "Jane"}\n'
+        results = list(validate_stream(self.schema, io.BufferedReader(io.BytesIO(data)), batch_size=2))
+        self.assertEqual([(index, ok) for index, ok, _ in results], [(0, True), (1, False), (2, False), (3, False)])
+        self.assertIsNone(results[0][2])
+        self.assertEqual(results[1][2], "Validation failed for value: J")
+        self.assertTrue(results[2][2].startswith("Invalid JSON on line 4"))
+        self.assertEqual(results[3][2], "Missing required field: age")
+
+    def test_json_array(self):
+        records = [{"name": "user%d" % i, "age": i - 5} for i in range(20)]
+        data = json.dumps(records).encode()
+        results = list(validate_stream(self.schema, io.BufferedReader(io.BytesIO(data))))
+        self.assertEqual([ok for _, ok, _ in results], [i >= 5 for i in range(20)])
+
+    def test_incremental_array_parser(self):
+        values = [{"a": 1.5e10, "b": "é漢"}, -12345, 0.25, "text", [1, [2]], None, True, {}]
+        data = json.dumps(values, ensure_ascii=False).encode()
+        for read_size in (1, 2, 3, 7, 1024):
+            self.assertEqual(list(iter_json_array(io.BytesIO(data), read_size=read_size)), values)
+
+        for invalid in (b'{}', b'[1, 2,]', b'[1 2]', b'[1, 2'):
+            results = list(validate_stream(Schema.number(), io.BytesIO(invalid), format='array'))
+            index, ok, error = results[-1]
+            self.assertFalse(ok)
+            self.assertTrue(error.startswith("Invalid JSON"))
+
+    def test_malformed_element_stops_reading(self):
+        class CountingReader(io.BytesIO):
+            bytes_read = 0
+
+            def read(self, size=-1):
+                chunk = super().read(size)
+                self.bytes_read += len(chunk)
+                return chunk
+
+        data = b'[{"a": 1}, {"a": 1 "b": 2}, ' + b', '.join(b'{"a": %d}' % i for i in range(100000)) + b']'
+        stream = CountingReader(data)
+        results = list(iter_json_array(stream, read_size=1024))
+        self.assertEqual(results[0], {"a": 1})
+        self.assertEqual(results[1].message, "Invalid JSON: Expecting ',' delimiter at character 19")
+        self.assertLess(stream.bytes_read, 4096)
+
+    def test_cli(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson', delete=False) as f:
+            f.write('{"name": "John", "age": 30}\n{"name": "Jane", "age": -1}\n')
+        try:
+            output = io.StringIO()
+            with redirect_stdout(output):
+                status = main(['test_stream:CLI_SCHEMA', f.name])
+        finally:
+            os.unlink(f.name)
+        self.assertEqual(status, 1)
+        self.assertIn("Record 1: Validation failed for value: -1", output.getvalue())
+        self.assertIn("Checked 2 records: 1 valid, 1 invalid", output.getvalue())
+
+
+CLI_SCHEMA = Schema.object({"name": Schema.string(), "age": Schema.number().min(0)})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,11 @@
+import asyncio
+import copy
+import pickle
+import random
 import unittest
 from datetime import datetime
-from validator import Schema, ValidationError
+from validator import (FieldTimings, Schema, ValidationError, clear_pattern_cache, pattern_cache_info,
+                       set_field_hook)
 
 class TestValidator(unittest.TestCase):
     def test_string_validator(self):
@@ -53,6 +58,26 @@ class TestValidator(unittest.TestCase):
         with self.assertRaises(ValidationError):
             validator.validate("2024-03-20")
 
+    def test_validators_have_slots(self):
+        validators = [Schema.string().min_length(1), Schema.number(), Schema.boolean(), Schema.date(),
+                      Schema.object({"name": Schema.string()}), Schema.array(Schema.number())]
+        for validator in validators:
+            self.assertFalse(hasattr(validator, '__dict__'), type(validator).__name__)
+        # Type-only validators share the empty rule tuple
+        self.assertIs(Schema.number()._rules, Schema.string()._rules)
+
+    def test_type_checked_before_rules(self):
+        seen = []
+        validator = Schema.string().custom(lambda value: seen.append(value) or True)
+        for validate in (validator.validate, validator.compile()):
+            with self.assertRaises(ValidationError):
+                validate(123)
+        self.assertEqual([error.constraint for error in validator.collect_errors(123)], ['type'])
+        self.assertEqual(validator.validate_many([123]).errors, {0: "Validation failed for value: 123"})
+        self.assertEqual(seen, [])
+        self.assertTrue(validator.validate("ok"))
+        self.assertEqual(seen, ["ok"])
+
     def test_object_validator(self):
         # Simple object validation
         schema = Schema.object({
@@ -71,6 +96,51 @@ class TestValidator(unittest.TestCase):
         with self.assertRaises(ValidationError):
             schema.validate({"name": "John", "age": "30"})
 
+    def test_object_rules(self):
+        schema = Schema.object({
+            "start": Schema.date(),
+            "end": Schema.date(),
+            "title": Schema.string().optional()
+        }).custom(lambda span: span["start"] <= span["end"]).with_message("start must not be after end")
+        early, late = datetime(2024, 1, 1), datetime(2024, 6, 1)
+        valid, invalid = {"start": early, "end": late}, {"start": late, "end": early}
+        message = "start must not be after end"
+
+        for validate in (schema.validate, schema.compile()):
+            self.assertTrue(validate(valid))
+            with self.assertRaises(ValidationError) as context:
+                validate(invalid)
+            self.assertEqual(str(context.exception), message)
+        self.assertEqual(schema.validate_many([valid, invalid, {"start": early}]).errors,
+                         {1: message, 2: "Missing required field: end"})
+        self.assertEqual([(e.path, e.constraint, e.message) for e in schema.collect_errors(invalid)],
+                         [("", "custom", message)])
+        # Field errors come first and keep the object's rule from running on a broken object
+        self.assertEqual([e.constraint for e in schema.collect_errors({"start": early})], ["required"])
+        self.assertTrue(asyncio.run(schema.avalidate(valid)))
+        with self.assertRaises(ValidationError):
+            asyncio.run(schema.avalidate(invalid))
+        with self.assertRaises(ValidationError):
+            schema.revalidate(invalid, ["title"])
+
+        # coerce() checks the converted object
+        strings = {"start": "2024-06-01", "end": "2024-01-01"}
+        for coerce in (schema.coerce, schema.compile_coerce()):
+            self.assertEqual(coerce({"start": "2024-01-01", "end": "2024-06-01"}), valid)
+            with self.assertRaises(ValidationError):
+                coerce(strings)
+
+        # Coroutine checks on objects need avalidate()
+        async def reserved(span):
+            return span["start"] != early
+
+        booking = Schema.object({"start": Schema.date()}).custom(reserved)
+        self.assertTrue(asyncio.run(booking.avalidate({"start": late})))
+        with self.assertRaises(ValidationError):
+            asyncio.run(booking.avalidate({"start": early}))
+        with self.assertRaises(TypeError):
+            booking.validate({"start": late})
+
     def test_array_validator(self):
         # Array of strings
         validator = Schema.array(Schema.string())
@@ -234,5 +304,434 @@ class TestValidator(unittest.TestCase):
             validator.validate(123)
         self.assertEqual(str(context.exception), "Custom error message")
 
+    def test_compiled_schema(self):
+        address_schema = Schema.object({
+            "street": Schema.string(),
+            "postalCode": Schema.string().pattern(r'^\d{5}$').with_message('Postal code must be 5 digits')
+        })
+        user_schema = Schema.object({
+            "name": Schema.string().min_length(2).max_length(50),
+            "age": Schema.number().optional().min(0).max(150),
+            "joined": Schema.date(),
+            "isActive": Schema.boolean(),
+            "tags": Schema.array(Schema.string()),
+            "address": address_schema.optional()
+        })
+        compiled = Schema.compile(user_schema)
+
+        valid_user = {
+            "name": "John",
+            "joined": datetime.now(),
+            "isActive": True,
+            "tags": ["a", "b"],
+            "address": {"street": "Main St", "postalCode": "12345"}
+        }
+        self.assertTrue(compiled(valid_user))
+        self.assertTrue(compiled({"name": "John", "joined": datetime.now(), "isActive": False, "tags": [], "age": None}))
+
+        invalid_users = [
+            [],
+            {"name": "John"},
+            {**valid_user, "name": "J"},
+            {**valid_user, "age": 151},
+            {**valid_user, "isActive": "yes"},
+            {**valid_user, "tags": ["a", 1]},
+            {**valid_user, "address": {"street": "Main St", "postalCode": "1234"}},
+            {**valid_user, "address": None}
+        ]
+        for data in invalid_users:
+            with self.assertRaises(ValidationError) as expected:
+                user_schema.validate(data)
+            with self.assertRaises(ValidationError) as actual:
+                compiled(data)
+            self.assertEqual(actual.exception.message, expected.exception.message)
+
+    def test_compiled_deep_schema(self):
+        # Deep nesting is split into helper functions instead of hitting Python's block limits
+        schema = Schema.number().min(0)
+        data = 1
+        for _ in range(60):
+            schema = Schema.object({"child": Schema.array(schema)})
+            data = {"child": [data]}
+        compiled = schema.compile()
+        self.assertTrue(compiled(data))
+
+        invalid = -1
+        for _ in range(60):
+            invalid = {"child": [invalid]}
+        with self.assertRaises(ValidationError) as context:
+            compiled(invalid)
+        self.assertEqual(str(context.exception), "Validation failed for value: -1")
+
+    def test_validate_many(self):
+        schema = Schema.object({
+            "name": Schema.string().min_length(2),
+            "age": Schema.number().optional().min(0),
+            "tags": Schema.array(Schema.string()).optional()
+        })
+        rows = [
+            {"name": "John"},
+            {"name": "J"},
+            "not a dict",
+            {"name": "Jane", "tags": ["a", 1]},
+            {"name": "Jane", "age": -1},
+            {"age": 30},
+            {"name": "Jane", "age": 30, "tags": ["a"]}
+        ]
+        result = schema.validate_many(iter(rows))
+
+        self.assertEqual(len(result), len(rows))
+        self.assertEqual(result.valid_count, 2)
+        self.assertFalse(result.all_valid)
+        self.assertEqual([result.is_valid(i) for i in range(len(rows))],
+                         [True, False, False, False, False, False, True])
+        self.assertEqual(set(result.errors), {1, 2, 3, 4, 5})
+        for index, error in result.errors.items():
+            with self.assertRaises(ValidationError) as context:
+                schema.validate(rows[index])
+            self.assertEqual(error, context.exception.message)
+        with self.assertRaises(IndexError):
+            result.is_valid(len(rows))
+
+        empty = schema.validate_many([])
+        self.assertEqual(len(empty), 0)
+        self.assertTrue(empty.all_valid)
+
+        # Leaf validators support batches too
+        result = Schema.string().optional().validate_many(["a", None, 1])
+        self.assertEqual(result.errors, {2: "Validation failed for value: 1"})
+
+    def test_validate_many_reuses_compiled_function(self):
+        validator = Schema.string()
+        validator.validate_many(["a"])
+        batch = validator._batch
+        validator.validate_many(["b"])
+        self.assertIs(validator._batch, batch)
+        self.assertIsNone(pickle.loads(pickle.dumps(validator))._batch)
+
+        # Builder methods drop the compiled function
+        self.assertEqual(validator.min_length(2).validate_many(["a"]).errors,
+                         {0: "Validation failed for value: a"})
+        self.assertEqual(validator.with_message("too short").validate_many(["a"]).errors, {0: "too short"})
+        self.assertTrue(validator.optional().validate_many([None]).all_valid)
+
+    def test_collect_errors_names_the_failing_rule(self):
+        # The same check registered twice is reported at the position that failed
+        def short(value):
+            return len(value) < 5
+
+        validator = Schema.string().custom(short).min_length(2).custom(short)
+        self.assertEqual([e.constraint for e in validator.collect_errors("a")], ["min_length"])
+        self.assertEqual([e.constraint for e in validator.collect_errors("abcdef")], ["custom"])
+        self.assertEqual([e.constraint for e in Schema.number().min(0).max(9).collect_errors(10)], ["max"])
+
+    def test_collect_all_errors(self):
+        item_schema = Schema.object({
+            "zip": Schema.string().pattern(r'^\d{5}$').with_message('Postal code must be 5 digits'),
+            "quantity": Schema.number().min(1)
+        })
+        schema = Schema.object({
+            "name": Schema.string().min_length(2),
+            "address": Schema.object({"items": Schema.array(item_schema)}),
+            "tags": Schema.array(Schema.string()).optional()
+        })
+        data = {
+            "name": "J",
+            "address": {"items": [{"zip": "12345", "quantity": 1}, {"zip": "1"}, "oops"]},
+            "tags": ["a", 2]
+        }
+
+        errors = schema.collect_errors(data)
+        self.assertEqual([(e.path, e.constraint, e.value) for e in errors], [
+            ("name", "min_length", "J"),
+            ("address.items[1].zip", "pattern", "1"),
+            ("address.items[1].quantity", "required", None),
+            ("address.items[2]", "type", "oops"),
+            ("tags[1]", "type", 2)
+        ])
+        self.assertEqual(errors[1].message, 'Postal code must be 5 digits')
+
+        with self.assertRaises(ValidationError) as context:
+            schema.validate_all(data)
+        self.assertEqual(len(context.exception.errors), 5)
+        self.assertIn("address.items[1].zip: Postal code must be 5 digits", str(context.exception))
+
+        # A single failure keeps the message validate() would raise
+        with self.assertRaises(ValidationError) as context:
+            schema.validate_all({"name": "John", "address": {"items": []}, "tags": [1]})
+        self.assertEqual(str(context.exception), "Validation failed for value: 1")
+
+        valid = {"name": "John", "address": {"items": [{"zip": "12345", "quantity": 2}]}}
+        self.assertEqual(schema.collect_errors(valid), [])
+        self.assertTrue(schema.validate_all(valid))
+
+    def test_pickle(self):
+        schema = Schema.object({
+            "postalCode": Schema.string().pattern(r'^\d{5}$').with_message('Postal code must be 5 digits'),
+            "visits": Schema.array(Schema.date()).optional()
+        })
+        restored = pickle.loads(pickle.dumps(schema))
+        self.assertTrue(restored.validate({"postalCode": "12345", "visits": [datetime.now()]}))
+        with self.assertRaises(ValidationError) as context:
+            restored.validate({"postalCode": "1234"})
+        self.assertEqual(str(context.exception), 'Postal code must be 5 digits')
+
+    def test_pattern_caches(self):
+        clear_pattern_cache()
+        for _ in range(3):
+            Schema.string().pattern(r'^[A-Z]{2}$')
+        info = pattern_cache_info()
+        self.assertEqual((info.hits, info.misses, info.currsize), (2, 1, 1))
+
+        validator = Schema.string().pattern(r'^[A-Z]{2}$', cache_size=2)
+        for value in ["US", "US", "DE", "US"]:
+            self.assertTrue(validator.validate(value))
+        with self.assertRaises(ValidationError):
+            validator.validate("usa")
+        self.assertEqual(validator.cache_info(), (2, 3, 2, 2))
+
+        # The compiled function shares the same result cache
+        compiled = validator.compile()
+        self.assertTrue(compiled("DE"))
+        with self.assertRaises(ValidationError):
+            compiled("usa")
+        self.assertEqual(validator.cache_info().hits, 4)
+        self.assertEqual(Schema.string().cache_info(), (0, 0, 0, 0))
+
+    def test_revalidate_matches_full_validation(self):
+        # Property-based check: for random valid documents and random edits,
+        # re-validating only the changed paths gives the same result as validate()
+        item_schema = Schema.object({
+            "zip": Schema.string().pattern(r'^\d{5}$'),
+            "quantity": Schema.number().min(1).max(10),
+            "note": Schema.string().max_length(3).optional()
+        })
+        schema = Schema.object({
+            "name": Schema.string().min_length(2),
+            "age": Schema.number().min(0).optional(),
+            "tags": Schema.array(Schema.string()).optional(),
+            "address": Schema.object({
+                "city": Schema.string(),
+                "items": Schema.array(item_schema)
+            })
+        })
+        candidates = [None, 0, 5, -1, 11, "", "ab", "12345", "long", True, [], ["a"], [1], {},
+                      {"zip": "12345", "quantity": 2}, {"zip": "1", "quantity": 2},
+                      [{"zip": "54321", "quantity": 3}]]
+        rng = random.Random(1234)
+
+        def random_document():
+            return {
+                "name": rng.choice(["ab", "John"]),
+                **({"age": rng.randint(0, 99)} if rng.random() < 0.5 else {}),
+                **({"tags": ["x"] * rng.randint(0, 2)} if rng.random() < 0.5 else {}),
+                "address": {
+                    "city": "Town",
+                    "items": [{"zip": "12345", "quantity": rng.randint(1, 10)}
+                              for _ in range(rng.randint(0, 3))]
+                }
+            }
+
+        def random_path(document):
+            path, node = [], document
+            while isinstance(node, (dict, list)) and node and rng.random() < 0.7:
+                key = rng.choice(list(node)) if isinstance(node, dict) else rng.randrange(len(node) + 1)
+                path.append(key)
+                if isinstance(node, list) and key == len(node):
+                    break
+                node = node[key]
+            return path
+
+        def outcome(check, *args):
+            try:
+                return check(*args)
+            except ValidationError as e:
+                return e.message
+
+        for _ in range(2000):
+            document = random_document()
+            self.assertTrue(schema.validate(document))
+            path = random_path(document) + (["extra"] if rng.random() < 0.1 else [])
+            edited = copy.deepcopy(document)
+            parent = edited
+            try:
+                for key in path[:-1]:
+                    parent = parent[key]
+                if not path:
+                    edited = rng.choice(candidates)
+                elif isinstance(parent, dict) and rng.random() < 0.2:
+                    parent.pop(path[-1], None)
+                elif isinstance(parent, list) and path[-1] == len(parent):
+                    parent.append(copy.deepcopy(rng.choice(candidates)))
+                else:
+                    parent[path[-1]] = copy.deepcopy(rng.choice(candidates))
+            except (TypeError, KeyError, IndexError):
+                continue
+            self.assertEqual(outcome(schema.revalidate, edited, [path]), outcome(schema.validate, edited),
+                             f"path={path} document={edited}")
+
+    def test_validate_patch(self):
+        schema = Schema.object({
+            "name": Schema.string().min_length(2),
+            "age": Schema.number().optional(),
+            "address": Schema.object({"city": Schema.string(), "zip": Schema.string().pattern(r'^\d{5}$')})
+        })
+        previous = {"name": "John", "age": 30, "address": {"city": "Town", "zip": "12345"}}
+
+        updated = schema.validate_patch(previous, {"age": None, "address": {"zip": "54321"}})
+        self.assertEqual(updated, {"name": "John", "address": {"city": "Town", "zip": "54321"}})
+        self.assertEqual(previous["age"], 30)
+
+        with self.assertRaises(ValidationError) as context:
+            schema.validate_patch(previous, {"address": {"zip": "1"}})
+        self.assertEqual(str(context.exception), "Validation failed for value: 1")
+        with self.assertRaises(ValidationError) as context:
+            schema.validate_patch(previous, {"address": {"city": None}})
+        self.assertEqual(str(context.exception), "Missing required field: city")
+
+        # Paths may be strings or sequences; an empty path re-validates everything
+        self.assertTrue(schema.revalidate(previous, ["address.zip", ("name",)]))
+        with self.assertRaises(ValidationError):
+            schema.revalidate({"name": "J"}, [[]])
+
+    def test_avalidate(self):
+        # In-memory stand-in for a database lookup that records peak concurrency
+        taken = {"alice", "bob"}
+        in_flight = peak = 0
+
+        async def username_free(name):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return name not in taken
+
+        schema = Schema.object({
+            "name": Schema.string().min_length(2).custom(username_free).with_message("Name taken"),
+            "friends": Schema.array(Schema.string().custom(username_free)),
+            "age": Schema.number().custom(lambda age: age % 1 == 0)
+        })
+        self.assertTrue(asyncio.run(schema.avalidate({"name": "carol", "friends": ["dave", "erin"], "age": 30})))
+
+        # Async checks of all fields run together, bounded by the concurrency limit
+        friends = [f"user{i}" for i in range(20)]
+        peak = 0
+        self.assertTrue(asyncio.run(schema.avalidate({"name": "carol", "friends": friends, "age": 1},
+                                                     concurrency=5)))
+        self.assertEqual(peak, 5)
+
+        # The first failure in schema order is reported, as validate() would
+        with self.assertRaises(ValidationError) as context:
+            asyncio.run(schema.avalidate({"name": "alice", "friends": ["bob"], "age": 30}))
+        self.assertEqual(str(context.exception), "Name taken")
+        with self.assertRaises(ValidationError) as context:
+            asyncio.run(schema.avalidate({"name": "carol", "friends": ["bob"], "age": 30.5}))
+        self.assertEqual(str(context.exception), "Validation failed for value: bob")
+        with self.assertRaises(ValidationError) as context:
+            asyncio.run(schema.avalidate({"name": "carol", "friends": ["dave"], "age": 30.5}))
+        self.assertEqual(str(context.exception), "Validation failed for value: 30.5")
+        with self.assertRaises(ValidationError) as context:
+            asyncio.run(schema.avalidate({"name": "carol", "friends": []}))
+        self.assertEqual(str(context.exception), "Missing required field: age")
+
+        # Synchronous validation cannot run coroutine checks
+        with self.assertRaises(TypeError):
+            schema.validate({"name": "carol", "friends": [], "age": 30})
+        with self.assertRaises(TypeError):
+            schema.compile()
+        self.assertTrue(Schema.number().custom(lambda n: n > 0).compile()(1))
+
+    def test_field_timing_hook(self):
+        schema = Schema.object({
+            "name": Schema.string(),
+            "lines": Schema.array(Schema.object({"sku": Schema.string(), "note": Schema.string().optional()})),
+            "age": Schema.number().min(0)
+        })
+        calls = []
+        self.assertIsNone(set_field_hook(lambda path, seconds: calls.append(path)))
+        try:
+            schema.validate({"name": "a", "lines": [{"sku": "x"}, {"sku": "y"}], "age": 1})
+        finally:
+            set_field_hook(None)
+        self.assertEqual(calls, ["name", "lines[].sku", "lines[].sku", "lines", "age"])
+
+        with FieldTimings() as timings:
+            schema.validate({"name": "a", "lines": [], "age": 1})
+            with self.assertRaises(ValidationError):
+                schema.validate({"name": "a", "lines": [{"sku": 1}], "age": 1})
+        # The failing field is still timed and the hook is removed on exit
+        self.assertEqual(timings.calls, {"name": 2, "lines": 2, "lines[].sku": 1, "age": 1})
+        self.assertEqual({path for path, _, _ in timings.report()}, set(timings.calls))
+        self.assertEqual(len(timings.report(2)), 2)
+        self.assertIsNone(set_field_hook(None))
+
+    def test_coerce(self):
+        schema = Schema.object({
+            "amount": Schema.number().min(0),
+            "created": Schema.date(),
+            "lines": Schema.array(Schema.object({"price": Schema.number(), "sku": Schema.string()})),
+            "note": Schema.string().optional()
+        })
+        record = {"amount": " 12.50", "created": "2024-03-01T10:30:00Z", "extra": 1,
+                  "lines": [{"price": "3e2", "sku": "A"}, {"price": 4, "sku": "B"}]}
+        original = copy.deepcopy(record)
+        result = schema.coerce(record)
+        self.assertEqual(result["amount"], 12.5)
+        self.assertEqual(result["created"], datetime.fromisoformat("2024-03-01T10:30:00+00:00"))
+        self.assertEqual(result["lines"][0], {"price": 300.0, "sku": "A"})
+        self.assertEqual(result["extra"], 1)
+        self.assertEqual(record, original)
+        # Only containers with converted values are copied
+        self.assertIs(result["lines"][1], record["lines"][1])
+        converted = {"amount": 1, "created": datetime(2024, 1, 1), "lines": []}
+        self.assertIs(schema.coerce(converted), converted)
+
+        for value, message in (("1_000", "Validation failed for value: 1_000"),
+                               ("nan", "Validation failed for value: nan"),
+                               ("-1", "Validation failed for value: -1.0")):
+            with self.assertRaises(ValidationError) as context:
+                schema.coerce(dict(record, amount=value))
+            self.assertEqual(str(context.exception), message)
+        with self.assertRaises(ValidationError) as context:
+            schema.coerce(dict(record, created="yesterday"))
+        self.assertEqual(str(context.exception), "Validation failed for value: yesterday")
+        with self.assertRaises(ValidationError) as context:
+            schema.coerce({"amount": "1", "created": "2024-03-01"})
+        self.assertEqual(str(context.exception), "Missing required field: lines")
+
+    def test_compiled_coerce(self):
+        schema = Schema.object({
+            "amount": Schema.number().min(0),
+            "created": Schema.date().optional(),
+            "name": Schema.string().min_length(2),
+            "lines": Schema.array(Schema.object({"price": Schema.number(), "tags": Schema.array(Schema.string())})),
+            "scores": Schema.array(Schema.number().max(10)).optional()
+        })
+        coerce = schema.compile_coerce()
+        values = [None, "x", "ab", "1", " 2.5 ", "-3", "11", 4, "2024-01-01", "2024-01-01T00:00:00Z", [], ["a"],
+                  [{"price": "1", "tags": []}], [{"price": 2, "tags": ["a", 1]}], [{"tags": []}], ["5", 7, None]]
+        rng = random.Random(3)
+        for _ in range(3000):
+            record = {key: rng.choice(values) for key in ("amount", "created", "name", "lines", "scores")
+                      if rng.random() < 0.85}
+            outcomes = []
+            for func in (schema.coerce, coerce):
+                try:
+                    result = func(record)
+                    outcomes.append((result, [result is record] + [result.get(key) is record.get(key)
+                                                                   for key in record]))
+                except ValidationError as e:
+                    outcomes.append(e.message)
+            self.assertEqual(outcomes[0], outcomes[1], record)
+
+        deep, record = Schema.number(), "7"
+        for _ in range(60):
+            deep, record = Schema.object({"child": deep, "n": Schema.number()}), {"child": record, "n": 1}
+        result = deep.compile_coerce()(record)
+        for _ in range(60):
+            result = result["child"]
+        self.assertEqual(result, 7.0)
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
@@ -1,30 +1,156 @@
-from typing import Any, Dict, List, Optional, TypeVar, Union, Callable
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple, TypeVar, Union, Callable
 from datetime import datetime
+from functools import lru_cache
+import asyncio
+import inspect
+import math
 import re
+import time
 
 T = TypeVar('T')
 
+class FieldError:
+    """A single failure recorded in collect-all-errors mode"""
+    def __init__(self, path: str, constraint: str, value: Any, message: str):
+        self.path = path
+        self.constraint = constraint
+        self.value = value
+        self.message = message
+
+    def __repr__(self) -> str:
+        return f"FieldError(path={self.path!r}, constraint={self.constraint!r}, value={self.value!r})"
+
 class ValidationError(Exception):
     """Custom exception for validation errors"""
-    def __init__(self, message: str):
+    def __init__(self, message: str, errors: Optional[List[FieldError]] = None):
         self.message = message
+        self.errors = errors or []
         super().__init__(self.message)
 
+def _format_path(path: List[Any]) -> str:
+    """Render a path stack such as ['address', 'items', 3, 'zip'] as address.items[3].zip"""
+    text = ''
+    for part in path:
+        if type(part) is int:
+            text += f'[{part}]'
+        else:
+            text += f'.{part}' if text else str(part)
+    return text
+
+_PATH_PART = re.compile(r'([^.\[\]]+)|\[(\d+)\]')
+
+def _parse_path(path: Union[str, Iterable[Any]]) -> List[Any]:
+    """Split address.items[3].zip into ['address', 'items', 3, 'zip']; sequences pass through"""
+    if not isinstance(path, str):
+        return list(path)
+    return [int(index) if index else key for key, index in _PATH_PART.findall(path)]
+
+def _change_trie(paths: Iterable[Union[str, Iterable[Any]]]) -> Optional[Dict[Any, Any]]:
+    """
+    Merge changed paths into a nested dict where None marks a changed subtree.
+    Returns None when the whole value changed.
+    """
+    trie: Dict[Any, Any] = {}
+    for path in paths:
+        parts = _parse_path(path)
+        if not parts:
+            return None
+        node = trie
+        for part in parts[:-1]:
+            child = node.setdefault(part, {})
+            if child is None:
+                break  # an ancestor is already fully re-validated
+            node = child
+        else:
+            node[parts[-1]] = None
+    return trie
+
+def _merge_patch(target: Any, patch: Any, path: List[Any], changed: List[List[Any]]) -> Any:
+    """Apply a JSON merge patch (RFC 7386), copying only containers along changed paths"""
+    if not isinstance(patch, dict) or not isinstance(target, dict):
+        changed.append(list(path))
+        return _merge_patch({}, patch, [], []) if isinstance(patch, dict) else patch
+    result = dict(target)
+    for key, value in patch.items():
+        path.append(key)
+        if value is None:
+            if key in result:
+                del result[key]
+                changed.append(list(path))
+        else:
+            result[key] = _merge_patch(result.get(key), value, path, changed)
+        path.pop()
+    return result
+
+# Factories turning a rule description into its check
+_RULE_CHECKS: Dict[str, Callable[[Any], Callable[[Any], bool]]] = {
+    'min_length': lambda length: lambda x: len(x) >= length,
+    'max_length': lambda length: lambda x: len(x) <= length,
+    'pattern': lambda regex: lambda x: bool(regex.match(x)),
+    'min': lambda value: lambda x: x >= value,
+    'max': lambda value: lambda x: x <= value,
+    'custom': lambda check: check,
+    'async': lambda check: _async_only(check),
+}
+
+def _async_only(check: Callable[[Any], Any]) -> Callable[[Any], bool]:
+    """Stand-in for a coroutine check in the synchronous pipeline"""
+    def requires_avalidate(value: Any) -> bool:
+        raise TypeError(f"{check.__name__} is a coroutine check; use avalidate()")
+    return requires_avalidate
+
 class Validator:
     """Base validator class"""
-    def __init__(self):
+    # Multi-tenant schemas hold many validators, so they carry no __dict__.
+    # The type check is a dedicated first stage (object means untyped) and
+    # rules are tuples, which stay empty and shared for type-only validators.
+    # _batch holds the compile_many() function validate_many() reuses.
+    __slots__ = ('_custom_message', '_type', '_validators', '_rules', '_is_optional', '_batch')
+
+    def __init__(self, value_type: Union[type, Tuple[type, ...]] = object):
         self._custom_message = None
-        self._validators: List[Callable[[Any], bool]] = []
+        self._type = value_type
+        self._validators: Tuple[Callable[[Any], bool], ...] = ()
+        self._rules: Tuple[Tuple[str, Any], ...] = ()
         self._is_optional = False
+        self._batch: Optional[Callable[[Iterable[Any]], 'BatchResult']] = None
+
+    def _add_rule(self, name: str, arg: Any) -> None:
+        """Register a check together with a description the compiler can inline"""
+        self._validators += (_RULE_CHECKS[name](arg),)
+        self._rules += ((name, arg),)
+        self._batch = None
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Rule checks are closures; pickle their descriptions and rebuild them
+        state = {name: getattr(self, name)
+                 for cls in type(self).__mro__ for name in getattr(cls, '__slots__', ())
+                 if name != '_batch' and hasattr(self, name)}
+        state.update(getattr(self, '__dict__', {}))
+        state['_validators'] = self._validators[len(self._rules):]
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        for name, value in state.items():
+            object.__setattr__(self, name, value)
+        self._validators = tuple(_RULE_CHECKS[name](arg) for name, arg in self._rules) + tuple(state['_validators'])
+        self._batch = None
 
     def with_message(self, message: str) -> 'Validator':
         """Set a custom error message for validation failures"""
         self._custom_message = message
+        self._batch = None
         return self
 
     def optional(self) -> 'Validator':
         """Mark this field as optional"""
         self._is_optional = True
+        self._batch = None
+        return self
+
+    def custom(self, check: Callable[[Any], Any]) -> 'Validator':
+        """Add a custom predicate; coroutine functions are only run by avalidate()"""
+        self._add_rule('async' if inspect.iscoroutinefunction(check) else 'custom', check)
         return self
 
     def validate(self, value: Any) -> bool:
@@ -32,69 +158,383 @@ class Validator:
         if self._is_optional and value is None:
             return True
 
+        if not isinstance(value, self._type):
+            raise ValidationError(self._custom_message or f"Validation failed for value: {value}")
         for validator in self._validators:
             if not validator(value):
                 raise ValidationError(self._custom_message or f"Validation failed for value: {value}")
         return True
 
+    def collect_errors(self, value: Any) -> List[FieldError]:
+        """Validate the value and return every failure; an empty list means it is valid"""
+        errors: List[FieldError] = []
+        self._collect_errors(value, [], errors)
+        return errors
+
+    def validate_all(self, value: Any) -> bool:
+        """Like validate(), but the raised ValidationError lists every failure in .errors"""
+        errors = self.collect_errors(value)
+        if not errors:
+            return True
+        if len(errors) == 1:
+            raise ValidationError(errors[0].message, errors)
+        details = '; '.join(f"{error.path or '<root>'}: {error.message}" for error in errors)
+        raise ValidationError(f"{len(errors)} validation errors: {details}", errors)
+
+    def _collect_errors(self, value: Any, path: List[Any], errors: List[FieldError]) -> None:
+        """Append failures to errors; path is a shared stack so valid data allocates nothing"""
+        if type(self).validate is not Validator.validate:
+            # Subclasses with their own validate() report through it
+            try:
+                self.validate(value)
+            except ValidationError as e:
+                errors.append(FieldError(_format_path(path), 'custom', value, e.message))
+            return
+        if self._is_optional and value is None:
+            return
+        self._collect_rule_errors(value, path, errors)
+
+    async def avalidate(self, value: Any, concurrency: int = 10) -> bool:
+        """
+        Like validate(), but custom checks may be coroutine functions. Synchronous
+        rules run first; the async checks of all fields that passed them then run
+        concurrently, at most `concurrency` at a time. The error raised is the
+        one validate() would raise for the first failure in schema order.
+        """
+        pending: List[Tuple[Optional[Callable[[Any], Any]], Any, str]] = []
+        self._plan_async(value, pending)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run(check: Callable[[Any], Any], item: Any) -> Any:
+            async with semaphore:
+                return await check(item)
+
+        tasks = [asyncio.ensure_future(run(check, item)) for check, item, _ in pending if check is not None]
+        try:
+            results = iter(await asyncio.gather(*tasks))
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        for check, _, message in pending:
+            # A synchronous failure is always the last entry
+            if check is None or not next(results):
+                raise ValidationError(message)
+        return True
+
+    def _plan_async(self, value: Any, pending: List[Tuple[Any, Any, str]]) -> bool:
+        """
+        Run the synchronous part of validation and queue (check, value, message)
+        for coroutine checks. A failure is queued as (None, None, message) and
+        stops the walk; returns whether it may continue.
+        """
+        if type(self).validate is not Validator.validate:
+            try:
+                self.validate(value)
+            except ValidationError as e:
+                pending.append((None, None, e.message))
+                return False
+            return True
+        if self._is_optional and value is None:
+            return True
+        return self._plan_rules(value, pending)
+
+    def _plan_rules(self, value: Any, pending: List[Tuple[Any, Any, str]]) -> bool:
+        message = self._custom_message or f"Validation failed for value: {value}"
+        if not isinstance(value, self._type):
+            pending.append((None, None, message))
+            return False
+        async_checks = []
+        for index, check in enumerate(self._validators):
+            rule = self._rules[index] if index < len(self._rules) else None
+            if rule is not None and rule[0] == 'async':
+                async_checks.append(rule[1])
+            elif not check(value):
+                pending.append((None, None, message))
+                return False
+        pending.extend((check, value, message) for check in async_checks)
+        return True
+
+    def _collect_rule_errors(self, value: Any, path: List[Any], errors: List[FieldError]) -> bool:
+        """Record the first failing rule, as validate() would; return whether all passed"""
+        if not isinstance(value, self._type):
+            message = self._custom_message or f"Validation failed for value: {value}"
+            errors.append(FieldError(_format_path(path), 'type', value, message))
+            return False
+        for index, check in enumerate(self._validators):
+            if not check(value):
+                constraint = self._rules[index][0] if index < len(self._rules) else 'custom'
+                message = self._custom_message or f"Validation failed for value: {value}"
+                errors.append(FieldError(_format_path(path), constraint, value, message))
+                return False
+        return True
+
+    def revalidate(self, value: Any, changed_paths: Iterable[Union[str, Iterable[Any]]]) -> bool:
+        """
+        Re-validate value after changes at changed_paths (strings like
+        address.items[3].zip or sequences of keys and indices), assuming it
+        was valid before them. Only the changed subtrees and the containers
+        leading to them are checked; the outcome and error message equal
+        those of validate().
+        """
+        trie = _change_trie(changed_paths)
+        if trie is None:
+            return self.validate(value)
+        self._revalidate(value, trie)
+        return True
+
+    def validate_patch(self, previous: Any, patch: Any) -> Any:
+        """
+        Apply a JSON merge patch to a previously validated document and
+        re-validate only what it touched. Returns the new document; previous
+        is not modified and unchanged subtrees are shared with it.
+        """
+        changed: List[List[Any]] = []
+        document = _merge_patch(previous, patch, [], changed)
+        self.revalidate(document, changed)
+        return document
+
+    def _revalidate(self, value: Any, trie: Dict[Any, Any]) -> None:
+        """Check the parts of value named by a change trie; leaves re-check everything"""
+        self.validate(value)
+
+    def coerce(self, value: Any) -> Any:
+        """
+        Validate value in a single pass while converting ISO date strings to
+        datetime and numeric strings to float, and return the converted value.
+        Objects and arrays are copied once, and only when something inside them
+        was converted; otherwise the input itself is returned.
+        """
+        return self._coerce(value)
+
+    def _coerce(self, value: Any) -> Any:
+        self.validate(value)
+        return value
+
+    def compile(self) -> Callable[[Any], bool]:
+        """Generate a single specialized function equivalent to validate()"""
+        return _SchemaCompiler().compile(self)
+
+    def compile_many(self) -> Callable[[Iterable[Any]], 'BatchResult']:
+        """Generate a function that validates many values and returns a BatchResult"""
+        return _SchemaCompiler().compile_many(self)
+
+    def compile_coerce(self) -> Callable[[Any], Any]:
+        """Generate a single specialized function equivalent to coerce()"""
+        return _SchemaCompiler().compile_coerce(self)
+
+    def validate_many(self, values: Iterable[Any]) -> 'BatchResult':
+        """
+        Validate every value without raising, collecting the first error of each row.
+        The compile_many() function is generated on the first call and kept until a
+        builder method changes this validator; changing nested validators after that
+        is not seen.
+        """
+        if self._batch is None:
+            self._batch = self.compile_many()
+        return self._batch(values)
+
+class CacheInfo(NamedTuple):
+    """Hit/miss counters, shaped like functools.lru_cache().cache_info()"""
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+# Compiled patterns are shared by all StringValidator instances, so schemas
+# rebuilt per request do not recompile the same expressions.
+PATTERN_CACHE_SIZE = 1024
+_compile_pattern = lru_cache(maxsize=PATTERN_CACHE_SIZE)(re.compile)
+
+def pattern_cache_info() -> CacheInfo:
+    """Return counters for the shared compiled-pattern cache"""
+    return CacheInfo(*_compile_pattern.cache_info())
+
+def clear_pattern_cache() -> None:
+    """Empty the shared compiled-pattern cache and reset its counters"""
+    _compile_pattern.cache_clear()
+
+class PatternCache:
+    """Memoized results of one pattern, for fields with few distinct values"""
+    def __init__(self, regex: 're.Pattern', maxsize: int):
+        self.regex = regex
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._results: Dict[str, bool] = {}
+
+    def match(self, value: str) -> bool:
+        """Return whether value matches, consulting the regex only for unseen values"""
+        result = self._results.get(value)
+        if result is not None:
+            self.hits += 1
+            return result
+        self.misses += 1
+        result = self.regex.match(value) is not None
+        if len(self._results) >= self.maxsize:
+            # Evict the oldest entry; low-cardinality fields rarely get here
+            del self._results[next(iter(self._results))]
+        self._results[value] = result
+        return result
+
+    def cache_info(self) -> CacheInfo:
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._results))
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Cached results are cheap to rebuild and can be large; do not ship them
+        return {'regex': self.regex, 'maxsize': self.maxsize, 'hits': 0, 'misses': 0, '_results': {}}
+
 class StringValidator(Validator):
     """Validator for string values"""
+    __slots__ = ()
+
     def __init__(self):
-        super().__init__()
-        self._validators.append(lambda x: isinstance(x, str))
+        super().__init__((str,))
 
     def min_length(self, length: int) -> 'StringValidator':
         """Add minimum length validation"""
-        self._validators.append(lambda x: len(x) >= length)
+        self._add_rule('min_length', length)
         return self
 
     def max_length(self, length: int) -> 'StringValidator':
         """Add maximum length validation"""
-        self._validators.append(lambda x: len(x) <= length)
+        self._add_rule('max_length', length)
         return self
 
-    def pattern(self, pattern: str) -> 'StringValidator':
-        """Add regex pattern validation"""
-        regex = re.compile(pattern)
-        self._validators.append(lambda x: bool(regex.match(x)))
+    def pattern(self, pattern: str, cache_size: int = 0) -> 'StringValidator':
+        """Add regex pattern validation; cache_size > 0 memoizes results per value"""
+        regex = _compile_pattern(pattern)
+        self._add_rule('pattern', PatternCache(regex, cache_size) if cache_size > 0 else regex)
         return self
 
+    def cache_info(self) -> CacheInfo:
+        """Return combined result-cache counters of this validator's cached patterns"""
+        hits = misses = maxsize = currsize = 0
+        for name, arg in self._rules:
+            if name == 'pattern' and isinstance(arg, PatternCache):
+                hits += arg.hits
+                misses += arg.misses
+                maxsize += arg.maxsize
+                currsize += len(arg._results)
+        return CacheInfo(hits, misses, maxsize, currsize)
+
+def _to_number(value: str) -> Any:
+    """Convert a numeric string to float; anything else is returned unchanged"""
+    try:
+        number = float(value)
+    except ValueError:
+        return value
+    # float() also accepts 'inf', 'nan' and '1_000'
+    return number if math.isfinite(number) and '_' not in value else value
+
+def _to_datetime(value: str) -> Any:
+    """Convert an ISO 8601 string to datetime; anything else is returned unchanged"""
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        pass
+    # fromisoformat() only accepts a trailing Z from Python 3.11
+    if value.endswith('Z'):
+        try:
+            return datetime.fromisoformat(value[:-1] + '+00:00')
+        except ValueError:
+            pass
+    return value
+
 class NumberValidator(Validator):
     """Validator for numeric values"""
+    __slots__ = ()
+
     def __init__(self):
-        super().__init__()
-        self._validators.append(lambda x: isinstance(x, (int, float)))
+        super().__init__((int, float))
 
     def min(self, value: Union[int, float]) -> 'NumberValidator':
         """Add minimum value validation"""
-        self._validators.append(lambda x: x >= value)
+        self._add_rule('min', value)
         return self
 
     def max(self, value: Union[int, float]) -> 'NumberValidator':
         """Add maximum value validation"""
-        self._validators.append(lambda x: x <= value)
+        self._add_rule('max', value)
         return self
 
+    def _coerce(self, value: Any) -> Any:
+        if type(value) is str:
+            value = _to_number(value)
+        self.validate(value)
+        return value
+
 class BooleanValidator(Validator):
     """Validator for boolean values"""
+    __slots__ = ()
+
     def __init__(self):
-        super().__init__()
-        self._validators.append(lambda x: isinstance(x, bool))
+        super().__init__((bool,))
 
 class DateValidator(Validator):
     """Validator for date values"""
+    __slots__ = ()
+
     def __init__(self):
-        super().__init__()
-        self._validators.append(lambda x: isinstance(x, datetime))
+        super().__init__((datetime,))
+
+    def _coerce(self, value: Any) -> Any:
+        if type(value) is str:
+            value = _to_datetime(value)
+        self.validate(value)
+        return value
+
+# Per-field timing hook used by interpreted validate(); see set_field_hook()
+_field_hook: Optional[Callable[[str, float], None]] = None
+_field_path = ''
+
+def set_field_hook(hook: Optional[Callable[[str, float], None]]) -> Optional[Callable[[str, float], None]]:
+    """
+    Install hook(path, seconds), called after every object field is checked by
+    validate() with the time spent on it, nested fields included. Array items
+    appear as 'tags[]'. The hook is process-wide and compiled functions are not
+    instrumented. Returns the previous hook; pass None to remove it.
+    """
+    global _field_hook
+    previous, _field_hook = _field_hook, hook
+    return previous
+
+class FieldTimings:
+    """Field hook that totals time and calls per path; use as a context manager"""
+    def __init__(self):
+        self.totals: Dict[str, float] = {}
+        self.calls: Dict[str, int] = {}
+        self._previous = None
+
+    def __call__(self, path: str, seconds: float) -> None:
+        self.totals[path] = self.totals.get(path, 0.0) + seconds
+        self.calls[path] = self.calls.get(path, 0) + 1
+
+    def __enter__(self) -> 'FieldTimings':
+        self._previous = set_field_hook(self)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        set_field_hook(self._previous)
+
+    def report(self, limit: Optional[int] = None) -> List[Tuple[str, int, float]]:
+        """Return (path, calls, total seconds) rows, slowest first"""
+        rows = sorted(((path, self.calls[path], total) for path, total in self.totals.items()),
+                      key=lambda row: row[2], reverse=True)
+        return rows[:limit]
 
 class ObjectValidator(Validator):
     """Validator for object/dictionary values"""
+    __slots__ = ('schema',)
+
     def __init__(self, schema: Dict[str, Validator]):
         super().__init__()
         self.schema = schema
 
     def validate(self, value: Dict[str, Any]) -> bool:
         """Validate an object against its schema"""
+        if _field_hook is not None:
+            return self._validate_timed(value)
         if not isinstance(value, dict):
             raise ValidationError(f"Expected dict, got {type(value)}")
 
@@ -104,14 +544,115 @@ class ObjectValidator(Validator):
                     raise ValidationError(f"Missing required field: {key}")
             else:
                 validator.validate(value[key])
+        if self._validators:
+            # The object's own rules, e.g. custom(), run once every field passed
+            Validator.validate(self, value)
         return True
 
+    def _validate_timed(self, value: Dict[str, Any]) -> bool:
+        global _field_path
+        if not isinstance(value, dict):
+            raise ValidationError(f"Expected dict, got {type(value)}")
+
+        hook = _field_hook
+        prefix = _field_path
+        try:
+            for key, validator in self.schema.items():
+                if key not in value:
+                    if not validator._is_optional:
+                        raise ValidationError(f"Missing required field: {key}")
+                    continue
+                _field_path = path = f'{prefix}.{key}' if prefix else key
+                started = time.perf_counter()
+                try:
+                    validator.validate(value[key])
+                finally:
+                    hook(path, time.perf_counter() - started)
+        finally:
+            _field_path = prefix
+        if self._validators:
+            Validator.validate(self, value)
+        return True
+
+    def _plan_async(self, value: Any, pending: List[Tuple[Any, Any, str]]) -> bool:
+        if not isinstance(value, dict):
+            pending.append((None, None, f"Expected dict, got {type(value)}"))
+            return False
+
+        for key, validator in self.schema.items():
+            if key not in value:
+                if not validator._is_optional:
+                    pending.append((None, None, f"Missing required field: {key}"))
+                    return False
+            elif not validator._plan_async(value[key], pending):
+                return False
+        return self._plan_rules(value, pending)
+
+    def _coerce(self, value: Any) -> Any:
+        if not isinstance(value, dict):
+            raise ValidationError(f"Expected dict, got {type(value)}")
+
+        result = value
+        for key, validator in self.schema.items():
+            if key not in value:
+                if not validator._is_optional:
+                    raise ValidationError(f"Missing required field: {key}")
+                continue
+            item = value[key]
+            converted = validator._coerce(item)
+            if converted is not item:
+                if result is value:
+                    result = dict(value)
+                result[key] = converted
+        if self._validators:
+            # Like compile_coerce(), the object's own rules see the converted fields
+            Validator.validate(self, result)
+        return result
+
+    def _revalidate(self, value: Any, trie: Dict[Any, Any]) -> None:
+        if not isinstance(value, dict):
+            raise ValidationError(f"Expected dict, got {type(value)}")
+
+        # Walk in schema order so the first error matches a full validate()
+        for key, validator in self.schema.items():
+            if key not in trie:
+                continue
+            if key not in value:
+                if not validator._is_optional:
+                    raise ValidationError(f"Missing required field: {key}")
+            elif trie[key] is None:
+                validator.validate(value[key])
+            else:
+                validator._revalidate(value[key], trie[key])
+        if self._validators:
+            # Any change inside the object may change what its own rules see
+            Validator.validate(self, value)
+
+    def _collect_errors(self, value: Any, path: List[Any], errors: List[FieldError]) -> None:
+        if not isinstance(value, dict):
+            errors.append(FieldError(_format_path(path), 'type', value, f"Expected dict, got {type(value)}"))
+            return
+
+        field_errors = len(errors)
+        for key, validator in self.schema.items():
+            path.append(key)
+            if key not in value:
+                if not validator._is_optional:
+                    errors.append(FieldError(_format_path(path), 'required', None, f"Missing required field: {key}"))
+            else:
+                validator._collect_errors(value[key], path, errors)
+            path.pop()
+        if len(errors) == field_errors:
+            # As in validate(), the object's own rules only see objects whose fields passed
+            self._collect_rule_errors(value, path, errors)
+
 class ArrayValidator(Validator):
     """Validator for array/list values"""
+    __slots__ = ('item_validator',)
+
     def __init__(self, item_validator: Validator):
-        super().__init__()
+        super().__init__((list,))
         self.item_validator = item_validator
-        self._validators.append(lambda x: isinstance(x, list))
 
     def validate(self, value: List[Any]) -> bool:
         """Validate all items in the array"""
@@ -119,10 +660,415 @@ class ArrayValidator(Validator):
             return True
             
         super().validate(value)
+        if _field_hook is not None:
+            return self._validate_timed(value)
         for item in value:
             self.item_validator.validate(item)
         return True
 
+    def _validate_timed(self, value: List[Any]) -> bool:
+        global _field_path
+        prefix = _field_path
+        _field_path = prefix + '[]'
+        try:
+            for item in value:
+                self.item_validator.validate(item)
+        finally:
+            _field_path = prefix
+        return True
+
+    def _plan_async(self, value: Any, pending: List[Tuple[Any, Any, str]]) -> bool:
+        if self._is_optional and value is None:
+            return True
+        if not self._plan_rules(value, pending):
+            return False
+        item_validator = self.item_validator
+        for item in value:
+            if not item_validator._plan_async(item, pending):
+                return False
+        return True
+
+    def _coerce(self, value: Any) -> Any:
+        if self._is_optional and value is None:
+            return value
+
+        Validator.validate(self, value)
+        result = value
+        item_validator = self.item_validator
+        for index, item in enumerate(value):
+            converted = item_validator._coerce(item)
+            if converted is not item:
+                if result is value:
+                    result = list(value)
+                result[index] = converted
+        return result
+
+    def _revalidate(self, value: Any, trie: Dict[Any, Any]) -> None:
+        if self._is_optional and value is None:
+            return
+
+        Validator.validate(self, value)
+        item_validator = self.item_validator
+        for index in sorted(key for key in trie if type(key) is int):
+            # Indices past the end were removed; there is nothing left to check
+            if index < len(value):
+                if trie[index] is None:
+                    item_validator.validate(value[index])
+                else:
+                    item_validator._revalidate(value[index], trie[index])
+
+    def _collect_errors(self, value: Any, path: List[Any], errors: List[FieldError]) -> None:
+        if self._is_optional and value is None:
+            return
+        if not self._collect_rule_errors(value, path, errors):
+            return
+        item_validator = self.item_validator
+        for index, item in enumerate(value):
+            path.append(index)
+            item_validator._collect_errors(item, path, errors)
+            path.pop()
+
+class BatchResult:
+    """Outcome of validate_many(): a bitmap of valid rows plus errors indexed by row"""
+    def __init__(self, count: int, errors: Dict[int, str]):
+        self.count = count
+        self.errors = errors
+        self.bitmap = bytearray(b'\xff') * (count // 8)
+        if count % 8:
+            self.bitmap.append((1 << (count % 8)) - 1)
+        for index in errors:
+            self.bitmap[index >> 3] &= ~(1 << (index & 7))
+
+    def __len__(self) -> int:
+        return self.count
+
+    def is_valid(self, index: int) -> bool:
+        """Return whether the row at index passed validation"""
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        return bool(self.bitmap[index >> 3] & (1 << (index & 7)))
+
+    @property
+    def valid_count(self) -> int:
+        return self.count - len(self.errors)
+
+    @property
+    def all_valid(self) -> bool:
+        return not self.errors
+
+class _SchemaCompiler:
+    """Translates a validator tree into the source of specialized functions"""
+
+    # CPython rejects more than 100 indentation levels and 20 nested loops,
+    # so subtrees beyond these limits are emitted as helper functions.
+    _MAX_INLINE_DEPTH = 40
+    _MAX_INLINE_LOOPS = 8
+    _LITERAL_TYPES = (int, str, bool, type(None))
+    _BUILTIN_TYPES = (str, int, float, bool, list, dict)
+
+    # How a failure is reported: raise like validate(), return the message,
+    # or record it in the batch error table and move on to the next row.
+    RAISE, RETURN, BATCH = 'raise', 'return', 'batch'
+
+    def __init__(self):
+        self._namespace: Dict[str, Any] = {'ValidationError': ValidationError}
+        self._functions: List[str] = []
+        self._counter = 0
+        self._mode = self.RAISE
+
+    def compile(self, validator: Validator) -> Callable[[Any], bool]:
+        """Build a function that returns True or raises ValidationError"""
+        return self._load(self._function(validator, self.RAISE))
+
+    def compile_many(self, validator: Validator) -> Callable[[Iterable[Any]], 'BatchResult']:
+        """Build a function that validates an iterable of values without raising"""
+        name = self._name('_validate_many')
+        self._mode = self.BATCH
+        lines = [f'def {name}(rows):',
+                 '    errors = {}',
+                 '    i = -1',
+                 '    for i, value in enumerate(rows):']
+        self._emit(validator, 'value', lines, 2, 0)
+        lines.append('    return BatchResult(i + 1, errors)')
+        self._functions.append('\n'.join(lines))
+        self._namespace['BatchResult'] = BatchResult
+        return self._load(name)
+
+    def compile_coerce(self, validator: Validator) -> Callable[[Any], Any]:
+        """Build a function that returns the coerced value or raises ValidationError"""
+        return self._load(self._coerce_function(validator))
+
+    def compile_module(self, validator: Validator) -> Tuple[Any, Dict[str, Any], str]:
+        """Return the code object of compile(), the globals it needs and its entry point"""
+        name = self._function(validator, self.RAISE)
+        return self._code(), dict(self._namespace), name
+
+    @staticmethod
+    def load_module(code: Any, constants: Dict[str, Any], name: str) -> Callable:
+        """Execute a code object from compile_module() and return its entry point"""
+        namespace = dict(constants)
+        exec(code, namespace)
+        return namespace[name]
+
+    def _code(self) -> Any:
+        return compile('\n\n'.join(self._functions), '<compiled schema>', 'exec')
+
+    def _load(self, name: str) -> Callable:
+        function = self.load_module(self._code(), self._namespace, name)
+        function.__source__ = '\n\n'.join(self._functions)
+        return function
+
+    def _name(self, prefix: str) -> str:
+        self._counter += 1
+        return f'{prefix}{self._counter}'
+
+    def _const(self, obj: Any) -> str:
+        """Return a source expression for obj, binding it as a global if needed"""
+        if type(obj) in self._LITERAL_TYPES or (type(obj) is float and math.isfinite(obj)):
+            return repr(obj)
+        name = self._name('_c')
+        self._namespace[name] = obj
+        return name
+
+    def _function(self, validator: Validator, mode: str) -> str:
+        outer_mode, self._mode = self._mode, mode
+        name = self._name('_validate')
+        lines = [f'def {name}(value):']
+        self._emit(validator, 'value', lines, 1, 0)
+        lines.append('    return True' if mode == self.RAISE else '    return None')
+        self._functions.append('\n'.join(lines))
+        self._mode = outer_mode
+        return name
+
+    def _coerce_function(self, validator: Validator) -> str:
+        outer_mode, self._mode = self._mode, self.RAISE
+        name = self._name('_coerce')
+        lines = [f'def {name}(value):']
+        self._emit_coerce(validator, 'value', lines, 1, 0)
+        lines.append('    return value')
+        self._functions.append('\n'.join(lines))
+        self._mode = outer_mode
+        return name
+
+    def _fail(self, message: str, lines: List[str], pad: str) -> None:
+        if self._mode == self.RAISE:
+            lines.append(f'{pad}raise ValidationError({message})')
+        elif self._mode == self.RETURN:
+            lines.append(f'{pad}return {message}')
+        else:
+            lines.append(f'{pad}errors[i] = {message}')
+            lines.append(f'{pad}continue')
+
+    def _call_helper(self, helper: str, var: str, lines: List[str], pad: str) -> None:
+        if self._mode == self.RAISE:
+            lines.append(f'{pad}{helper}({var})')
+        else:
+            error = self._name('e')
+            lines.append(f'{pad}{error} = {helper}({var})')
+            lines.append(f'{pad}if {error} is not None:')
+            self._fail(error, lines, pad + '    ')
+
+    def _emit(self, validator: Validator, var: str, lines: List[str], depth: int, loops: int) -> None:
+        pad = '    ' * depth
+        validate = type(validator).validate
+        if depth > self._MAX_INLINE_DEPTH or loops > self._MAX_INLINE_LOOPS:
+            mode = self.RETURN if self._mode == self.BATCH else self._mode
+            self._call_helper(self._function(validator, mode), var, lines, pad)
+        elif validate is ObjectValidator.validate:
+            self._emit_object(validator, var, lines, depth, loops)
+        elif validate is ArrayValidator.validate:
+            if self._mode == self.BATCH:
+                # `continue` cannot leave a nested loop, so arrays get a helper
+                self._call_helper(self._function(validator, self.RETURN), var, lines, pad)
+            else:
+                self._emit_array(validator, var, lines, depth, loops)
+        elif validate is Validator.validate:
+            if validator._validators or validator._type is not object:
+                if validator._is_optional:
+                    lines.append(f'{pad}if {var} is not None:')
+                    depth += 1
+                self._emit_checks(validator, var, lines, depth)
+        elif self._mode == self.RAISE:
+            # Subclasses with their own validate() keep their behaviour
+            lines.append(f'{pad}{self._const(validator.validate)}({var})')
+        else:
+            error = self._name('e')
+            lines.append(f'{pad}try:')
+            lines.append(f'{pad}    {self._const(validator.validate)}({var})')
+            lines.append(f'{pad}except ValidationError as {error}:')
+            self._fail(f'{error}.message', lines, pad + '    ')
+
+    def _emit_checks(self, validator: Validator, var: str, lines: List[str], depth: int) -> None:
+        pad = '    ' * depth
+        if validator._custom_message:
+            message = self._const(validator._custom_message)
+        else:
+            message = f'f"Validation failed for value: {{{var}}}"'
+        if validator._type is not object:
+            lines.append(f'{pad}if not {self._type_condition(validator._type, var)}:')
+            self._fail(message, lines, pad + '    ')
+        for index, check in enumerate(validator._validators):
+            rule = validator._rules[index] if index < len(validator._rules) else None
+            lines.append(f'{pad}if not ({self._condition(rule, check, var)}):')
+            self._fail(message, lines, pad + '    ')
+
+    def _type_condition(self, value_type: Union[type, Tuple[type, ...]], var: str) -> str:
+        types = value_type if isinstance(value_type, tuple) else (value_type,)
+        names = [t.__name__ if t in self._BUILTIN_TYPES else self._const(t) for t in types]
+        if len(names) == 1:
+            return f'isinstance({var}, {names[0]})'
+        return f'isinstance({var}, ({", ".join(names)}))'
+
+    def _condition(self, rule: Optional[Tuple[str, Any]], check: Callable[[Any], bool], var: str) -> str:
+        name, arg = rule if rule is not None else (None, None)
+        if name == 'async':
+            raise TypeError(f"{arg.__name__} is a coroutine check and cannot be compiled; use avalidate()")
+        if name == 'min_length':
+            return f'len({var}) >= {self._const(arg)}'
+        if name == 'max_length':
+            return f'len({var}) <= {self._const(arg)}'
+        if name == 'min':
+            return f'{var} >= {self._const(arg)}'
+        if name == 'max':
+            return f'{var} <= {self._const(arg)}'
+        if name == 'pattern':
+            return f'{self._const(arg.match)}({var})'
+        return f'{self._const(check)}({var})'
+
+    def _emit_object(self, validator: 'ObjectValidator', var: str, lines: List[str], depth: int, loops: int) -> None:
+        pad = '    ' * depth
+        lines.append(f'{pad}if not isinstance({var}, dict):')
+        self._fail(f'f"Expected dict, got {{type({var})}}"', lines, pad + '    ')
+        for key, child in validator.schema.items():
+            self._emit_field(key, child, var, lines, depth, loops)
+        self._emit_checks(validator, var, lines, depth)
+
+    def _emit_field(self, key: str, child: Validator, var: str, lines: List[str], depth: int, loops: int) -> None:
+        pad = '    ' * depth
+        key_expr = self._const(key)
+        child_var = self._name('v')
+        if child._is_optional:
+            lines.append(f'{pad}if {key_expr} in {var}:')
+            lines.append(f'{pad}    {child_var} = {var}[{key_expr}]')
+            self._emit(child, child_var, lines, depth + 1, loops)
+        else:
+            lines.append(f'{pad}if {key_expr} not in {var}:')
+            self._fail(self._const(f"Missing required field: {key}"), lines, pad + '    ')
+            lines.append(f'{pad}{child_var} = {var}[{key_expr}]')
+            self._emit(child, child_var, lines, depth, loops)
+
+    def _emit_array(self, validator: 'ArrayValidator', var: str, lines: List[str], depth: int, loops: int) -> None:
+        pad = '    ' * depth
+        if validator._is_optional:
+            lines.append(f'{pad}if {var} is not None:')
+            depth += 1
+            pad += '    '
+        self._emit_checks(validator, var, lines, depth)
+        item_var = self._name('v')
+        lines.append(f'{pad}for {item_var} in {var}:')
+        body_start = len(lines)
+        self._emit(validator.item_validator, item_var, lines, depth + 1, loops + 1)
+        if len(lines) == body_start:
+            lines.append(f'{pad}    pass')
+
+    @classmethod
+    def _may_convert(cls, validator: Validator) -> bool:
+        """Whether coerce() can return something other than its input for this subtree"""
+        coerce = type(validator)._coerce
+        if coerce is Validator._coerce:
+            return False
+        if coerce is ObjectValidator._coerce:
+            return any(cls._may_convert(child) for child in validator.schema.values())
+        if coerce is ArrayValidator._coerce:
+            return cls._may_convert(validator.item_validator)
+        return True
+
+    def _emit_coerce(self, validator: Validator, var: str, lines: List[str], depth: int, loops: int) -> None:
+        """Like _emit(), but afterwards var holds the coerced value"""
+        if not self._may_convert(validator):
+            self._emit(validator, var, lines, depth, loops)
+            return
+        pad = '    ' * depth
+        kind = type(validator)
+        if depth > self._MAX_INLINE_DEPTH or loops > self._MAX_INLINE_LOOPS:
+            lines.append(f'{pad}{var} = {self._coerce_function(validator)}({var})')
+        elif kind._coerce is ObjectValidator._coerce:
+            self._emit_coerce_object(validator, var, lines, depth, loops)
+        elif kind._coerce is ArrayValidator._coerce:
+            self._emit_coerce_array(validator, var, lines, depth, loops)
+        elif kind.validate is Validator.validate and kind._coerce in (NumberValidator._coerce, DateValidator._coerce):
+            lines.append(f'{pad}if type({var}) is str:')
+            if kind._coerce is NumberValidator._coerce:
+                # Inlined _to_number(); n - n is not 0 for inf and nan
+                number = self._name('n')
+                lines.append(f'{pad}    try:')
+                lines.append(f'{pad}        {number} = float({var})')
+                lines.append(f'{pad}    except ValueError:')
+                lines.append(f'{pad}        pass')
+                lines.append(f"{pad}    else:")
+                lines.append(f"{pad}        if {number} - {number} == 0 and '_' not in {var}:")
+                lines.append(f'{pad}            {var} = {number}')
+            else:
+                # Inlined _to_datetime() for the common case
+                lines.append(f'{pad}    try:')
+                lines.append(f'{pad}        {var} = {self._const(datetime.fromisoformat)}({var})')
+                lines.append(f'{pad}    except ValueError:')
+                lines.append(f'{pad}        {var} = {self._const(_to_datetime)}({var})')
+            self._emit(validator, var, lines, depth, loops)
+        else:
+            lines.append(f'{pad}{var} = {self._const(validator._coerce)}({var})')
+
+    def _emit_coerce_object(self, validator: 'ObjectValidator', var: str, lines: List[str],
+                            depth: int, loops: int) -> None:
+        pad = '    ' * depth
+        lines.append(f'{pad}if not isinstance({var}, dict):')
+        self._fail(f'f"Expected dict, got {{type({var})}}"', lines, pad + '    ')
+        result = self._name('r')
+        lines.append(f'{pad}{result} = {var}')
+        for key, child in validator.schema.items():
+            if not self._may_convert(child):
+                self._emit_field(key, child, var, lines, depth, loops)
+                continue
+            key_expr = self._const(key)
+            child_var = self._name('v')
+            child_depth = depth
+            if child._is_optional:
+                lines.append(f'{pad}if {key_expr} in {var}:')
+                child_depth += 1
+            else:
+                lines.append(f'{pad}if {key_expr} not in {var}:')
+                self._fail(self._const(f"Missing required field: {key}"), lines, pad + '    ')
+            child_pad = '    ' * child_depth
+            original = self._name('o')
+            lines.append(f'{child_pad}{child_var} = {original} = {var}[{key_expr}]')
+            self._emit_coerce(child, child_var, lines, child_depth, loops)
+            # Copy the object once, on its first converted field
+            lines.append(f'{child_pad}if {child_var} is not {original}:')
+            lines.append(f'{child_pad}    if {result} is {var}:')
+            lines.append(f'{child_pad}        {result} = dict({var})')
+            lines.append(f'{child_pad}    {result}[{key_expr}] = {child_var}')
+        lines.append(f'{pad}{var} = {result}')
+        self._emit_checks(validator, var, lines, depth)
+
+    def _emit_coerce_array(self, validator: 'ArrayValidator', var: str, lines: List[str],
+                           depth: int, loops: int) -> None:
+        pad = '    ' * depth
+        if validator._is_optional:
+            lines.append(f'{pad}if {var} is not None:')
+            depth += 1
+            pad += '    '
+        self._emit_checks(validator, var, lines, depth)
+        result, index, item_var, original = self._name('r'), self._name('i'), self._name('v'), self._name('o')
+        lines.append(f'{pad}{result} = {var}')
+        lines.append(f'{pad}for {index}, {item_var} in enumerate({var}):')
+        lines.append(f'{pad}    {original} = {item_var}')
+        self._emit_coerce(validator.item_validator, item_var, lines, depth + 1, loops + 1)
+        lines.append(f'{pad}    if {item_var} is not {original}:')
+        lines.append(f'{pad}        if {result} is {var}:')
+        lines.append(f'{pad}            {result} = list({var})')
+        lines.append(f'{pad}        {result}[{index}] = {item_var}')
+        lines.append(f'{pad}{var} = {result}')
+
 class Schema:
     """Schema builder class"""
     @staticmethod
@@ -153,4 +1099,9 @@ class Schema:
     @staticmethod
     def array(item_validator: Validator) -> ArrayValidator:
         """Create an array validator with the given item validator"""
-        return ArrayValidator(item_validator) 
\ No newline at end of file
+        return ArrayValidator(item_validator)
+
+    @staticmethod
+    def compile(validator: Validator) -> Callable[[Any], bool]:
+        """Compile a validator tree into a single specialized validation function"""
+        return validator.compile()